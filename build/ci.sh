@@ -34,7 +34,15 @@ run_cmd "cd ${REPO_HOME}"
 
 write_log "####################  Install PPExtensions ####################"
 
-run_cmd "pip install ppextensions"
+run_cmd "pip install ${REPO_HOME}"
+
+write_log "####################  Unit Tests ####################"
+
+run_cmd "python -m unittest discover -s ${REPO_HOME}/tests"
+
+write_log "####################  Import Benchmark ####################"
+
+run_cmd "python ${BUILD_DIR}/import_benchmark.py --runs 5 --max-seconds ${IMPORT_MAX_SECONDS}"
 
 write_log "################### Final Cleanup #########################"
 
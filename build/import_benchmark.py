@@ -0,0 +1,112 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Import time benchmark of the ppmagics extension.
+
+Imports ppextensions.ppmagics in fresh interpreters, reports the wall time and fails if engine drivers or heavy UI
+libraries are imported eagerly, or if the median import time exceeds --max-seconds.
+
+    python build/import_benchmark.py --runs 5 --max-seconds 3 --top 15
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULE = 'ppextensions.ppmagics'
+
+# Modules that must only be imported on first use of the magic or feature that needs them.
+LAZY_MODULES = ['autovizwidget', 'hdfs3', 'impala', 'nbconvert', 'pandas', 'paramiko', 'pyhive', 'pysftp', 'qgrid',
+                'sql', 'sqlalchemy', 'tableausdk', 'teradata']
+
+PROBE = """
+import json, sys, time
+start = time.time()
+import {module}
+elapsed = time.time() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': sorted(set(name.split('.')[0] for name in sys.modules))}}))
+"""
+
+
+def measure(module):
+    """
+    Imports module in a new interpreter.
+    :return: Seconds taken and the top level packages loaded.
+    """
+    output = subprocess.check_output([sys.executable, '-c', PROBE.format(module=module)])
+    result = json.loads(output.decode().strip().splitlines()[-1])
+    return result['seconds'], set(result['loaded'])
+
+
+def slowest_imports(module, top):
+    """
+    Slowest imports by cumulative time, from python -X importtime.
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    timings = []
+    for line in process.stderr.decode().splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        timings.append((int(cumulative), name))
+    return sorted(timings, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters to time')
+    parser.add_argument('--max-seconds', type=float, default=None, help='Fail if the median import time is higher')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list')
+    args = parser.parse_args()
+
+    timings = []
+    loaded = set()
+    for _ in range(args.runs):
+        seconds, loaded = measure(MODULE)
+        timings.append(seconds)
+    median = statistics.median(timings)
+    print('import %s: median %.3fs, min %.3fs, max %.3fs over %d runs' % (
+        MODULE, median, min(timings), max(timings), args.runs))
+
+    if sys.version_info >= (3, 7):
+        for cumulative, name in slowest_imports(MODULE, args.top):
+            print('%10.3fs  %s' % (cumulative / 1e6, name))
+
+    failed = False
+    eager = sorted(loaded.intersection(LAZY_MODULES))
+    if eager:
+        print('Imported eagerly: %s' % ', '.join(eager))
+        failed = True
+    if args.max_seconds is not None and median > args.max_seconds:
+        print('Median import time %.3fs exceeds %.3fs' % (median, args.max_seconds))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
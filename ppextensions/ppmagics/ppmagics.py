@@ -28,6 +28,10 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """Code for all the magics and pp extensions present in the main file"""
 
 import concurrent.futures
+import os
+import shutil
+import tempfile
+import threading
 
 from enum import Enum
 
@@ -40,14 +44,19 @@ from IPython.core.magic_arguments import argument, magic_arguments, parse_argstr
 from IPython.display import display_javascript
 
 
-from nbconvert.preprocessors import ExecutePreprocessor
-from nbconvert.preprocessors import CellExecutionError
-from jupyter_client.manager import start_new_kernel
-
-from ppextensions.ppsql import HiveConnection, TeradataConnection, PrestoConnection, CSVConnection
-from ppextensions.pputils import ParameterArgs, wrap_exceptions, publish
-from ppextensions.pputils.utils import utils
-from ppextensions.pputils.widgets.widgets import QGridCustomWidget, HorizontalBox, VerticalBox, TabView
+from ppextensions.ppsql import connection_pool
+from ppextensions.pputils import ParameterArgs, wrap_exceptions
+from ppextensions.pputils.utils import pipeline, utils
+from ppextensions.pputils.utils.checkpoint import PipelineCheckpoints, load_workspace_source, \
+    save_workspace_source
+from ppextensions.pputils.utils.constants import CACHE_DIR
+from ppextensions.pputils.utils.csvcache import CSVCache
+from ppextensions.pputils.utils.exceptions import InvalidParameterType
+from ppextensions.pputils.utils.kernelpool import KernelPool
+from ppextensions.pputils.utils.notebookcache import NotebookCache, has_errors
+from ppextensions.pputils.utils.querycache import QueryCache
+from ppextensions.pputils.utils.queryhandle import QueryHandle
+from ppextensions.pputils.widgets.widgets import HorizontalBox, VerticalBox, TabView
 from ppextensions.pputils.widgets.messages import UserMessages
 
 try:
@@ -83,7 +92,48 @@ class PPMagics(Magics, Configurable):
                                                 "available.")
     enable_download = Bool(False, config=True, help="Enables download option")
     qgrid = Bool(False, config=True, help="Enables QGrid formatted output")
+    qgrid_paging = Bool(True, config=True, help="Render results with more than displaylimit rows a page of "
+                                                "displaylimit rows at a time, paging, sorting and filtering "
+                                                "in the kernel")
     autoviz = Bool(False, config=True, help="Enable AutoViz formatted output")
+    columnar = Bool(False, config=True, help="Store fetched results column-wise as "
+                                             "NumPy arrays instead of row tuples")
+    stream_batch_size = Int(100000, config=True, help="Number of rows per batch when "
+                                                      "streaming results")
+    teradata_batch_size = Int(10000, config=True, help="Number of rows sent per batch when "
+                                                       "inserting into Teradata")
+    kernel_pool_size = Int(4, config=True, help="Maximum number of idle kernels kept per "
+                                                "kernelspec for run and run_pipeline")
+    kernel_idle_timeout = Int(600, config=True, help="Seconds after which idle pooled "
+                                                     "kernels are shut down")
+    kernel_pool_prestart = Int(0, config=True, help="Number of python3 kernels started in "
+                                                    "the background when the extension loads")
+    run_workers = Int(0, config=True, help="Maximum number of notebooks run at once by %%run -p. "
+                                           "0 sizes it to the cores and free memory")
+    kernel_memory_mb = Int(1024, config=True, help="Memory reserved per kernel when sizing "
+                                                   "parallel runs")
+    run_shared_workspace = Bool(False, config=True, help="Open _shared_workspace in the Python notebooks of %%run")
+    run_cache = Bool(False, config=True, help="Reuse executions of notebooks whose source, parameters and "
+                                              "inputs are unchanged in %%run and %%run_pipeline")
+    run_cache_size_mb = Int(1024, config=True, help="Disk space used by cached notebook executions")
+    pipeline_checkpoint = Bool(False, config=True, help="Checkpoint every completed %%run_pipeline stage so "
+                                                        "failed pipelines can be resumed, also enabled by --resume")
+    pipeline_checkpoint_size_mb = Int(4096, config=True, help="Disk space used by pipeline checkpoints")
+    pipeline_shared_frames = Bool(False, config=True, help="Pass DataFrames between %%run_pipeline notebooks "
+                                                           "through shared memory")
+    query_cache = Bool(False, config=True, help="Reuse results of read-only queries that were executed before "
+                                                "on the same connection")
+    query_cache_ttl = Int(3600, config=True, help="Seconds cached query results are reused for")
+    query_cache_size_mb = Int(1024, config=True, help="Disk space used by cached query results")
+    csv_cache = Bool(True, config=True, help="Keep DataFrames parsed by %%csv on disk, so unchanged files aren't "
+                                             "parsed again in later sessions")
+    csv_cache_size_mb = Int(2048, config=True, help="Disk space used by DataFrames parsed by %%csv")
+    hive_sessions = Int(4, config=True, help="Number of HiveServer2 sessions used by %%hive --concurrent")
+    connection_pool_size = Int(2, config=True, help="Maximum number of connections opened per engine and server. "
+                                                    "Teradata uses a single connection")
+    connection_idle_timeout = Int(1800, config=True, help="Seconds after which idle pooled connections are closed")
+    connection_acquire_timeout = Int(600, config=True, help="Seconds to wait for a pooled connection once all are in "
+                                                            "use, 0 waits until one is released")
 
     def __init__(self, shell):
         Configurable.__init__(self, config=shell.config)
@@ -91,21 +141,40 @@ class PPMagics(Magics, Configurable):
         # Add ourself to the list of module configurable via %config
         self.shell.configurables.append(self)
         self.connections = {}
+        self.kernel_pool = KernelPool(self.kernel_pool_size, self.kernel_idle_timeout)
+        if self.kernel_pool_prestart > 0:
+            self.kernel_pool.prestart('python3', self.kernel_pool_prestart)
+        self.notebook_cache = NotebookCache(os.path.join(CACHE_DIR, 'notebooks'), self.run_cache_size_mb << 20)
+        self.pipeline_checkpoints = PipelineCheckpoints(os.path.join(CACHE_DIR, 'checkpoints'),
+                                                        self.pipeline_checkpoint_size_mb << 20)
+        self.query_results = QueryCache(os.path.join(CACHE_DIR, 'queries'), self.query_cache_size_mb << 20,
+                                        self.query_cache_ttl)
+        self.csv_tables = CSVCache(os.path.join(CACHE_DIR, 'csv'), self.csv_cache_size_mb << 20)
 
     def _get_connection_(self, conn_type, cluster=None, host=None, port=None, auth=None, resource_manager=None):
-        if conn_type is ConnectionType.HIVE or conn_type is ConnectionType.STS:
-            if conn_type not in self.connections:
-                self.connections[conn_type] = HiveConnection(cluster, host, port, auth, resource_manager, conn_type is ConnectionType.STS)
-        elif conn_type is ConnectionType.TERADATA:
-            if conn_type not in self.connections:
-                self.connections[conn_type] = TeradataConnection(cluster, host)
-        elif conn_type is ConnectionType.PRESTO:
-            if conn_type not in self.connections:
-                self.connections[conn_type] = PrestoConnection(cluster, host, port, auth)
-        elif conn_type is ConnectionType.CSV:
-            if conn_type not in self.connections:
-                self.connections[conn_type] = CSVConnection()
-        return self.connections[conn_type]
+        """
+        Connection of the magics for conn_type. It is kept for the next queries of the same type that don't name
+        a server or name the same one. Naming another server returns the kept connection to the pool and switches
+        to a pooled connection to that server. Broken connections are replaced.
+        """
+        pool = self._get_connection_pool_()
+        key = (conn_type.value, cluster, host, port, auth)
+        connection = self.connections.get(conn_type)
+        if connection is not None:
+            if (cluster or host) and connection.pool_key != pool.key(*key):
+                pool.release(connection)
+                connection = None
+            elif not pool.check(connection):
+                pool.release(connection, discard=True)
+                connection = None
+        if connection is None:
+            options = {}
+            if conn_type is ConnectionType.HIVE or conn_type is ConnectionType.STS:
+                options['resource_manager'] = resource_manager
+            # Pinned, the connection is kept across cells and mustn't hold a slot others wait for.
+            connection = pool.acquire(*key, pin=True, **options)
+            self.connections[conn_type] = connection
+        return connection
 
     @needs_local_scope
     @magic_arguments()
@@ -133,6 +202,16 @@ class PPMagics(Magics, Configurable):
     @argument("-tde", "--tde_name", type=str, help="tde Name to be published")
     @argument("-pname", "--project_name", type=str, help="project name to be "
               "published")
+    @argument("-s", "--stream", type=bool, default=False,
+              help="Return a generator of DataFrames of --batch_size rows instead of "
+                   "fetching the whole result")
+    @argument("-bs", "--batch_size", type=int, help="Rows per batch when streaming")
+    @argument("-nc", "--no_cache", type=bool, default=False,
+              help="Execute the query even if its results are cached")
+    @argument("-bg", "--background", type=bool, default=False,
+              help="Execute the query in the background and return a handle to its results")
+    @argument("-cc", "--concurrent", type=bool, default=False,
+              help="Execute independent statements concurrently over several sessions")
     @wrap_exceptions
     def hive(self, arg, line='', cell='', local_ns=None):
         """Connects to hive execution engine and executes the query.
@@ -148,6 +227,21 @@ class PPMagics(Magics, Configurable):
             # To insert csv data to a table
             %hive -f file.csv -t database.table_name
 
+            # To stream a large result in DataFrames of 500000 rows
+            batches = %hive -s True -bs 500000 select * from database.table_name
+            for df in batches:
+                df.to_csv('extract.csv', mode='a', header=False)
+
+            # To keep using the notebook while a query runs
+            handle = %hive -bg True select * from database.table_name
+            df = handle.DataFrame()
+
+            # To load partitions concurrently, SET statements apply to every session
+            %%hive -cc True
+            set hive.exec.dynamic.partition.mode=nonstrict;
+            insert overwrite table database.sales partition (dt='2018-01-01') select * from database.sales_stage_01;
+            insert overwrite table database.sales partition (dt='2018-01-02') select * from database.sales_stage_02
+
         """
         # save globals and locals so they can be referenced in bind vars
         if not (line or cell):
@@ -175,13 +269,16 @@ class PPMagics(Magics, Configurable):
                                                                            args.get("name_node_options"),
                                                                            csv, df_flag, self.autolimit, self.displaylimit)
 
-        result_set = self._get_connection_(ConnectionType.HIVE, cluster=args.get("cluster_name"),
+        connection = self._get_connection_(ConnectionType.HIVE, cluster=args.get("cluster_name"),
                                            host=args.get("hive_server"), port=args.get("port"),
                                            auth=args.get("auth"),
-                                           resource_manager=args.get("resource_manager_url")).\
-            execute(cell, self.autolimit, self.displaylimit, self.progress_bar)
+                                           resource_manager=args.get("resource_manager_url"))
+        if args.get('stream'):
+            return connection.execute_stream(cell, args.get('batch_size') or self.stream_batch_size,
+                                             displaylimit=self.displaylimit, progress_bar=self.progress_bar)
 
-        return self._process_results_(result_set, args.get('tableau'), args.get('publish'), args.get('tde_name'), args.get('project_name'))
+        return self._execute_query_(connection, cell, args,
+                                    concurrent_sessions=self.hive_sessions if args.get('concurrent') else 0)
 
     @needs_local_scope
     @magic_arguments()
@@ -204,6 +301,12 @@ class PPMagics(Magics, Configurable):
     @argument("-tde", "--tde_name", type=str, help="tde Name to be published")
     @argument("-pname", "--project_name", type=str, help="project name to be "
               "published")
+    @argument("-bs", "--batch_size", type=int, help="Rows sent per batch when inserting "
+                                                    "with --table")
+    @argument("-nc", "--no_cache", type=bool, default=False,
+              help="Execute the query even if its results are cached")
+    @argument("-bg", "--background", type=bool, default=False,
+              help="Execute the query in the background and return a handle to its results")
     @wrap_exceptions
     def teradata(self, arg, line='', cell='', local_ns=None):
         """Connects to teradata system and executes the query.
@@ -235,12 +338,11 @@ class PPMagics(Magics, Configurable):
             data_frame = utils.csv_to_df(user_ns, args)
 
             return self._get_connection_(ConnectionType.TERADATA, args.get("cluster_name"), args.get("host")).insert_csv(
-                args.get("table"), data_frame, self.autolimit, self.displaylimit)
+                args.get("table"), data_frame, self.autolimit, self.displaylimit,
+                args.get("batch_size") or self.teradata_batch_size)
 
-        result_set = self._get_connection_(ConnectionType.TERADATA, args.get("cluster_name"), args.get("host")).execute(
-            cell, self.autolimit, self.displaylimit, self.progress_bar)
-
-        return self._process_results_(result_set, args.get('tableau'), args.get('publish'), args.get('tde_name'), args.get('project_name'))
+        return self._execute_query_(self._get_connection_(ConnectionType.TERADATA, args.get("cluster_name"),
+                                                          args.get("host")), cell, args)
 
     @needs_local_scope
     @magic_arguments()
@@ -257,6 +359,14 @@ class PPMagics(Magics, Configurable):
     @argument("-tde", "--tde_name", type=str, help="tde Name to be published")
     @argument("-pname", "--project_name", type=str, help="project name to be "
               "published")
+    @argument("-s", "--stream", type=bool, default=False,
+              help="Return a generator of DataFrames of --batch_size rows instead of "
+                   "fetching the whole result")
+    @argument("-bs", "--batch_size", type=int, help="Rows per batch when streaming")
+    @argument("-nc", "--no_cache", type=bool, default=False,
+              help="Execute the query even if its results are cached")
+    @argument("-bg", "--background", type=bool, default=False,
+              help="Execute the query in the background and return a handle to its results")
     @wrap_exceptions
     def presto(self, arg, line='', cell='', local_ns=None):
         """Connects to presto execution engine for query execution.
@@ -268,6 +378,11 @@ class PPMagics(Magics, Configurable):
             %%presto -d True
             select * from cluster.default.dim_cust limit 10
 
+            # To process a large result in DataFrames of 500000 rows
+            batches = %presto -s True -bs 500000 select * from cluster.default.dim_cust
+            for df in batches:
+                process(df)
+
         """
         # save globals and locals so they can be referenced in bind vars
         if not (line or cell):
@@ -281,10 +396,12 @@ class PPMagics(Magics, Configurable):
         if not cell:
             cell = line
 
-        result_set = self._get_connection_(ConnectionType.PRESTO, args.get("cluster_name"), args.get("host"), args.get("port"), args.get("auth")).execute(
-            cell, self.autolimit, self.displaylimit, self.progress_bar)
+        connection = self._get_connection_(ConnectionType.PRESTO, args.get("cluster_name"), args.get("host"), args.get("port"), args.get("auth"))
+        if args.get('stream'):
+            return connection.execute_stream(cell, args.get('batch_size') or self.stream_batch_size,
+                                             displaylimit=self.displaylimit, progress_bar=self.progress_bar)
 
-        return self._process_results_(result_set, args.get('tableau'), args.get('publish'), args.get('tde_name'), args.get('project_name'))
+        return self._execute_query_(connection, cell, args)
 
     @line_magic('help')
     def help(self, arg, line='', cell='', local_ns=None):
@@ -334,6 +451,11 @@ class PPMagics(Magics, Configurable):
             <td>%run_pipeline?</td>
             <td>Run notebooks sequentially in a pipeline</td>
           </tr>
+          <tr>
+            <td>clear_query_cache</td>
+            <td>%clear_query_cache?</td>
+            <td>Removes cached results of hive, sts, presto and teradata queries.</td>
+          </tr>
         </table>
         """
         return help_html
@@ -374,7 +496,7 @@ class PPMagics(Magics, Configurable):
         if not cell:
             cell = line
 
-        result_set = self._get_connection_(ConnectionType.CSV, '').execute(cell)
+        result_set = self._get_connection_(ConnectionType.CSV, '').execute(cell, cache=self._get_csv_cache_())
         return self._process_results_(result_set, args.get('tableau'), args.get('publish'), args.get('tde_name'), args.get('project_name'))
 
     @needs_local_scope
@@ -392,6 +514,14 @@ class PPMagics(Magics, Configurable):
     @argument("-tde", "--tde_name", type=str, help="tde Name to be published")
     @argument("-pname", "--project_name", type=str, help="project name to be "
               "published")
+    @argument("-s", "--stream", type=bool, default=False,
+              help="Return a generator of DataFrames of --batch_size rows instead of "
+                   "fetching the whole result")
+    @argument("-bs", "--batch_size", type=int, help="Rows per batch when streaming")
+    @argument("-nc", "--no_cache", type=bool, default=False,
+              help="Execute the query even if its results are cached")
+    @argument("-bg", "--background", type=bool, default=False,
+              help="Execute the query in the background and return a handle to its results")
     @wrap_exceptions
     def sts(self, arg, line='', cell='', local_ns=None):
         """Connects to spark thrift server and executes the query
@@ -415,10 +545,12 @@ class PPMagics(Magics, Configurable):
         if not cell:
             cell = line
 
-        result_set = self._get_connection_(ConnectionType.STS, cluster=args.get("cluster_name"), host=args.get("host"), port=args.get("port"), auth=args.get("auth")).execute(
-            cell, self.autolimit, self.displaylimit, self.progress_bar)
+        connection = self._get_connection_(ConnectionType.STS, cluster=args.get("cluster_name"), host=args.get("host"), port=args.get("port"), auth=args.get("auth"))
+        if args.get('stream'):
+            return connection.execute_stream(cell, args.get('batch_size') or self.stream_batch_size,
+                                             displaylimit=self.displaylimit, progress_bar=self.progress_bar)
 
-        return self._process_results_(result_set, args.get('tableau'), args.get('publish'), args.get('tde_name'), args.get('project_name'))
+        return self._execute_query_(connection, cell, args)
 
     @needs_local_scope
     @magic_arguments()
@@ -434,6 +566,32 @@ class PPMagics(Magics, Configurable):
         if not utils.renew_kerberos_ticket(args.get("principal"), args.get("keytab")):
             raise Exception("Unable to renew kerberos ticket")
 
+    @line_magic
+    @cell_magic
+    @wrap_exceptions
+    def clear_query_cache(self, arg, line='', cell=''):
+        """Removes cached query results. Without a query the whole query cache is cleared, with a query its
+           results are removed for every connection, limit and session.
+
+                # clear the query cache
+                Example1:
+                    %clear_query_cache
+
+                # execute a query again on its next run
+                Example2:
+                    %%clear_query_cache
+                    select * from database.table_name limit 10
+
+        """
+        log = UserMessages()
+        sql = line or cell or arg
+        if not sql.strip():
+            self.query_results.invalidate()
+            log.info("Cleared the query cache.")
+            return
+        self.query_results.invalidate_prefix(self.query_results.query_prefix(sql))
+        log.info("Removed cached results of the query.")
+
     @needs_local_scope
     @magic_arguments()
     @line_magic
@@ -445,6 +603,8 @@ class PPMagics(Magics, Configurable):
         """
             Publish to Tableau.
         """
+        from ppextensions.pputils.utils.tableau import publish
+
         if not (line or cell):
             if not arg.startswith("-"):
                 line = arg
@@ -478,6 +638,18 @@ class PPMagics(Magics, Configurable):
     @argument("-e", "--allow_errors", type=bool, default=False, help="Ignore errors and execute whole notebook")
     @argument("-pbar", "--enable_progress_bar", type=bool, default=False, help="Show Progress Bar")
     @argument("-t", "--cell_timeout", type=int, default=300, help="Cell Execution Timeout. -1 to Disable.")
+    @argument("-w", "--workers", type=int, help="Maximum number of notebooks run at once with --parallel. "
+                                                "Other notebooks are queued.")
+    @argument("-c", "--cache", type=bool, help="Reuse the execution of a notebook whose source, parameters "
+                                               "and inputs are unchanged")
+    @argument("-f", "--force", type=bool, default=False, help="Execute notebooks even if cached and "
+                                                              "refresh the cache")
+    @argument("-i", "--inputs", type=str, help="Comma separated files read by the notebooks, part of the "
+                                               "cache key")
+    @argument("-o", "--outputs", type=str, help="Comma separated files written by the notebooks, cached "
+                                                "along with the execution")
+    @argument("-sw", "--shared_workspace", type=bool, help="Open _shared_workspace in the Python notebooks of "
+                                                           "the run")
     @wrap_exceptions
     def run(self, arg, line='', cell='', local_ns=None):
         """Runs a notebook from another notebook. Allows for running parameterized notebooks. If using parameters
@@ -527,12 +699,35 @@ class PPMagics(Magics, Configurable):
                     your notebook 01;
                     your notebook 02
 
+                # run in parallel, at most 4 notebooks at once
+                Example1:
+                    %%run -p True -w 4
+                    your notebook 01;
+                    your notebook 02;
+                    your notebook 03;
+                    your notebook 04;
+                    your notebook 05
+
                 # parameterized run in parallel with progressbar
                 Example1:
                     %%run -pbar True -p True
                     your notebook 01  key01=int key01=string key02={'key01': param01};
                     your notebook 02:your save name key01=int key02=string key03=[param01, param02]
 
+                # reuse the last execution unless the notebook, its parameters or daily.csv changed
+                Example1:
+                    %%run -c True -i daily.csv -o report.html
+                    your notebook:your save name key01=int
+
+                # execute again and refresh the cached execution
+                Example1:
+                    %%run -c True -f True
+                    your notebook:your save name key01=int
+
+           With --shared_workspace True, the Python notebooks of a run share _shared_workspace: a DataFrame published by one notebook with
+           _shared_workspace.publish('name', df) is attached by others with _shared_workspace.attach('name'),
+           backed by shared memory instead of a copy. The workspace is removed when the run completes.
+
         """
         # save globals and locals so they can be referenced in bind vars
         if not (line or cell):
@@ -551,82 +746,56 @@ class PPMagics(Magics, Configurable):
         notebook_run_cmds = cell.split(';')
         notebook_run_cmds = [notebook_run_cmd.strip() for notebook_run_cmd in notebook_run_cmds]
 
-        def execute_notebook(notebook_filename, notebook_save_filename, params):
-            log = UserMessages()
-
-            with open(notebook_filename) as file_handler:
-                notebook = nbformat.read(file_handler, as_version=4)
-                b_errors = False
-                execute_preprocessor = ExecutePreprocessor(timeout=args.get('cell_timeout'), allow_errors=args.get('allow_errors'))
-                kernel_manager = None
-                kernel_comm = None
-                progress_bar = args.get('enable_progress_bar')
-
-                if params:
-                    for nb_cell in notebook.cells:
-                        if nb_cell.cell_type == 'code':
-                            new_cell_source = utils.substitute_params(nb_cell.source, params)
-                            nb_cell.source = new_cell_source
-                            break
-
-                try:
-                    if progress_bar:
-
-                        progress_bar = widgets.IntProgress(
-                            value=0,
-                            min=0,
-                            max=len(notebook.cells),
-                            step=1,
-                            bar_style='info',  # 'success', 'info', 'warning', 'danger' or ''
-                            orientation='horizontal'
-                        )
-
-                        kernel_manager, kernel_comm = start_new_kernel(kernel_name=notebook['metadata']['kernelspec']['name'])
-                        execute_preprocessor.km = kernel_manager
-                        execute_preprocessor.kc = kernel_comm
-                        execute_preprocessor.nb = notebook
-
-                        display_label = notebook_filename
-                        if notebook_save_filename:
-                            display_label = display_label + ' : ' + notebook_save_filename
-                        display(widgets.HBox([widgets.Label(display_label), progress_bar]))
-
-                        for idx, nb_cell in enumerate(notebook.cells):
-                            execute_preprocessor.preprocess_cell(nb_cell, resources={'metadata': {}}, cell_index=idx)
-                            progress_bar.value = idx + 1
-                    else:
-                        log.info("Running Notebook: " + notebook_filename)
-                        execute_preprocessor.preprocess(notebook, {'metadata': {}})
-                except CellExecutionError:
-                    b_errors = True
-                    if progress_bar:
-                        progress_bar.bar_style = 'danger'
-                    raise
-                except AttributeError:
-                    b_errors = True
-                    if progress_bar:
-                        progress_bar.bar_style = 'danger'
-                    raise
-                finally:
-                    if notebook_save_filename:
-                        with open(notebook_save_filename, mode='wt') as file_handler:
-                            nbformat.write(notebook, file_handler)
+        cache = args.get('cache') if args.get('cache') is not None else self.run_cache
+        notebook_cache = self._get_notebook_cache_() if cache else None
+        inputs = utils.split_paths(args.get('inputs'))
+        outputs = utils.split_paths(args.get('outputs'))
+
+        share = args.get('shared_workspace') if args.get('shared_workspace') is not None \
+            else self.run_shared_workspace
+        # Created by the first Python notebook, other kernels can't open it.
+        shared_workspaces = []
+        shared_workspace_lock = threading.Lock()
+
+        def setup_cells(notebook_filename):
+            if not share or not utils.is_python_notebook(notebook_filename):
+                return []
+            from ppextensions.pputils.utils.sharedworkspace import SharedWorkspace, open_workspace_source
+            with shared_workspace_lock:
+                if not shared_workspaces:
+                    shared_workspaces.append(SharedWorkspace())
+            return [nbformat.v4.new_code_cell(source=open_workspace_source(shared_workspaces[0].path))]
 
-                    if kernel_manager or kernel_comm:
-                        kernel_comm.stop_channels()
-                        kernel_manager.shutdown_kernel()
+        def execute_notebook(notebook_filename, notebook_save_filename, params):
+            self._execute_notebook_(notebook_filename, notebook_save_filename, params, args.get('cell_timeout'),
+                                    args.get('allow_errors'), args.get('enable_progress_bar'),
+                                    setup_cells=setup_cells(notebook_filename), cache=notebook_cache,
+                                    force=args.get('force'), inputs=inputs, outputs=outputs)
+
+        try:
+            self._run_notebooks_(notebook_run_cmds, execute_notebook, args.get('parallel'), args.get('workers'))
+        finally:
+            for shared_workspace in shared_workspaces:
+                shared_workspace.close()
+
+    def _max_workers_(self, workers):
+        """
+        Maximum number of notebooks run at once, from --workers, run_workers or the cores and free memory.
+        """
+        if workers is not None and workers < 1:
+            raise InvalidParameterType("--workers must be at least 1, got %d" % workers)
+        return max(1, workers or self.run_workers or utils.max_parallel_kernels(self.kernel_memory_mb))
 
-                    if not b_errors:
-                        if progress_bar:
-                            progress_bar.bar_style = 'success'
-                        else:
-                            log.info(notebook_filename + " was executed successfully.")
-                    elif b_errors and not progress_bar:
-                        log.error(notebook_filename + " execution failed.")
-
-        if args.get('parallel'):
+    def _run_notebooks_(self, notebook_run_cmds, execute_notebook, parallel, workers):
+        """
+        Runs the notebooks of a run magic one after the other or in parallel.
+        """
+        if parallel:
             futures = []
-            with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
+            # Notebooks beyond the concurrency limit wait in the executor's queue in submission order.
+            max_workers = self._max_workers_(workers)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(notebook_run_cmds)))) \
+                    as executor:
 
                 for notebook_run_cmd in notebook_run_cmds:
                     run_notebook_name, notebook_save_name, nb_params = utils.parse_run_str(notebook_run_cmd)
@@ -634,10 +803,7 @@ class PPMagics(Magics, Configurable):
 
                 # Handle other notebook runs if one or more fails intermittently
                 for future in concurrent.futures.as_completed(futures):
-                    try:
-                        future.result()
-                    except CellExecutionError:
-                        raise
+                    future.result()
         else:
             for notebook_run_cmd in notebook_run_cmds:
                 run_notebook_name, notebook_save_name, nb_params = utils.parse_run_str(notebook_run_cmd)
@@ -648,6 +814,16 @@ class PPMagics(Magics, Configurable):
     @line_magic
     @cell_magic
     @argument("-t", "--cell_timeout", type=int, default=300, help="Cell Execution Timeout. -1 to Disable.")
+    @argument("-w", "--workers", type=int, help="Maximum number of independent notebooks run at once when "
+                                                "the pipeline declares dependencies.")
+    @argument("-c", "--cache", type=bool, help="Reuse the execution of notebooks whose source, parameters and "
+                                               "upstream workspaces are unchanged. Needs declared dependencies.")
+    @argument("-f", "--force", type=bool, default=False, help="Execute notebooks even if cached and "
+                                                              "refresh the cache")
+    @argument("-r", "--resume", type=bool, default=False, help="Skip the leading notebooks that completed in a "
+                                                               "previous run and are unchanged")
+    @argument("-sf", "--shared_frames", type=bool, help="Pass the DataFrames of _pipeline_workspace['frames'] "
+                                                        "through shared memory. Needs declared dependencies.")
     @wrap_exceptions
     def run_pipeline(self, arg, line='', cell='', local_ns=None):
         """Run notebooks sequentially in a pipeline.
@@ -678,6 +854,50 @@ class PPMagics(Magics, Configurable):
                     second notebook in pipeline;
                     third notebook in pipeline:your save name key01=int key02=string key03=[param01, param02]
 
+           Dependencies between notebooks can be declared with `<-` after a notebook. Notebooks are then run as soon
+           as the notebooks they depend on completed, independent notebooks concurrently in their own kernels. Each
+           notebook starts with the _pipeline_workspace of the notebooks it depends on, frames are concatenated and
+           other keys are merged in declaration order. A notebook that is run more than once is referred to by its
+           save name.
+
+                # pipeline with two independent branches
+                Example3:
+                    %%run_pipeline -w 2
+                    extract orders;
+                    extract customers;
+                    orders features <- extract orders;
+                    customer features <- extract customers;
+                    train model <- orders features, customer features
+
+           With --cache True, a notebook of such a pipeline whose source, parameters and upstream workspaces are
+           unchanged is not executed again, its saved execution and workspace are reused.
+
+                # rerun only what changed
+                Example4:
+                    %%run_pipeline -c True
+                    extract orders;
+                    orders features <- extract orders
+
+           With --resume True, every completed notebook is checkpointed with its _pipeline_workspace and the leading
+           notebooks that completed in a previous run with --resume True are skipped as long as they and the notebooks
+           before them are unchanged, the pipeline continues with the workspace of the last completed notebook.
+
+                # continue a pipeline that failed in its third notebook
+                Example5:
+                    %%run_pipeline -r True
+                    first notebook in pipeline;
+                    second notebook in pipeline;
+                    third notebook in pipeline
+
+           With --shared_frames True, the DataFrames in _pipeline_workspace['frames'] of a pipeline with dependencies
+           are written once to shared memory and the notebooks depending on it attach to them without pickling.
+
+                # pass large frames between kernels through shared memory
+                Example6:
+                    %%run_pipeline -sf True
+                    extract orders;
+                    orders features <- extract orders
+
         """
         # save globals and locals so they can be referenced in bind vars
 
@@ -698,7 +918,7 @@ class PPMagics(Magics, Configurable):
                 line = arg
                 arg = ''
 
-        args = ParameterArgs(parse_argstring(self.run, arg))
+        args = ParameterArgs(parse_argstring(self.run_pipeline, arg))
 
         user_ns = self.shell.user_ns.copy()
         if local_ns:
@@ -710,20 +930,42 @@ class PPMagics(Magics, Configurable):
         notebook_run_cmds = cell.split(';')
         notebook_run_cmds = [notebook_run_cmd.strip() for notebook_run_cmd in notebook_run_cmds]
 
-        execute_preprocessor = ExecutePreprocessor(kernel_name='python3', timeout=args.get('cell_timeout'))
-
-        kernel_manager, kernel_comm = start_new_kernel(kernel_name='python3')
+        if pipeline.is_dag(notebook_run_cmds):
+            # Stages of pipelines with dependencies are checkpointed keyed on the workspaces of the stages they
+            # depend on, reused with --cache or --resume.
+            cache = args.get('cache') if args.get('cache') is not None else self.run_cache
+            reuse = cache or args.get('resume')
+            shared_frames = args.get('shared_frames') if args.get('shared_frames') is not None \
+                else self.pipeline_shared_frames
+            checkpoints = self._get_pipeline_checkpoints_() if reuse or self.pipeline_checkpoint else None
+            return self._run_pipeline_dag_(notebook_run_cmds, args.get('cell_timeout'), args.get('workers'),
+                                           checkpoints=checkpoints, force=args.get('force') or not reuse,
+                                           shared_frames=shared_frames)
+
+        log = UserMessages()
+        stages = [utils.parse_run_str(notebook_run_cmd) for notebook_run_cmd in notebook_run_cmds]
+        checkpoints = None
+        stage_keys = []
+        completed = 0
+        workspace_file = None
+        if self.pipeline_checkpoint or args.get('resume'):
+            checkpoints = self._get_pipeline_checkpoints_()
+            stage_keys = checkpoints.stage_keys(stages)
+        if args.get('resume'):
+            completed = checkpoints.completed_stages(stage_keys)
+            for idx in range(completed):
+                workspace_file = checkpoints.restore(stage_keys[idx], stages[idx][1])
+                if workspace_file is None:
+                    # Evicted since it was looked up, run the whole pipeline.
+                    completed = 0
+                    break
+
+        from nbconvert.preprocessors import ExecutePreprocessor, CellExecutionError
 
-        execute_preprocessor.km = kernel_manager
-        execute_preprocessor.kc = kernel_comm
+        execute_preprocessor = ExecutePreprocessor(kernel_name='python3', timeout=args.get('cell_timeout'))
 
         def execute_cell(nb4_cell):
-            try:
-                execute_preprocessor.run_cell(nb4_cell)
-            except BaseException:
-                if kernel_manager or kernel_comm:
-                    kernel_comm.stop_channels()
-                    kernel_manager.shutdown_kernel()
+            execute_preprocessor.run_cell(nb4_cell)
 
         def execute_notebook(notebook_filename, notebook_save_filename, params):
 
@@ -765,10 +1007,6 @@ class PPMagics(Magics, Configurable):
 
                     progress_bar.bar_style = 'danger'
 
-                    if kernel_manager or kernel_comm:
-                        kernel_comm.stop_channels()
-                        kernel_manager.shutdown_kernel()
-
                     raise
                 finally:
                     if notebook_save_filename:
@@ -778,17 +1016,273 @@ class PPMagics(Magics, Configurable):
                     if not b_errors:
                         progress_bar.bar_style = 'success'
 
-        execute_cell(pipeline_state_cell)
-        for notebook_run_cmd in notebook_run_cmds:
+                return notebook
 
-            run_notebook_name, notebook_save_name, nb_params = utils.parse_run_str(notebook_run_cmd)
+        kernel_pool = self._get_kernel_pool_()
+        kernel_manager, kernel_comm = kernel_pool.acquire('python3')
+        execute_preprocessor.km = kernel_manager
+        execute_preprocessor.kc = kernel_comm
+        # Kernels of failed or interrupted pipelines are shut down instead of being reused.
+        discard_kernel = True
+        try:
+            if completed:
+                log.info("Resuming pipeline after " + stages[completed - 1][0] + ".")
+                execute_cell(nbformat.v4.new_code_cell(source=load_workspace_source(workspace_file)))
+            else:
+                execute_cell(pipeline_state_cell)
+            for idx in range(completed, len(stages)):
+
+                run_notebook_name, notebook_save_name, nb_params = stages[idx]
+
+                notebook = execute_notebook(run_notebook_name, notebook_save_name, nb_params)
+                if checkpoints:
+                    checkpoint_path, checkpoint_workspace_file = checkpoints.begin()
+                    execute_cell(nbformat.v4.new_code_cell(source=save_workspace_source(checkpoint_workspace_file)))
+                    if not checkpoints.save(stage_keys[idx], checkpoint_path, notebook):
+                        log.info("Pipeline stage " + run_notebook_name + " was not checkpointed.")
+                execute_cell(clear_namespace_cell)
+            discard_kernel = False
+        finally:
+            kernel_pool.release('python3', kernel_manager, kernel_comm, discard=discard_kernel)
+
+    def _execute_notebook_(self, notebook_filename, notebook_save_filename, params, cell_timeout,
+                           allow_errors, progress_bar, setup_cells=None, teardown_cells=None,
+                           cache=None, force=False, inputs=None, outputs=None):
+        """
+        Executes a notebook on a kernel from the kernel pool and saves the execution if requested.
+        setup_cells and teardown_cells are run on the same kernel before and after the notebook's cells
+        and are not saved with the notebook.
+        With cache, the notebook cache or the pipeline checkpoints, an unchanged notebook run is restored from it,
+        unless force is set. Executions with errors are never cached.
+        """
+        from nbconvert.preprocessors import ExecutePreprocessor, CellExecutionError
+
+        log = UserMessages()
+
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key(notebook_filename, params, inputs, outputs)
+            if not force and cache.load(cache_key, notebook_save_filename, outputs):
+                log.info("Reused cached execution of " + notebook_filename + ".")
+                return
+
+        with open(notebook_filename) as file_handler:
+            notebook = nbformat.read(file_handler, as_version=4)
+        b_errors = False
+        discard_kernel = False
+        kernel_name = notebook['metadata']['kernelspec']['name']
+        execute_preprocessor = ExecutePreprocessor(timeout=cell_timeout, allow_errors=allow_errors)
+
+        if params:
+            for nb_cell in notebook.cells:
+                if nb_cell.cell_type == 'code':
+                    new_cell_source = utils.substitute_params(nb_cell.source, params)
+                    nb_cell.source = new_cell_source
+                    break
+
+        kernel_pool = self._get_kernel_pool_()
+        kernel_manager, kernel_comm = kernel_pool.acquire(kernel_name)
+        execute_preprocessor.km = kernel_manager
+        execute_preprocessor.kc = kernel_comm
+        execute_preprocessor.nb = notebook
+
+        try:
+            if progress_bar:
+
+                progress_bar = widgets.IntProgress(
+                    value=0,
+                    min=0,
+                    max=len(notebook.cells),
+                    step=1,
+                    bar_style='info',  # 'success', 'info', 'warning', 'danger' or ''
+                    orientation='horizontal'
+                )
+
+                display_label = notebook_filename
+                if notebook_save_filename:
+                    display_label = display_label + ' : ' + notebook_save_filename
+                display(widgets.HBox([widgets.Label(display_label), progress_bar]))
+            else:
+                log.info("Running Notebook: " + notebook_filename)
+
+            for setup_cell in setup_cells or []:
+                execute_preprocessor.preprocess_cell(setup_cell, resources={'metadata': {}}, cell_index=-1)
+            for idx, nb_cell in enumerate(notebook.cells):
+                execute_preprocessor.preprocess_cell(nb_cell, resources={'metadata': {}}, cell_index=idx)
+                if progress_bar:
+                    progress_bar.value = idx + 1
+            for teardown_cell in teardown_cells or []:
+                execute_preprocessor.preprocess_cell(teardown_cell, resources={'metadata': {}}, cell_index=-1)
+            if cache_key and not has_errors(notebook):
+                if not cache.store(cache_key, notebook, outputs):
+                    log.info("Execution of " + notebook_filename + " was not cached, an output is missing.")
+        except (CellExecutionError, AttributeError):
+            b_errors = True
+            if progress_bar:
+                progress_bar.bar_style = 'danger'
+            raise
+        except BaseException:
+            # Timeouts and interrupts leave the kernel in an unknown state, don't reuse it.
+            b_errors = True
+            discard_kernel = True
+            if progress_bar:
+                progress_bar.bar_style = 'danger'
+            raise
+        finally:
+            if notebook_save_filename:
+                with open(notebook_save_filename, mode='wt') as file_handler:
+                    nbformat.write(notebook, file_handler)
+
+            kernel_pool.release(kernel_name, kernel_manager, kernel_comm, discard=discard_kernel)
+
+            if not b_errors:
+                if progress_bar:
+                    progress_bar.bar_style = 'success'
+                else:
+                    log.info(notebook_filename + " was executed successfully.")
+            elif b_errors and not progress_bar:
+                log.error(notebook_filename + " execution failed.")
+
+    def _run_pipeline_dag_(self, notebook_run_cmds, cell_timeout, workers, checkpoints=None, force=False,
+                           shared_frames=False):
+        """
+        Runs pipeline stages as their dependencies complete. Every stage runs in its own pooled kernel, its
+        _pipeline_workspace is loaded from the workspaces of its dependencies and pickled once it completed.
+        With checkpoints, completed stages are checkpointed with their pickled workspace and restored instead of
+        executed while their notebook and the workspaces of their dependencies are unchanged, unless force is set.
+        With shared_frames, the DataFrames of the workspace frames are published to a shared workspace instead of
+        being pickled and the stages attach to them, stages are then not cached.
+        """
+        stages = pipeline.parse_pipeline(notebook_run_cmds)
+        workspace_dir = tempfile.mkdtemp(prefix='ppextensions-pipeline-')
+        stage_ids = dict((name, idx) for idx, name in enumerate(stages))
+        workspace_files = dict((name, os.path.join(workspace_dir, '%d.pkl' % idx)) for name, idx in stage_ids.items())
+        shared_workspace = None
+        if shared_frames:
+            from ppextensions.pputils.utils.sharedworkspace import SharedWorkspace, open_workspace_source
+            shared_workspace = SharedWorkspace()
+            checkpoints = None
+
+        def run_stage(stage):
+            load_source = ""
+            if shared_frames:
+                load_source = open_workspace_source(shared_workspace.path) + "\n"
+            load_source += "_pipeline_workspace = {'frames': list()}\n"
+            if stage.dependencies:
+                load_source += "import pickle\n" + \
+                    "for _path in %r:\n" % [workspace_files[dependency] for dependency in stage.dependencies] + \
+                    "    with open(_path, 'rb') as _file:\n" + \
+                    "        _upstream = pickle.load(_file)\n" + \
+                    "    _pipeline_workspace['frames'].extend(_upstream.pop('frames', []))\n" + \
+                    "    _pipeline_workspace.update(_upstream)\n" + \
+                    "del _path, _file, _upstream\n"
+                if shared_frames:
+                    load_source += "_pipeline_workspace['frames'] = attach_frames(_shared_workspace, " \
+                                   "_pipeline_workspace['frames'])"
+            load_workspace_cell = nbformat.v4.new_code_cell(source=load_source)
+            save_source = "import pickle\n"
+            if shared_frames:
+                save_source += "_pipeline_workspace['frames'] = share_frames(_shared_workspace, " \
+                               "_pipeline_workspace['frames'], 'stage%d')\n" % stage_ids[stage.name]
+            save_source += "with open(%r, 'wb') as _file:\n" % workspace_files[stage.name] + \
+                "    pickle.dump(_pipeline_workspace, _file, pickle.HIGHEST_PROTOCOL)\n" + \
+                "del _file"
+            save_workspace_cell = nbformat.v4.new_code_cell(source=save_source)
+            self._execute_notebook_(stage.notebook_filename, stage.notebook_save_filename, stage.params,
+                                    cell_timeout, False, True, setup_cells=[load_workspace_cell],
+                                    teardown_cells=[save_workspace_cell], cache=checkpoints, force=force,
+                                    inputs=[workspace_files[dependency] for dependency in stage.dependencies],
+                                    outputs=[workspace_files[stage.name]])
+
+        try:
+            pipeline.run_pipeline_dag(stages, run_stage, self._max_workers_(workers))
+        finally:
+            shutil.rmtree(workspace_dir, ignore_errors=True)
+            if shared_workspace is not None:
+                shared_workspace.close()
+
+    def _execute_query_(self, connection, sql, args, concurrent_sessions=0):
+        """
+        Executes the query of a SQL magic and processes its results. With --background a QueryHandle is
+        returned instead, its results are not processed. With concurrent_sessions, independent statements
+        are executed concurrently over that many sessions and are not cached. The query runs on another pooled
+        connection to the same server while the connection is busy, if the pool has one to spare.
+        """
+        pool = self._get_connection_pool_()
+        borrowed = pool.acquire_like(connection, blocking=False) if connection.busy() else None
+        if borrowed is not None:
+            connection = borrowed
+
+        def execute(status_bar=None):
+            if concurrent_sessions:
+                return connection.execute_concurrent(sql, self.autolimit, self.displaylimit, concurrent_sessions,
+                                                     self.columnar, status_bar)
+            return connection.cached_execute(self._get_query_cache_(), sql, self.autolimit, self.displaylimit,
+                                             self.progress_bar, self.columnar, refresh=args.get('no_cache'),
+                                             status_bar=status_bar)
+
+        def release():
+            if borrowed is not None:
+                pool.release(borrowed)
+
+        if args.get('background'):
+            return QueryHandle(connection, execute, sql.strip().split('\n')[0][:80], on_done=release)
+        try:
+            results = execute()
+        finally:
+            release()
+        return self._process_results_(results, args.get('tableau'), args.get('publish'), args.get('tde_name'),
+                                      args.get('project_name'))
+
+    def _get_notebook_cache_(self):
+        """
+        Notebook cache with the current cache size.
+        """
+        self.notebook_cache.max_bytes = self.run_cache_size_mb << 20
+        return self.notebook_cache
 
-            execute_notebook(run_notebook_name, notebook_save_name, nb_params)
-            execute_cell(clear_namespace_cell)
+    def _get_pipeline_checkpoints_(self):
+        """
+        Pipeline checkpoints with the current size.
+        """
+        self.pipeline_checkpoints.max_bytes = self.pipeline_checkpoint_size_mb << 20
+        return self.pipeline_checkpoints
+
+    def _get_query_cache_(self):
+        """
+        Query cache with the current cache settings, None if the query cache is disabled.
+        """
+        if not self.query_cache:
+            return None
+        self.query_results.ttl = self.query_cache_ttl
+        self.query_results.max_bytes = self.query_cache_size_mb << 20
+        return self.query_results
+
+    def _get_csv_cache_(self):
+        """
+        CSV cache with the current cache settings, None if the CSV cache is disabled.
+        """
+        if not self.csv_cache:
+            return None
+        self.csv_tables.max_bytes = self.csv_cache_size_mb << 20
+        return self.csv_tables
+
+    def _get_connection_pool_(self):
+        """
+        Connection pool shared by the SQL magics and python code, with the current pool settings.
+        """
+        connection_pool.max_size = self.connection_pool_size
+        connection_pool.idle_timeout = self.connection_idle_timeout
+        connection_pool.acquire_timeout = self.connection_acquire_timeout
+        return connection_pool
 
-        if kernel_manager or kernel_comm:
-            kernel_comm.stop_channels()
-            kernel_manager.shutdown_kernel()
+    def _get_kernel_pool_(self):
+        """
+        Kernel pool shared by run and run_pipeline, with the current pool settings.
+        """
+        self.kernel_pool.max_size = self.kernel_pool_size
+        self.kernel_pool.idle_timeout = self.kernel_idle_timeout
+        return self.kernel_pool
 
     def _process_results_(self, results, tableau=False, publish_tab=False, tde_name=None, project_name=None):
         """
@@ -803,6 +1297,7 @@ class PPMagics(Magics, Configurable):
             vertical_widgets = []
 
             if tableau and publish_tab and not b_multiple:
+                from ppextensions.pputils.utils.tableau import publish
                 publish(result, tde_name, project_name)
 
             # Add optional button and forms for input.
@@ -811,7 +1306,11 @@ class PPMagics(Magics, Configurable):
 
             if self.qgrid or b_multiple:
                 # QGrid Render
-                vertical_widgets.append(QGridCustomWidget(result_df, self.displaylimit))
+                from ppextensions.pputils.widgets.qgridwidget import QGridCustomWidget, PagedQGridWidget
+                if self.qgrid_paging and len(result_df) > self.displaylimit:
+                    vertical_widgets.append(PagedQGridWidget(result_df, self.displaylimit))
+                else:
+                    vertical_widgets.append(QGridCustomWidget(result_df, self.displaylimit))
             elif self.autoviz:
                 # AutoViz
                 return utils.register_autoviz_code(result), None
@@ -1,4 +1,11 @@
-from .connection.csvconnection import CSVConnection
-from .connection.hiveconnection import HiveConnection
-from .connection.prestoconnection import PrestoConnection
-from .connection.teradataconnection import TeradataConnection
+from ppextensions.pputils.utils.lazy import lazy_import
+
+from .connection.connectionpool import ConnectionPool, connection_pool
+
+# Engine drivers are imported with their connection, on first use.
+lazy_import(globals(), {
+    'CSVConnection': '.connection.csvconnection',
+    'HiveConnection': '.connection.hiveconnection',
+    'PrestoConnection': '.connection.prestoconnection',
+    'TeradataConnection': '.connection.teradataconnection',
+})
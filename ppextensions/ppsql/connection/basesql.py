@@ -26,11 +26,29 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """Base class for all connections. Each connection will implement this class."""
 
 import abc
+import threading
+import time
+
+from ppextensions.pputils.utils.querycache import is_cacheable, session_statements
+from ppextensions.pputils.utils.resultset import ResultSet
+from ppextensions.pputils.widgets.messages import UserMessages
+from ppextensions.pputils.widgets.widgets import StatusBar
 
 
 class BaseConnection:
+    # Identifies the server and user results come from, None if results can't be cached.
+    identity = None
+    # RPCs made to poll the progress of the last query, see pputils.utils.poller.
+    poll_stats = None
+    # Time the last query through cached_execute was executed, connections used recently need no health check.
+    last_used = 0
+
     def __init__(self, connection):
         self.connection = connection
+        # Held while a query executes, queries submitted in the background wait for the connection.
+        self.lock = threading.RLock()
+        # Session statements, such as USE and SET, executed through cached_execute.
+        self.session_changes = []
 
     def __del__(self):
         try:
@@ -40,10 +58,137 @@ class BaseConnection:
             pass
 
     @abc.abstractmethod
-    def execute(self, sql, displaylimit, progress_bar=False):
+    def execute(self, sql, limit, displaylimit, progress_bar=False, columnar=False, status_bar=None):
         """
         Executes sql.
         :param progress_bar:
         :param sql:
+        :param columnar: Store results column-wise as NumPy arrays.
+        :param status_bar: Status bar to report to instead of displaying new messages and progress bars.
         :return:
         """
+
+    def cached_execute(self, query_cache, sql, limit, displaylimit, progress_bar=False, columnar=False,
+                       refresh=False, status_bar=None):
+        """
+        Executes sql through the query cache. Queries ending with a SELECT that don't write data are answered
+        from query_cache when possible, their results are cached otherwise.
+        :param refresh: Execute even if cached and replace the cached results.
+        """
+        with self.lock:
+            changes = session_statements(sql)
+            if changes:
+                # Executed even if cached, so that the session changes.
+                result_set = self._execute_(sql, limit, displaylimit, progress_bar, columnar, status_bar)
+                self.session_changes.extend(changes)
+                return result_set
+            if query_cache is None or self.identity is None or not is_cacheable(sql):
+                return self._execute_(sql, limit, displaylimit, progress_bar, columnar, status_bar)
+            key = query_cache.key(sql, self.identity, limit, self.session_state())
+            if not refresh:
+                result_set = query_cache.load(key, displaylimit)
+                if result_set is not None:
+                    log = status_bar if status_bar is not None else UserMessages()
+                    log.info("Loaded %d cached results. Use --no_cache True to execute the query again."
+                             % len(result_set))
+                    return result_set
+            result_set = self._execute_(sql, limit, displaylimit, progress_bar, columnar, status_bar)
+            # Multi-statement requests can return a list of result sets, only single results are cached.
+            if isinstance(result_set, ResultSet):
+                query_cache.store(key, result_set)
+            return result_set
+
+    def _execute_(self, sql, limit, displaylimit, progress_bar, columnar, status_bar):
+        """
+        Executes sql and records when the connection last completed a query.
+        """
+        result_set = self.execute(sql, limit, displaylimit, progress_bar, columnar, status_bar)
+        self.last_used = time.time()
+        return result_set
+
+    def session_state(self):
+        """
+        Session statements executed on the connection so far, results of the same query differ between states.
+        """
+        return list(self.session_changes)
+
+    def new_status_bar(self):
+        """
+        Displays a status bar for a query of this connection.
+        """
+        return StatusBar()
+
+    def cancel(self):
+        """
+        Cancels the executing query.
+        :return: False if the connection doesn't support cancelling.
+        """
+        return False
+
+    def busy(self):
+        """
+        True if a query is executing on the connection.
+        """
+        if not self.lock.acquire(False):
+            return True
+        self.lock.release()
+        return False
+
+    def is_healthy(self):
+        """
+        Checks that the connection can still execute queries, connections executing a query are healthy.
+        """
+        if not self.lock.acquire(False):
+            return True
+        try:
+            return self._ping_()
+        except Exception:
+            return False
+        finally:
+            self.lock.release()
+
+    def _ping_(self):
+        """
+        Executes a trivial query, raises if the connection is broken.
+        :return: False if the connection is unusable.
+        """
+        return True
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+        if self.connection:
+            self.connection.close()
+
+    @staticmethod
+    def _close_after_(batches, close):
+        """
+        Yields from batches and calls close once they are exhausted or the generator is closed.
+        """
+        try:
+            for batch in batches:
+                yield batch
+        finally:
+            close()
+
+    @staticmethod
+    def _stream_batches_(fetchmany, keys, batch_size, as_dataframe=True, displaylimit=100, on_batch=None):
+        """
+        Yields fetched rows in batches of batch_size until the cursor is exhausted.
+        :param fetchmany: Callable taking a size and returning at most that many rows.
+        :param keys: Column names.
+        :param as_dataframe: Yield DataFrames if True else ResultSets.
+        :param on_batch: Optional callable invoked with the total rows fetched after each batch.
+        """
+        total_rows = 0
+        while True:
+            data = fetchmany(batch_size)
+            if not data:
+                break
+            total_rows += len(data)
+            result = ResultSet(keys, data, displaylimit, columnar=True)
+            del data
+            if on_batch:
+                on_batch(total_rows)
+            yield result.DataFrame() if as_dataframe else result
@@ -0,0 +1,272 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Pool of connections shared by the SQL magics and python code."""
+
+import contextlib
+import threading
+import time
+
+from ppextensions.pputils.utils.configuration import cluster_conf
+from ppextensions.pputils.utils.exceptions import ConnectionPoolTimeout
+
+
+def _create_hive_(cluster, host, port, auth, resource_manager=None):
+    from .hiveconnection import HiveConnection
+    return HiveConnection(cluster, host, port, auth, resource_manager)
+
+
+def _create_sts_(cluster, host, port, auth, resource_manager=None):
+    from .hiveconnection import HiveConnection
+    return HiveConnection(cluster, host, port, auth, resource_manager, sts=True)
+
+
+def _create_presto_(cluster, host, port, auth):
+    from .prestoconnection import PrestoConnection
+    return PrestoConnection(cluster, host, port, auth)
+
+
+def _create_teradata_(cluster, host, port, auth):
+    from .teradataconnection import TeradataConnection
+    return TeradataConnection(cluster, host)
+
+
+def _create_csv_(cluster, host, port, auth):
+    from .csvconnection import CSVConnection
+    return CSVConnection()
+
+
+FACTORIES = {
+    'hive': _create_hive_,
+    'sts': _create_sts_,
+    'presto': _create_presto_,
+    'teradata': _create_teradata_,
+    'csv': _create_csv_,
+}
+
+# Teradata logons are expensive and limited per user, keep one session.
+MAX_SIZES = {'teradata': 1, 'csv': 1}
+# Engines with named clusters in the configuration file.
+CONFIGURED_ENGINES = ('hive', 'sts', 'presto', 'teradata')
+
+
+class ConnectionPool:
+    """
+    Connections keyed by (engine, cluster, host, port, auth), with configured clusters resolved to their server, so
+    that naming a cluster or its host shares connections.
+
+    At most max_size connections are open per key (MAX_SIZES overrides it per engine), acquire waits up to
+    acquire_timeout seconds for one to be released once they are all in use. Pinned connections, held by the
+    magics across cells, don't count towards max_size, so that they never block other users. Idle connections are reused most recently released first, so that
+    consecutive queries keep their session, and are closed after idle_timeout seconds. Connections that were
+    neither checked nor used for health_check_interval seconds are checked before being handed out and replaced
+    if broken.
+    """
+
+    def __init__(self, max_size=2, idle_timeout=1800, health_check_interval=60, acquire_timeout=600, factories=None):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.factories = dict(FACTORIES, **(factories or {}))
+        self._idle = {}
+        self._open = {}
+        self._condition = threading.Condition()
+
+    def acquire(self, engine, cluster=None, host=None, port=None, auth=None, blocking=True, timeout=None, pin=False,
+                **options):
+        """
+        Connection to the given server. options are passed to the engine's factory when a connection is opened.
+        :param blocking: Wait for a connection to be released if all are in use, else return None.
+        :param timeout: Seconds to wait, acquire_timeout if None. Raises ConnectionPoolTimeout once they passed.
+        :param pin: Take the connection out of the connections counted towards max_size until it is released.
+        """
+        key = self.key(engine, cluster, host, port, auth)
+        self.evict_idle()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            connection = None
+            with self._condition:
+                while True:
+                    if self._idle.get(key):
+                        connection, _ = self._idle[key].pop()
+                        if pin:
+                            self._open[key] -= 1
+                        break
+                    if pin:
+                        break
+                    if self._open.get(key, 0) < self._max_size_(key):
+                        self._open[key] = self._open.get(key, 0) + 1
+                        break
+                    if not blocking:
+                        return None
+                    remaining = deadline - time.time() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise ConnectionPoolTimeout("No %s connection was released within %s seconds, all %d are in "
+                                                    "use." % (engine, timeout, self._open.get(key, 0)))
+                    self._condition.wait(remaining)
+            if connection is None:
+                return self._open_(key, (cluster, host, port, auth), options, pin)
+            connection.pool_pinned = pin
+            if self.check(connection):
+                return connection
+            self._close_(connection)
+
+    def release(self, connection, discard=False):
+        """
+        Returns an acquired connection to the pool. Discarded connections, and pinned ones that don't fit in the
+        pool, are closed.
+        """
+        key = connection.pool_key
+        if connection.pool_pinned:
+            with self._condition:
+                connection.pool_pinned = False
+                self._open[key] = self._open.get(key, 0) + 1
+                discard = discard or self._open[key] > self._max_size_(key)
+        if discard:
+            self._close_(connection)
+            return
+        with self._condition:
+            self._idle.setdefault(key, []).append((connection, time.time()))
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def connection(self, engine, cluster=None, host=None, port=None, auth=None, **options):
+        """
+        Context manager acquiring a connection and releasing it on exit. Connections failing their health
+        check after an error are discarded.
+
+            with connection_pool.connection('hive', cluster='cluster_name') as hive:
+                result_set = hive.execute('select * from database.table_name', 100, 100)
+        """
+        connection = self.acquire(engine, cluster, host, port, auth, **options)
+        discard = False
+        try:
+            yield connection
+        except Exception:
+            discard = not connection.is_healthy()
+            raise
+        finally:
+            self.release(connection, discard)
+
+    def acquire_like(self, connection, blocking=True):
+        """
+        Another connection to the server of an acquired connection.
+        """
+        return self.acquire(connection.pool_key[0], *connection.pool_args, blocking=blocking,
+                            **connection.pool_options)
+
+    def key(self, engine, cluster=None, host=None, port=None, auth=None):
+        """
+        Pool key of a server. Configured clusters are replaced by their host, port and auth.
+        """
+        if cluster and engine in CONFIGURED_ENGINES:
+            details = cluster_conf(engine, cluster)
+            if details:
+                cluster = None
+                host = details.get('host', host)
+                port = details.get('port', port)
+                auth = details.get('auth', auth)
+        if engine == 'teradata':
+            # Teradata connects by host only.
+            port = auth = None
+        return (engine, cluster or None, host.lower() if host else None, int(port) if port else None,
+                auth.upper() if auth else None)
+
+    def check(self, connection):
+        """
+        Checks the health of a connection unless it was checked or completed a query in the last
+        health_check_interval seconds.
+        """
+        now = time.time()
+        if now - max(connection.pool_checked, connection.last_used) < self.health_check_interval:
+            return True
+        connection.pool_checked = now
+        return connection.is_healthy()
+
+    def evict_idle(self):
+        """
+        Closes connections that have been idle for longer than idle_timeout.
+        """
+        expired = []
+        now = time.time()
+        with self._condition:
+            for key, idle_connections in self._idle.items():
+                keep = []
+                for connection, released in idle_connections:
+                    if now - released > self.idle_timeout:
+                        expired.append(connection)
+                    else:
+                        keep.append((connection, released))
+                self._idle[key] = keep
+        for connection in expired:
+            self._close_(connection)
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        with self._condition:
+            idle_connections = [connection for connections in self._idle.values() for connection, _ in connections]
+            self._idle = {}
+        for connection in idle_connections:
+            self._close_(connection)
+
+    def _open_(self, key, args, options, pin=False):
+        """
+        Opens a connection for key from the (cluster, host, port, auth) it was acquired with, a slot for it is
+        already reserved unless it is pinned.
+        """
+        try:
+            connection = self.factories[key[0]](*args, **options)
+        except BaseException:
+            if not pin:
+                self._free_slot_(key)
+            raise
+        connection.pool_key = key
+        connection.pool_args = args
+        connection.pool_options = options
+        connection.pool_checked = time.time()
+        connection.pool_pinned = pin
+        return connection
+
+    def _close_(self, connection):
+        try:
+            connection.close()
+        finally:
+            if not connection.pool_pinned:
+                self._free_slot_(connection.pool_key)
+
+    def _max_size_(self, key):
+        return MAX_SIZES.get(key[0], self.max_size)
+
+    def _free_slot_(self, key):
+        with self._condition:
+            self._open[key] = self._open.get(key, 1) - 1
+            self._condition.notify()
+
+
+connection_pool = ConnectionPool()
@@ -25,51 +25,79 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """This class enables working with CSV files. Implements BaseConnection."""
 
-import re
-import pandas as pd
+import collections
 
 from IPython import get_ipython
 
 from ppextensions.ppsql.connection.basesql import BaseConnection
-from ppextensions.pputils.utils.exceptions import InvalidParameterType
+from ppextensions.ppsql.connection.csvquery import CHUNK_SIZE, CSVQuery
+
+# Tables kept per file, each query reading other columns or rows of a file loads a table of its own.
+MAX_TABLES_PER_FILE = 4
 
 
 class CSVConnection(BaseConnection):
     first_run = True
-    dflist = []
+    # Tables persisted in sqlite, least recently used first, mapped to the file they were loaded from and its state.
+    dflist = collections.OrderedDict()
 
     def __init__(self):
         super(CSVConnection, self).__init__('')
 
-    def execute(self, sql):
-        return self._execute_csv_data_(str(sql))
+    def execute(self, sql, chunk_size=CHUNK_SIZE, cache=None):
+        return self._execute_csv_data_(str(sql), chunk_size, cache)
 
-    def _execute_csv_data_(self, query):
+    def _execute_csv_data_(self, query, chunk_size=CHUNK_SIZE, cache=None):
         """ Parse the sql query csv fields Returns the required csv results for persisted dataframe.
+            Only the columns the query references and the rows its WHERE clause may keep are loaded,
+            the file is read chunk_size rows at a time.
+            Tables are reloaded when the file changes, from cache if it holds the file in its current state.
+            Tables of earlier states of the file are dropped, and the least recently used ones once the file has
+            more than MAX_TABLES_PER_FILE.
         """
         ipython = get_ipython()
         if self.first_run:
             ipython.magic("reload_ext sql")
         self.first_run = False
-        try:
-            filename = re.split("from", query, 1, flags=re.IGNORECASE)[1].split()[0]
-            df_name = filename.replace("/", "_").replace(" ", "_").replace(".", "_").replace(":", "_").replace("-", "")
-        except BaseException:
-            raise InvalidParameterType("Problem in select query. Type the correct query and try again")
-        if df_name in self.dflist:
-            query = query.replace(filename, df_name)
-            result = ipython.magic("sql {}".format(query))
-        else:
-            query = query.replace(filename, df_name)
-            try:
-                if filename.endswith('.tsv'):
-                    exec('{}= pd.read_csv(\'{}\',sep=\'\\t\')'.format(df_name, filename))
-                else:
-                    exec('{}= pd.read_csv(\'{}\')'.format(df_name, filename))
-            except IOError:
-                raise IOError('File %s does not exist. Please type correct file name and try again' % (filename))
+        csv_query = CSVQuery(query)
+        df_name = csv_query.name()
+        loaded = (csv_query.table, csv_query.state)
+        if self.dflist.get(df_name) != loaded:
+            data_frame = self._load_(csv_query, csv_query.state, chunk_size, cache)
             ipython.magic("sql sqlite://")
+            self._evict_(ipython, csv_query, df_name)
+            ipython.user_ns[df_name] = data_frame
+            if df_name in self.dflist:
+                ipython.magic("sql DROP TABLE IF EXISTS {}".format(df_name))
             ipython.magic("sql persist {}".format(df_name))
-            self.dflist.append(df_name)
-            result = ipython.magic("sql {}".format(query))
-        return result
+            self.dflist[df_name] = loaded
+        self.dflist.move_to_end(df_name)
+        return ipython.magic("sql {}".format(csv_query.sql()))
+
+    def _evict_(self, ipython, csv_query, df_name):
+        """
+            Drops the tables and DataFrames of the query's file loaded from an earlier state of the file, and the
+            least recently used ones to make room for df_name.
+        """
+        names = [name for name, (table, _) in self.dflist.items() if table == csv_query.table and name != df_name]
+        current = [name for name in names if self.dflist[name][1] == csv_query.state]
+        evicted = [name for name in names if name not in current]
+        evicted += current[:max(0, len(current) - MAX_TABLES_PER_FILE + 1)]
+        for name in evicted:
+            ipython.user_ns.pop(name, None)
+            ipython.magic("sql DROP TABLE IF EXISTS {}".format(name))
+            del self.dflist[name]
+
+    @staticmethod
+    def _load_(csv_query, state, chunk_size, cache):
+        """
+            DataFrame of the query's file in the given state, parsed only if cache doesn't hold it.
+        """
+        if cache is None:
+            return csv_query.load(chunk_size)
+        key = cache.key(csv_query.filename, state, csv_query.sep, csv_query.columns, csv_query.where)
+        data_frame = cache.load(key)
+        if data_frame is None:
+            data_frame = csv_query.load(chunk_size)
+            cache.store(key, data_frame)
+        return data_frame
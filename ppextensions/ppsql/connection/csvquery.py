@@ -0,0 +1,435 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Projection and predicate pushdown for SQL queries on CSV files."""
+
+import functools
+import hashlib
+import operator
+import os
+import re
+
+import pandas as pd
+import sqlparse
+from sqlparse import tokens as T
+
+from ppextensions.pputils.utils.csvcache import file_state
+from ppextensions.pputils.utils.exceptions import InvalidParameterType
+
+CHUNK_SIZE = 100000
+
+# Keywords that end the WHERE clause of a single select.
+WHERE_END_KEYWORDS = {'GROUP BY', 'ORDER BY', 'LIMIT', 'HAVING', 'WINDOW', 'OFFSET'}
+# Keywords of queries that read more than one table, or the same table more than once.
+MULTI_TABLE_KEYWORDS = ('JOIN', 'UNION', 'INTERSECT', 'EXCEPT')
+
+COMPARISONS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne, '<>': operator.ne,
+               '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+# Header of every file queried, with the state of the file it was read in.
+_headers = {}
+
+
+class CSVQuery:
+    """
+    A select on a CSV file, with the columns it reads and the rows its WHERE clause can keep.
+    The file is read in chunks, so only referenced columns and rows that may match are held in memory.
+    The query itself still runs on the loaded rows, the filter only has to keep every row the query may return.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        try:
+            self.filename = re.split(r"\bfrom\b", query, 1, flags=re.IGNORECASE)[1].split()[0]
+        except IndexError:
+            raise InvalidParameterType("Problem in select query. Type the correct query and try again")
+        self.sep = '\t' if self.filename.endswith('.tsv') else ','
+        self.table = re.sub(r'[/ .:]', '_', self.filename).replace('-', '')
+        self.tokens = [token for token in sqlparse.parse(query.replace(self.filename, self.table))[0].flatten()
+                       if not token.is_whitespace and token.ttype not in T.Comment]
+        try:
+            self.state, self.header = read_header(self.filename, self.sep)
+        except IOError:
+            raise IOError('File %s does not exist. Please type correct file name and try again' % self.filename)
+        self.columns = None
+        self.predicate = None
+        self.where = ''
+        if self._single_table_():
+            self.columns = self._columns_()
+            where = self._where_tokens_()
+            self.where = ' '.join(token.value for token in where)
+            if where:
+                self.predicate = _PredicateParser(where, self._column_).parse()
+
+    def name(self):
+        """
+        Name of the table the query runs on, the rows loaded depend on the columns and filter pushed down.
+        """
+        if self.columns is None and self.predicate is None:
+            return self.table
+        pushdown = repr((self.columns, self.where)).encode('utf-8')
+        return '%s_%s' % (self.table, hashlib.sha1(pushdown).hexdigest()[:10])
+
+    def sql(self):
+        """
+        The query, reading from the table of name().
+        """
+        return self.query.replace(self.filename, self.name())
+
+    def load(self, chunk_size=CHUNK_SIZE):
+        """
+        DataFrame of the referenced columns and the rows that may match the WHERE clause.
+        """
+        chunks = []
+        first_chunk = None
+        for chunk in pd.read_csv(self.filename, sep=self.sep, usecols=self.columns, chunksize=chunk_size):
+            if first_chunk is None:
+                first_chunk = chunk.iloc[:0]
+            if self.predicate is not None:
+                mask, _ = self.predicate(chunk)
+                if mask is not None:
+                    chunk = chunk[mask.values]
+            if len(chunk):
+                chunks.append(chunk)
+        if not chunks:
+            return first_chunk if first_chunk is not None else pd.DataFrame(columns=self.columns or self.header)
+        return pd.concat(chunks, ignore_index=True)
+
+    def _single_table_(self):
+        """
+        True if the query is a single select reading the file once, where columns and rows can be pushed down.
+        """
+        if len(set(self.header)) != len(self.header):
+            return False
+        selects = sum(1 for token in self.tokens if token.ttype is T.Keyword.DML)
+        tables = sum(1 for token in self.tokens if token.value == self.table)
+        multi_table = any(token.is_keyword and any(keyword in token.normalized.upper() for keyword in MULTI_TABLE_KEYWORDS)
+                          for token in self.tokens)
+        return selects == 1 and tables == 1 and not multi_table
+
+    def _column_(self, token):
+        """
+        Header column a name token refers to, None if it names no column of the file.
+        """
+        if token.ttype in T.Literal.String.Single or token.ttype in T.Number:
+            return None
+        name = token.value
+        if name[:1] in '"`[' and len(name) > 1:
+            name = name[1:-1]
+        matches = [column for column in self.header if column.lower() == name.lower()]
+        return matches[0] if len(matches) == 1 else None
+
+    def _columns_(self):
+        """
+        Header columns referenced by the query, None if it selects all columns.
+        """
+        for previous, token in zip([None] + self.tokens, self.tokens):
+            if token.ttype is T.Wildcard and previous is not None and (
+                    previous.ttype is T.Keyword.DML or previous.value in (',', '.') or
+                    previous.normalized.upper() in ('DISTINCT', 'ALL')):
+                return None
+        referenced = set(filter(None, (self._column_(token) for token in self.tokens)))
+        # A query like count(*) references no column, one is still read to count rows.
+        return [column for column in self.header if column in referenced] or self.header[:1]
+
+    def _where_tokens_(self):
+        """
+        Tokens of the WHERE clause, without the WHERE keyword.
+        """
+        where = []
+        depth = 0
+        for token in self.tokens[[token.value for token in self.tokens].index(self.table) + 1:]:
+            keyword = ' '.join(token.normalized.upper().split()) if token.is_keyword else None
+            if depth == 0 and (keyword in WHERE_END_KEYWORDS or token.value == ';'):
+                break
+            if where:
+                depth += token.value == '('
+                depth -= token.value == ')'
+                where.append(token)
+            elif keyword == 'WHERE':
+                where.append(token)
+        return where[1:]
+
+
+def read_header(filename, sep):
+    """
+    State of a file and its column names. The header is read again only once the file changed.
+    """
+    state = file_state(filename)
+    key = (os.path.abspath(filename), sep)
+    cached = _headers.get(key)
+    if cached is None or cached[0] != state:
+        cached = (state, list(pd.read_csv(filename, sep=sep, nrows=0).columns))
+        _headers[key] = cached
+    return cached
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _PredicateParser:
+    """
+    Turns a WHERE clause into a function of a chunk, returning the mask of rows to keep and whether the mask is
+    exact. The mask is None if no rows can be ruled out. Comparisons of a column with literals of its type,
+    IN, BETWEEN and IS NULL are evaluated, other conditions keep all rows.
+    """
+
+    def __init__(self, tokens, column):
+        self.tokens = tokens
+        self.column = column
+        self.position = 0
+
+    def parse(self):
+        try:
+            predicate = self._or_()
+        except _Unsupported:
+            return None
+        return predicate if self.position == len(self.tokens) else None
+
+    def _peek_(self):
+        if self.position < len(self.tokens):
+            token = self.tokens[self.position]
+            return ' '.join(token.normalized.upper().split()) if token.is_keyword else token.value
+        return None
+
+    def _next_(self):
+        if self.position >= len(self.tokens):
+            raise _Unsupported()
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def _or_(self):
+        predicates = [self._and_()]
+        while self._peek_() == 'OR':
+            self._next_()
+            predicates.append(self._and_())
+        return predicates[0] if len(predicates) == 1 else functools.partial(_any_, predicates)
+
+    def _and_(self):
+        predicates = [self._not_()]
+        while self._peek_() == 'AND':
+            self._next_()
+            predicates.append(self._not_())
+        return predicates[0] if len(predicates) == 1 else functools.partial(_all_, predicates)
+
+    def _not_(self):
+        if self._peek_() == 'NOT':
+            self._next_()
+            return functools.partial(_negate_, self._not_())
+        return self._primary_()
+
+    def _primary_(self):
+        start = self.position
+        if self._peek_() == '(':
+            self._next_()
+            try:
+                predicate = self._or_()
+                if self._peek_() == ')':
+                    self._next_()
+                    return predicate
+            except _Unsupported:
+                pass
+            self.position = start
+        else:
+            try:
+                return self._condition_()
+            except _Unsupported:
+                self.position = start
+        self._skip_condition_()
+        return _unknown_
+
+    def _skip_condition_(self):
+        """
+        Skips a condition that can't be evaluated, up to the next AND or OR outside parentheses.
+        """
+        depth = 0
+        between = False
+        while self.position < len(self.tokens):
+            value = self._peek_()
+            if depth == 0 and value == ')':
+                break
+            if depth == 0 and value in ('AND', 'OR') and not (between and value == 'AND'):
+                break
+            if value == 'AND':
+                between = False
+            if value in ('(', 'CASE'):
+                depth += 1
+            elif value in (')', 'END'):
+                depth -= 1
+            elif depth == 0 and value in ('BETWEEN', 'NOT BETWEEN'):
+                between = True
+            self._next_()
+
+    def _condition_(self):
+        left = self._operand_()
+        keyword = self._peek_()
+        if keyword in COMPARISONS:
+            self._next_()
+            right = self._operand_()
+            if isinstance(left, _Column) and not isinstance(right, _Column):
+                return functools.partial(_compare_, left.name, COMPARISONS[keyword], right)
+            if isinstance(right, _Column) and not isinstance(left, _Column):
+                return functools.partial(_compare_, right.name, COMPARISONS[FLIPPED.get(keyword, keyword)], left)
+            raise _Unsupported()
+        if not isinstance(left, _Column):
+            raise _Unsupported()
+        negated = keyword == 'NOT'
+        if negated:
+            self._next_()
+            keyword = self._peek_()
+        if keyword == 'IS':
+            self._next_()
+            null = self._peek_()
+            if null not in ('NULL', 'NOT NULL') or negated:
+                raise _Unsupported()
+            self._next_()
+            return functools.partial(_is_null_, left.name, null == 'NULL')
+        if keyword == 'IN':
+            self._next_()
+            if self._next_().value != '(':
+                raise _Unsupported()
+            values = [self._literal_()]
+            while self._peek_() == ',':
+                self._next_()
+                values.append(self._literal_())
+            if self._next_().value != ')':
+                raise _Unsupported()
+            return functools.partial(_is_in_, left.name, values, negated)
+        if keyword in ('BETWEEN', 'NOT BETWEEN'):
+            negated = negated or keyword == 'NOT BETWEEN'
+            self._next_()
+            low = self._literal_()
+            if self._peek_() != 'AND':
+                raise _Unsupported()
+            self._next_()
+            return functools.partial(_between_, left.name, low, self._literal_(), negated)
+        raise _Unsupported()
+
+    def _operand_(self):
+        token = self.tokens[self.position] if self.position < len(self.tokens) else None
+        column = self.column(token) if token is not None else None
+        if column is not None:
+            self._next_()
+            if self._peek_() in ('(', '.'):
+                raise _Unsupported()
+            return _Column(column)
+        return self._literal_()
+
+    def _literal_(self):
+        token = self._next_()
+        sign = 1
+        if token.value in ('-', '+'):
+            sign = -1 if token.value == '-' else 1
+            token = self._next_()
+        if token.ttype in T.Number.Integer:
+            value = sign * int(token.value)
+        elif token.ttype in T.Number.Float:
+            value = sign * float(token.value)
+        elif token.ttype in T.Literal.String.Single and sign == 1:
+            value = token.value[1:-1].replace("''", "'")
+        else:
+            raise _Unsupported()
+        if self._peek_() in ('(', '.', '||', '+', '-', '*', '/', '%'):
+            raise _Unsupported()
+        return value
+
+
+class _Column:
+    def __init__(self, name):
+        self.name = name
+
+
+def _comparable_(series, value):
+    """
+    True if comparing series with value in pandas gives the result SQLite gives once the series is persisted.
+    Numbers compare with numeric columns, strings with text columns.
+    """
+    if isinstance(value, str):
+        return pd.api.types.is_string_dtype(series.dtype)
+    return pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+
+
+def _unknown_(chunk):
+    return None, False
+
+
+def _compare_(column, compare, value, chunk):
+    series = chunk[column]
+    if not _comparable_(series, value):
+        return None, False
+    try:
+        return compare(series, value) & series.notnull(), True
+    except TypeError:
+        return None, False
+
+
+def _is_null_(column, null, chunk):
+    return (chunk[column].isnull() if null else chunk[column].notnull()), True
+
+
+def _is_in_(column, values, negated, chunk):
+    series = chunk[column]
+    if not all(_comparable_(series, value) for value in values):
+        return None, False
+    mask = series.isin(values)
+    return (~mask & series.notnull() if negated else mask), True
+
+
+def _between_(column, low, high, negated, chunk):
+    series = chunk[column]
+    if not (_comparable_(series, low) and _comparable_(series, high)):
+        return None, False
+    try:
+        mask = (series < low) | (series > high) if negated else (series >= low) & (series <= high)
+    except TypeError:
+        return None, False
+    return mask & series.notnull(), True
+
+
+def _negate_(predicate, chunk):
+    # NOT of a condition on a null is null, so the complement of an exact mask may keep rows the query drops.
+    mask, exact = predicate(chunk)
+    if mask is None or not exact:
+        return None, False
+    return ~mask, False
+
+
+def _all_(predicates, chunk):
+    masks = [predicate(chunk) for predicate in predicates]
+    known = [mask for mask, _ in masks if mask is not None]
+    if not known:
+        return None, False
+    # Conditions that keep all rows are left out, the mask then keeps more rows than the query.
+    exact = len(known) == len(masks) and all(exact for _, exact in masks)
+    return functools.reduce(operator.and_, known), exact
+
+
+def _any_(predicates, chunk):
+    masks = [predicate(chunk) for predicate in predicates]
+    if any(mask is None for mask, _ in masks):
+        return None, False
+    return functools.reduce(operator.or_, (mask for mask, _ in masks)), all(exact for _, exact in masks)
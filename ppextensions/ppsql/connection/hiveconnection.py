@@ -25,23 +25,36 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """This class enables connecting to Hive2Servers. Implements BaseConnection."""
 
+import concurrent.futures
 import csv
 import getpass
 import os
 import re
+import threading
 import time
 from collections import OrderedDict
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 import sqlparse
-from hdfs3 import HDFileSystem
 from impala.dbapi import connect
 
 from ppextensions.ppsql.connection.basesql import BaseConnection
-from ppextensions.pputils import UserMessages, ResultSet
-from ppextensions.pputils.utils.configuration import conf_info
+from ppextensions.pputils import UserMessages, ResultSet, Log
+from ppextensions.pputils.utils.configuration import cluster_conf
+from ppextensions.pputils.utils.poller import Poller, IncrementalLog
 from ppextensions.pputils.utils.yarnapi import ResourceManager
 from ppextensions.pputils.widgets.widgets import StatusBar
 
+# Statements changing session state, applied to every session of concurrent executions.
+_SESSION_STATEMENT_PATTERN = re.compile(r'^(SET|RESET|USE|ADD|DELETE\s+(JAR|FILE|ARCHIVE))\b', re.IGNORECASE)
+_DDL_STATEMENT_TYPES = ('CREATE', 'CREATE OR REPLACE', 'DROP', 'ALTER')
+# Operation states of statements that are still executing.
+_ACTIVE_STATES = ('INITIALIZED_STATE', 'PENDING_STATE', 'RUNNING_STATE')
+
 
 class HiveConnection(BaseConnection):
     """
@@ -52,16 +65,18 @@ class HiveConnection(BaseConnection):
         self.sts = sts
         self.application_id = None
         self.resource_manager = None
+        # Set by cancel, the thread executing a polled statement cancels it at its next poll.
+        self.cancel_requested = threading.Event()
+        self.polling = False
         self.host = host
         self.port = port
         self.auth = auth
         self.cursor = None
-        if self.sts:
-            self.cluster_details = conf_info('sts')
-        else:
-            self.cluster_details = conf_info('hive')
-        if cluster in self.cluster_details:
-            self.cluster_details = self.cluster_details[cluster]
+        # Extra (connection, cursor) sessions of concurrent executions, new sessions replay the session settings.
+        self.sessions = []
+        self.session_settings = OrderedDict()
+        self.cluster_details = cluster_conf('sts' if self.sts else 'hive', cluster)
+        if self.cluster_details:
             self.host = self.cluster_details['host']
             self.port = self.cluster_details['port']
             self.auth = self.cluster_details['auth']
@@ -69,7 +84,8 @@ class HiveConnection(BaseConnection):
                 rm_url = self.cluster_details['resource_manager_url']
 
         if rm_url:
-            self.resource_manager = ResourceManager(rm_url)
+            self.resource_manager = ResourceManager.shared(rm_url)
+        self.identity = '%s://%s@%s:%s' % ('sts' if self.sts else 'hive', getpass.getuser(), self.host, self.port)
 
         super(HiveConnection, self).__init__(self._init_connection_())
 
@@ -80,36 +96,211 @@ class HiveConnection(BaseConnection):
 
         if self.auth.upper() == 'GSSAPI':
             HiveConnection._authecticate_()
-            connection = connect(host=self.host,
-                                 port=self.port,
-                                 auth_mechanism='GSSAPI',
-                                 kerberos_service_name='hive')
-            self.cursor = connection.cursor()
-            return connection
-        else:
-            connection = connect(host=self.host,
-                                 port=self.port,
-                                 auth_mechanism=self.auth.upper())
-            self.cursor = connection.cursor()
-            return connection
-
-    def execute(self, sql, limit, displaylimit, progress_bar=False):
+        connection = self._connect_()
+        self.cursor = connection.cursor()
+        return connection
+
+    def _connect_(self):
+        """
+            Opens a HiveServer2 session.
+        """
+        if self.auth.upper() == 'GSSAPI':
+            return connect(host=self.host,
+                           port=self.port,
+                           auth_mechanism='GSSAPI',
+                           kerberos_service_name='hive')
+        return connect(host=self.host,
+                       port=self.port,
+                       auth_mechanism=self.auth.upper())
+
+    def execute(self, sql, limit, displaylimit, progress_bar=False, columnar=False, status_bar=None):
         """
             Query Hive2Server and return results.
         """
+        log = status_bar if status_bar is not None else UserMessages()
+        if not self._execute_statements_(sql, progress_bar, log, status_bar):
+            return
+        keys = self._column_names_()
+        data = []
+        if self.cursor.description:
+            if limit:
+                data = self.cursor.fetchmany(size=limit)
+            else:
+                data = self.cursor.fetchall()
+            log.info("Fetched %d results" % len(data))
+
+        return ResultSet(keys, data, displaylimit, columnar)
+
+    def execute_stream(self, sql, batch_size, as_dataframe=True, displaylimit=100, progress_bar=False):
+        """
+            Query Hive2Server and return a generator over the results of the last statement,
+            fetched batch_size rows at a time. Only one batch is held in memory at once.
+        """
+        log = UserMessages()
+        with self.lock:
+            if not self._execute_statements_(sql, progress_bar, log):
+                return iter([])
+            if not self.cursor.description:
+                return iter([])
+            keys = self._column_names_()
+            # The stream keeps the cursor of the result, the connection continues on a new session.
+            cursor = self.cursor
+            self.cursor = self._new_session_cursor_()
+
+        def batch_fetched(total_rows):
+            log.info("Fetched %d results" % total_rows)
+
+        return self._close_after_(self._stream_batches_(cursor.fetchmany, keys, batch_size, as_dataframe,
+                                                        displaylimit, batch_fetched), cursor.close)
+
+    def execute_concurrent(self, sql, limit, displaylimit, sessions, columnar=False, status_bar=None):
+        """
+            Query Hive2Server running independent statements concurrently over up to sessions sessions.
+            SET, USE and ADD statements and DDL are barriers, the statements before them complete first.
+            SET, USE and ADD statements are applied to every session.
+            :return: ResultSet per statement other than barriers, in statement order.
+        """
+        log = status_bar if status_bar is not None else UserMessages()
+        statements = [statement.strip().strip(";") for statement in sqlparse.split(sql)]
+        statements = [statement for statement in statements if statement]
+        results = []
+        pending = []
+
+        def execute_statement(cursor, statement):
+            cursor.execute("%s" % statement)
+            data = []
+            if cursor.description:
+                data = cursor.fetchmany(size=limit) if limit else cursor.fetchall()
+            keys = [column[0] for column in cursor.description or []]
+            return ResultSet(keys, data, displaylimit, columnar)
 
+        def run_pending(cursors):
+            if not pending:
+                return
+            free_cursors = queue.Queue()
+            for cursor in cursors[:len(pending)]:
+                free_cursors.put(cursor)
+
+            def run(statement):
+                cursor = free_cursors.get()
+                try:
+                    return execute_statement(cursor, statement)
+                finally:
+                    free_cursors.put(cursor)
+
+            log.info("Executing %d statements concurrently" % len(pending))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(cursors), len(pending))) as executor:
+                results.extend(executor.map(run, pending))
+            del pending[:]
+
+        with self.lock:
+            cursors = self._session_cursors_(max(1, sessions))
+            for statement in statements:
+                if _SESSION_STATEMENT_PATTERN.match(statement):
+                    run_pending(cursors)
+                    log.info("Executing %s on %d sessions" % (statement, len(cursors)))
+                    for cursor in cursors:
+                        cursor.execute("%s" % statement)
+                    self._record_session_statement_(statement)
+                elif sqlparse.parse(statement)[0].get_type() in _DDL_STATEMENT_TYPES:
+                    run_pending(cursors)
+                    log.info("Executing %s" % statement)
+                    cursors[0].execute("%s" % statement)
+                else:
+                    pending.append(statement)
+            run_pending(cursors)
+        log.info("Executed %d statements" % len(statements))
+        return results
+
+    def _session_cursors_(self, count):
+        """
+            Cursors of count sessions, the connection's own session first. New sessions replay the session
+            statements executed so far.
+        """
         if not hasattr(self, 'connection') or not self.connection:
             self.connection = self._init_connection_()
-        log = UserMessages()
+        while len(self.sessions) < count - 1:
+            connection = self._connect_()
+            cursor = connection.cursor()
+            for statement in self.session_statements:
+                cursor.execute("%s" % statement)
+            self.sessions.append((connection, cursor))
+        return [self.cursor] + [cursor for _, cursor in self.sessions[:count - 1]]
+
+    @property
+    def session_statements(self):
+        """
+            Session statements to replay on a new session, the latest per setting, database and resource.
+        """
+        return list(self.session_settings.values())
+
+    def _record_session_statement_(self, statement):
+        """
+            Keeps the effect of a session statement on the settings, database and resources of the session.
+        """
+        words = statement.split()
+        command = words[0].upper()
+        if command == 'SET':
+            name, assigned, _ = statement[len(words[0]):].partition('=')
+            # SET without a value only shows settings.
+            if assigned:
+                self.session_settings[('SET', name.strip())] = statement
+        elif command == 'RESET':
+            names = set(words[1:])
+            for key in [key for key in self.session_settings if key[0] == 'SET']:
+                if not names or key[1] in names:
+                    del self.session_settings[key]
+        elif command == 'USE':
+            self.session_settings[('USE',)] = statement
+        elif command in ('ADD', 'DELETE') and len(words) > 1:
+            kind = words[1].upper().rstrip('S')
+            if command == 'ADD':
+                for resource in words[2:]:
+                    self.session_settings[('ADD', kind, resource)] = 'ADD %s %s' % (kind, resource)
+            else:
+                resources = set(words[2:])
+                for key in [key for key in self.session_settings if key[:2] == ('ADD', kind)]:
+                    if not resources or key[2] in resources:
+                        del self.session_settings[key]
+
+    def session_state(self):
+        """
+            Session statements executed on the connection so far, including concurrent and streamed executions.
+        """
+        return list(self.session_statements)
+
+    def _new_session_cursor_(self):
+        """
+            Cursor of a new session of the connection, with the session statements executed so far applied.
+        """
+        cursor = self.connection.cursor()
+        for statement in self.session_statements:
+            cursor.execute("%s" % statement)
+        return cursor
+
+    def _execute_statements_(self, sql, progress_bar, log, status_bar=None):
+        """
+            Executes each statement of sql on the cursor.
+            :return: False if the execution was cancelled by the user.
+        """
+        if not hasattr(self, 'connection') or not self.connection:
+            self.connection = self._init_connection_()
+        self.cancel_requested.clear()
+        # Statements of background queries are polled too, so that they can be cancelled.
+        polled = not self.sts and (status_bar is not None or progress_bar and self.resource_manager)
         try:
             for statement in sqlparse.split(sql):
                 statement = statement.strip(";")
                 log.info("Executing %s" % statement)
-                if progress_bar and self.resource_manager and not self.sts:
+                if polled:
                     self.cursor.execute_async("%s" % statement)
-                    self._progress_bar_()
+                    if not self._progress_bar_(status_bar):
+                        log.info("Cancelled the sql execution.")
+                        return False
                 else:
                     self.cursor.execute("%s" % statement)
+                if _SESSION_STATEMENT_PATTERN.match(statement):
+                    self._record_session_statement_(statement)
         except KeyboardInterrupt:
             log.info("Cancelling the sql execution.")
             self.cursor.cancel_operation()
@@ -119,26 +310,26 @@ class HiveConnection(BaseConnection):
             if not self.sts:
                 self.cursor.execute("SET hive.execution.engine=tez")
             log.info("Connected to hive.")
-            return
+            return False
+        return True
+
+    def _column_names_(self):
+        """
+            Column names of the last executed statement.
+        """
         keys = []
         if self.cursor.description is not None and isinstance(
                 self.cursor.description, list):
             for column in self.cursor.description:
                 keys.append(column[0])
-        data = []
-        if self.cursor.description:
-            if limit:
-                data = self.cursor.fetchmany(size=limit)
-            else:
-                data = self.cursor.fetchall()
-            log.info("Fetched %d results" % len(data))
-
-        return ResultSet(keys, data, displaylimit)
+        return keys
 
     def insert_csv(self, table_name, name_node_url, name_node_options, csv_file, df_flag, autolimit, displaylimit=100):
         """
         Enables insertion of CSVs or DataFrames to Hive.
         """
+        from hdfs3 import HDFileSystem
+
         if self.cluster_details:
             if 'name_node_url' in self.cluster_details:
                 name_node_url = self.cluster_details['name_node_url']
@@ -166,7 +357,8 @@ class HiveConnection(BaseConnection):
         command = drop_table_command + '\n' + create_table_command
         if df_flag:
             os.system("rm %s" % csv_file)
-        return self.execute(command, autolimit, displaylimit)
+        with self.lock:
+            return self.execute(command, autolimit, displaylimit)
 
     @staticmethod
     def get_fieldnames(csv_file):
@@ -214,6 +406,17 @@ class HiveConnection(BaseConnection):
             data_dict = OrderedDict(zip(fieldnames, dtype))
             return data_dict
 
+    def cancel(self):
+        """
+            Cancels the executing statement. The cursor can't be used from two threads, the executing thread
+            cancels the statement at its next poll. Statements executed without polling can't be cancelled.
+            :return: False if no statement is polled.
+        """
+        if not self.polling:
+            return False
+        self.cancel_requested.set()
+        return True
+
     def _get_status_(self):
         """
             Get connection status.
@@ -226,41 +429,64 @@ class HiveConnection(BaseConnection):
         Gives progress of application id.
         :return:
         """
-        if self.application_id:
+        if self.application_id and self.resource_manager:
             # Ignoring the errors and marching. Error in getting progress shouldn't fail the sql execution.
-            app_info = self.resource_manager.cluster_application(
+            app_info = self.resource_manager.running_application(
                 self.application_id, ignore_errors=True)
             if app_info and 'app' in app_info and 'progress' in app_info['app']:
                 return app_info['app']['progress']
         return 0
 
-    def _progress_bar_(self):
+    def _progress_bar_(self, status_bar=None):
         """
-        Creates progress bar and updates status.
-        :return:
+        Creates progress bar, unless one is given, and updates status until the statement completes.
+        Status, new log lines and YARN progress are fetched once per tick with exponential backoff between
+        ticks. The number of RPCs is kept in poll_stats and logged.
+        :return: False if the statement was cancelled.
         """
-        if self._get_status_() == 'RUNNING_STATE':
-            status_bar = StatusBar()
-        elif self._get_status_() == "FINISHED_STATE":
-            return
-        progress = self._get_progress_()
-        while self._get_status_() == 'RUNNING_STATE':
-            status_bar.update_status(progress)
-            if progress > 0:
-                status_bar.update_info_message("{:0.2f}% - {} ".format(progress, self.application_id))
-            logs = self.cursor.get_log()
-            log_lines = logs.split("\n")
-            log_info = log_lines[len(log_lines) - 1]
-            if log_info:
-                status_bar.update_info_message(log_info)
-            if logs:
-                self._update_app_id_(logs)
-            time.sleep(1)
-            progress = self._get_progress_()
-        if self._get_status_() == "ERROR_STATE":
-            raise Exception(self.cursor.get_log())
-        elif self._get_status_() == "FINISHED_STATE":
-            status_bar.update_status_success("Execution completed.")
+        poller = Poller()
+        query_log = IncrementalLog()
+        self.application_id = None
+        self.polling = True
+        try:
+            status = poller.call('status', self._get_status_)
+            if status == "FINISHED_STATE":
+                return True
+            if status_bar is None:
+                status_bar = StatusBar()
+            while status in _ACTIVE_STATES:
+                status_bar.update_progress(*self._poll_progress_(poller, query_log))
+                poller.wait(self.cancel_requested)
+                if self.cancel_requested.is_set():
+                    poller.call('cancel', self.cursor.cancel_operation)
+                    return False
+                status = poller.call('status', self._get_status_)
+            if status == "ERROR_STATE":
+                query_log.update(poller.call('log', self.cursor.get_log))
+                raise Exception(query_log.text)
+            elif status == "FINISHED_STATE":
+                status_bar.update_status_success("Execution completed.")
+            return True
+        finally:
+            self.polling = False
+            self.poll_stats = poller.stats()
+            Log('hiveconnection').info("Polled hive query", application_id=self.application_id, **self.poll_stats)
+
+    def _poll_progress_(self, poller, query_log):
+        """
+        Fetches the new log lines and the YARN progress of the running statement.
+        :return: Progress and the message to show.
+        """
+        new_logs = query_log.update(poller.call('log', self.cursor.get_log))
+        if new_logs and not self.application_id:
+            self._update_app_id_(new_logs)
+        progress = 0
+        if self.application_id:
+            progress = poller.call('yarn', self._get_progress_)
+        message = query_log.last_line(new_logs)
+        if message is None and progress > 0:
+            message = "{:0.2f}% - {} ".format(progress, self.application_id)
+        return progress, message
 
     def _update_app_id_(self, logs):
         """
@@ -316,10 +542,29 @@ class HiveConnection(BaseConnection):
                         "check your password and restart the "
                         "kernel with correct password.")
 
+    def close(self):
+        self._close_connection_()
+
+    def _ping_(self):
+        # On a cursor of its own, so that the result of the last query stays readable.
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+
     def _close_connection_(self):
         """
             Closes hiveserver2 connection.
         """
+        for connection, cursor in getattr(self, 'sessions', []):
+            try:
+                cursor.close()
+                connection.close()
+            except BaseException:
+                pass
         try:
             if self.cursor:
                 self.cursor.close()
@@ -31,16 +31,15 @@ import os
 import sqlalchemy
 
 from ppextensions.ppsql.connection.basesql import BaseConnection
-from ppextensions.pputils import PrestoStatusBar, ResultSet
-from ppextensions.pputils.utils.configuration import conf_info
+from ppextensions.pputils import PrestoStatusBar, ResultSet, Log
+from ppextensions.pputils.utils.configuration import cluster_conf
 
 
 class PrestoConnection(BaseConnection):
     def __init__(self, cluster, host, port, auth):
 
-        self.cluster_details = conf_info('presto')
-        if cluster in self.cluster_details:
-            self.cluster_details = self.cluster_details[cluster]
+        self.cluster_details = cluster_conf('presto', cluster)
+        if self.cluster_details:
             host = self.cluster_details['host']
             port = self.cluster_details['port']
             auth = self.cluster_details['auth']
@@ -49,14 +48,20 @@ class PrestoConnection(BaseConnection):
             PrestoConnection._authecticate_()
         engine = sqlalchemy.create_engine("presto://%s:%d/" % (host, port))
         self.session = None
+        self.cursor = None
+        self.identity = 'presto://%s@%s:%s' % (getpass.getuser(), host, port)
         super(PrestoConnection, self).__init__(engine)
 
-    def execute(self, sql, limit, displaylimit, progress_bar):
+    def execute(self, sql, limit, displaylimit, progress_bar, columnar=False, status_bar=None):
         if progress_bar is False:
-            return self._execute_without_progress_bar_(sql, limit, displaylimit)
+            return self._execute_without_progress_bar_(sql, limit, displaylimit, columnar)
 
-        cursor = self.connection.execute("%s" % sql).cursor
-        PrestoStatusBar(cursor)
+        cursor = self.cursor = self.connection.execute("%s" % sql).cursor
+        if status_bar is None:
+            status_bar = PrestoStatusBar(cursor, run=False)
+        status_bar.run(cursor)
+        self.poll_stats = status_bar.poll_stats
+        Log('prestoconnection').info("Polled presto query", **(self.poll_stats or {}))
 
         keys = []
         if cursor.description is not None and isinstance(cursor.description, list):
@@ -67,20 +72,83 @@ class PrestoConnection(BaseConnection):
         else:
             data = cursor.fetchall()
 
-        return ResultSet(keys, data, displaylimit)
+        return ResultSet(keys, data, displaylimit, columnar)
 
-    def _execute_without_progress_bar_(self, sql, limit, displaylimit):
+    def _execute_without_progress_bar_(self, sql, limit, displaylimit, columnar=False):
         if self.session is None:
             self.session = self.connection.connect()
 
         result = self.session.execute("%s" % sql)
+        self.cursor = result.cursor
         keys = result.keys()
         if limit:
             data = result.fetchmany(size=limit)
         else:
             data = result.fetchall()
         result.close()
-        return ResultSet(keys, data, displaylimit)
+        return ResultSet(keys, data, displaylimit, columnar)
+
+    def execute_stream(self, sql, batch_size, as_dataframe=True, displaylimit=100, progress_bar=False):
+        """
+            Query Presto and return a generator over the results, fetched batch_size rows at a time.
+            Rows are pulled page by page as Presto produces them, so only one batch is held in memory.
+        """
+        if progress_bar is False:
+            with self.lock:
+                if self.session is None:
+                    self.session = self.connection.connect()
+                result = self.session.execute("%s" % sql)
+            keys = list(result.keys())
+            return self._close_after_(self._stream_batches_(result.fetchmany, keys, batch_size,
+                                                            as_dataframe, displaylimit), result.close)
+
+        cursor = self.connection.execute("%s" % sql).cursor
+        status_bar = PrestoStatusBar(cursor, run=False)
+
+        keys = []
+        if cursor.description is not None and isinstance(cursor.description, list):
+            for column in cursor.description:
+                keys.append(column[0])
+
+        def batch_fetched(total_rows):
+            # Polling fetches the next page, which also refreshes the query stats.
+            status = status_bar.update_stats(cursor.poll())
+            if status:
+                status_bar.update_info_message("%s - %d/%d tasks completed, %d rows fetched" % (
+                    status, status_bar.completed_tasks, status_bar.total_tasks, total_rows))
+
+        def batches():
+            for batch in self._stream_batches_(cursor.fetchmany, keys, batch_size, as_dataframe,
+                                               displaylimit, batch_fetched):
+                yield batch
+            status_bar.update_status_success('Execution Completed.')
+
+        return batches()
+
+    def new_status_bar(self):
+        """
+            Displays a Presto status bar, run on the query's cursor once it is submitted.
+        """
+        return PrestoStatusBar(None, run=False)
+
+    def cancel(self):
+        """
+            Cancels the executing query.
+        """
+        if self.cursor is None:
+            return False
+        self.cursor.cancel()
+        return True
+
+    def close(self):
+        """
+            Closes the pooled connections of the engine.
+        """
+        self.connection.dispose()
+
+    def _ping_(self):
+        self.connection.execute("SELECT 1").fetchall()
+        return True
 
     @staticmethod
     def _authecticate_():
@@ -29,7 +29,9 @@ import collections
 import datetime
 import decimal
 import getpass
+import time
 
+import numpy
 import pandas
 import sqlparse
 import teradata
@@ -42,7 +44,8 @@ from pygments.token import Keyword, Name, Comment, String, Number
 
 from ppextensions.ppsql.connection.basesql import BaseConnection
 from ppextensions.pputils import UserMessages, ResultSet, Log
-from ppextensions.pputils.utils.configuration import conf_info
+from ppextensions.pputils.utils.configuration import cluster_conf
+from ppextensions.pputils.utils.schema import infer_schema
 
 
 class TeradataConnection(BaseConnection):
@@ -51,21 +54,21 @@ class TeradataConnection(BaseConnection):
     """
 
     def __init__(self, cluster, host):
-        self.cluster_details = conf_info('teradata')
-        if cluster in self.cluster_details:
-            self.cluster_details = self.cluster_details[cluster]
+        self.cluster_details = cluster_conf('teradata', cluster)
+        if self.cluster_details:
             host = self.cluster_details['host']
         uda_exec = teradata.UdaExec(appName="Jupyter Notebooks", version="1.0", logConsole=False)
         password = TeradataConnection._get_password_()
         connection = uda_exec.connect(method="odbc", system=host, username=getpass.getuser(), password=password.replace('$', '$$'))
+        self.identity = 'teradata://%s@%s' % (getpass.getuser(), host)
         super(TeradataConnection, self).__init__(connection)
 
-    def execute(self, sql, limit, displaylimit, progress_bar=False):
+    def execute(self, sql, limit, displaylimit, progress_bar=False, columnar=False, status_bar=None):
         """
             Query Teradata and return results.
         """
 
-        log = UserMessages()
+        log = status_bar if status_bar is not None else UserMessages()
 
         def process_result(result, exec_statement=''):
             keys = []
@@ -77,7 +80,9 @@ class TeradataConnection(BaseConnection):
             else:
                 data = result.fetchall()
             log.info("Fetched %d out of %d records" % (len(data), result.rowcount))
-            return_result = ResultSet(keys, data, displaylimit)
+            # Show query output is read back row-wise below, keep it as rows.
+            return_result = ResultSet(keys, data, displaylimit,
+                                      columnar and not exec_statement.strip().startswith("show"))
 
             # Formats show query output
             if exec_statement.strip().startswith("show"):
@@ -115,7 +120,11 @@ class TeradataConnection(BaseConnection):
             )
             return result_set
 
-    def insert_csv(self, table_name, df_name, autolimit, displaylimit):
+    def _ping_(self):
+        self.connection.execute("SELECT 1").fetchall()
+        return True
+
+    def insert_csv(self, table_name, df_name, autolimit, displaylimit, batch_size=10000):
         """
             Function to insert dataframe or csv to Teradata.
         """
@@ -131,22 +140,59 @@ class TeradataConnection(BaseConnection):
         create_table_command = "CREATE TABLE {} ({})" \
             .format(table_name, data_type_list)
 
-        # Insert Value  command for inserting records into table
-        insert_command = TeradataConnection.create_insert_command(df_name, table_name, data_dict)
+        with self.lock:
+            try:
+                self.execute(create_table_command, autolimit, displaylimit)
+            except teradata.api.DatabaseError as err:
+                # Teradata names the table without its database in the error.
+                unqualified_name = table_name.split(".", 1)[-1]
+                if "Table '%s' already exists" % unqualified_name in str(err):
+                    pass
+                else:
+                    raise
+            return self.bulk_insert(table_name, df_name, data_dict, batch_size)
 
-        try:
-            self.execute(create_table_command, autolimit, displaylimit)
-        except teradata.api.DatabaseError as err:
-            table_args = table_name.split(".", 1)
-            if len(table_args) > 1:
-                table_name = table_args[1]
-            else:
-                table_name = table_args[0]
-            if "Table '%s' already exists" % table_name in str(err):
-                pass
-            else:
-                raise
-        return self.execute(insert_command, autolimit, displaylimit)
+    def bulk_insert(self, table_name, df_name, data_dict, batch_size=10000):
+        """
+            Inserts the dataframe with bound parameters, batch_size rows per executemany call.
+            Columns are converted once, as a whole, instead of cell by cell.
+        """
+        log = UserMessages()
+        fieldnames = [TeradataConnection._column_name_(col) for col in df_name]
+        insert_command = "insert into {} ({}) values ({})".format(
+            table_name, ', '.join(fieldnames), ', '.join(['?'] * len(fieldnames)))
+        columns = [TeradataConnection._column_values_(df_name[col], data_dict[col_name])
+                   for col, col_name in zip(df_name, fieldnames)]
+
+        total_rows = len(df_name)
+        start_time = time.time()
+        for start in range(0, total_rows, batch_size):
+            rows = list(zip(*[column[start:start + batch_size] for column in columns]))
+            self.connection.executemany(insert_command, rows, batch=True)
+            inserted_rows = start + len(rows)
+            elapsed = max(time.time() - start_time, 1e-6)
+            log.info("Inserted %d of %d rows into %s (%d rows/sec)" % (
+                inserted_rows, total_rows, table_name, inserted_rows / elapsed))
+
+    @staticmethod
+    def _column_name_(col):
+        """
+            Column name without the table prefix.
+        """
+        col_name = col.split('.')
+        return col_name[1] if len(col_name) > 1 else col_name[0]
+
+    @staticmethod
+    def _column_values_(column, data_type):
+        """
+            Converts a dataframe column to an object array of parameter values with None for nulls.
+            Numeric columns keep their values, all other columns are sent as strings.
+        """
+        if data_type in ("int", "float", "decimal"):
+            values = column.astype(object).values
+        else:
+            values = column.astype(str).values.astype(object)
+        return numpy.where(column.isnull().values, None, values)
 
     @staticmethod
     def df_datatype(df_name):
@@ -154,8 +200,6 @@ class TeradataConnection(BaseConnection):
             Function to get the corresponding teradata data types for all dataframe columns
         """
         log = Log('', filename='/tmp/logs/teradataconnection.log')
-        data_type = []
-        fieldnames = []
         data_type_map = {int: "int",
                          str: "varchar(1000)",
                          bytearray: "byte(1200)",
@@ -167,13 +211,8 @@ class TeradataConnection(BaseConnection):
                          pandas.Timestamp: "TIMESTAMP",
                          pandas.NaT: "TIMESTAMP"
                          }
-        for col in df_name:
-            col_name = col.split('.')
-            if col_name:
-                col_name = col_name[1] if len(col_name) > 1 else col_name[0]
-            fieldnames.append(col_name)
-            data_type.append(df_name[col].apply(type).iat[0])
-        data_dict = dict(zip(fieldnames, data_type))
+        data_dict = dict((TeradataConnection._column_name_(col), col_type)
+                         for col, col_type in infer_schema(df_name).items())
 
         for col_name in data_dict:
             if data_dict[col_name] in data_type_map:
@@ -185,34 +224,6 @@ class TeradataConnection(BaseConnection):
         data_dict = collections.OrderedDict(sorted(data_dict.items()))
         return data_dict
 
-    @staticmethod
-    def create_insert_command(df_name, table_name, data_dict):
-        """
-            Function to create insert command for all the dataframe/csv values.
-        """
-        value_list = []
-        for _, row in df_name.iterrows():
-            row_value = []
-            for col in df_name:
-                col_name = col.split('.')
-                if col_name:
-                    col_name = col_name[1] if len(col_name) > 1 else col_name[0]
-                if pandas.isnull(row[col]):
-                    row_value.append('Null')
-                elif data_dict[col_name] == "float" or data_dict[
-                        col_name] == "int" or data_dict[col_name] == "decimal":
-                    row_value.append(str(row[col]))
-                else:
-                    row_value.append("'" + str(row[col]) + "'")
-            row_value = tuple(row_value)
-            value_list.append(row_value)
-        value_list = tuple(value_list)
-        insert_statement = '\n;insert into %s values' % table_name
-        insert_value = "insert into %s values" % table_name + \
-                       insert_statement.join("(%s)" % ",".join(str(i)
-                                                               for i in row) for row in value_list)
-        return insert_value
-
     @staticmethod
     def _get_password_():
         """
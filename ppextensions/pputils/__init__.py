@@ -1,8 +1,13 @@
 from .widgets import ParameterWidgets
 from .utils import ParameterArgs, WidgetType, FileSystemReaderWriter, conf_info
 from .utils import Log
-from .utils.tableau import publish
 from .utils.exceptions import wrap_exceptions
+from .utils.lazy import lazy_import
 from .widgets.widgets import PrestoStatusBar
 from .widgets.messages import UserMessages
-from .utils.resultset import ResultSet
+
+# Tableau, paramiko and pandas, and ipython-sql for result sets, are imported on first use.
+lazy_import(globals(), {
+    'publish': '.utils.tableau',
+    'ResultSet': '.utils.resultset',
+})
@@ -1,5 +1,5 @@
 from .parameterargs import ParameterArgs, WidgetType
 from .filesystemreader import FileSystemReaderWriter
-from .configuration import conf_info
+from .configuration import conf_info, cluster_conf, set_overlay
 from .constants import HOME_PATH, CONFIG_FILE
 from .log import Log
@@ -0,0 +1,166 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Checkpoints of completed run_pipeline stages."""
+
+import os
+import shutil
+
+import nbformat
+
+from .diskcache import DiskCache, content_hash, file_hash
+
+NOTEBOOK_FILE = 'notebook.ipynb'
+WORKSPACE_FILE = 'workspace.pkl'
+
+
+class PipelineCheckpoints(DiskCache):
+    """
+    The executed notebook and the pickled _pipeline_workspace after every completed stage of a pipeline.
+    A stage of a sequential pipeline is keyed on its notebook source and parameters and on the key of the stage
+    before it, so the checkpoint of a stage is only valid while every stage up to it is unchanged. A stage of a
+    pipeline with dependencies is keyed on its notebook source, parameters and the workspaces it starts from.
+    """
+
+    def stage_keys(self, stages):
+        """
+        Chained checkpoint keys of (notebook filename, notebook save filename, params) stages.
+        """
+        keys = []
+        previous_key = ''
+        for notebook_filename, _, params in stages:
+            with open(notebook_filename, 'rb') as file_handler:
+                notebook_source = file_handler.read()
+            previous_key = content_hash(previous_key, notebook_source, sorted((params or {}).items()))
+            keys.append(previous_key)
+        return keys
+
+    def completed_stages(self, keys):
+        """
+        Number of leading stages that have a checkpoint.
+        """
+        completed = 0
+        for key in keys:
+            if self.get(key) is None:
+                break
+            completed += 1
+        return completed
+
+    def restore(self, key, notebook_save_filename=None):
+        """
+        Writes the checkpointed notebook to notebook_save_filename.
+        :return: Path of the pickled workspace of the stage, None if the checkpoint is gone.
+        """
+        entry_path = self.get(key)
+        if entry_path is None:
+            return None
+        if notebook_save_filename:
+            shutil.copyfile(os.path.join(entry_path, NOTEBOOK_FILE), notebook_save_filename)
+        return os.path.join(entry_path, WORKSPACE_FILE)
+
+    def key(self, notebook_filename, params, inputs=None, outputs=None):
+        """
+        Checkpoint key of a stage of a pipeline with dependencies, the inputs are the workspaces of the stages it
+        depends on. Its output is its own workspace, written to a new path every run, so outputs are not part of
+        the key.
+        """
+        with open(notebook_filename, 'rb') as file_handler:
+            notebook_source = file_handler.read()
+        input_hashes = [file_hash(path) for path in inputs or []]
+        return content_hash(notebook_source, sorted((params or {}).items()), input_hashes)
+
+    def load(self, key, notebook_save_filename=None, outputs=None):
+        """
+        Restores the checkpoint of a stage of a pipeline with dependencies: writes the executed notebook to
+        notebook_save_filename and the workspace to the single path in outputs.
+        :return: True if the stage was checkpointed.
+        """
+        workspace_file = self.restore(key, notebook_save_filename)
+        if workspace_file is None:
+            return False
+        for output in outputs or []:
+            shutil.copyfile(workspace_file, output)
+        return True
+
+    def store(self, key, notebook, outputs=None):
+        """
+        Checkpoints a stage of a pipeline with dependencies from its executed notebook and the workspace it
+        pickled to the single path in outputs.
+        :return: False if the workspace is missing, nothing is checkpointed then.
+        """
+        new_entry_path, workspace_file = self.begin()
+        try:
+            for output in outputs or []:
+                shutil.copyfile(output, workspace_file)
+        except (IOError, OSError):
+            self.discard(new_entry_path)
+            return False
+        return self.save(key, new_entry_path, notebook)
+
+    def begin(self):
+        """
+        Starts a checkpoint.
+        :return: Checkpoint directory and the path the workspace should be pickled to.
+        """
+        new_entry_path = self.create()
+        return new_entry_path, os.path.join(new_entry_path, WORKSPACE_FILE)
+
+    def save(self, key, new_entry_path, notebook):
+        """
+        Completes a checkpoint started with begin once the workspace was pickled.
+        :return: False if the workspace could not be pickled, nothing is checkpointed then.
+        """
+        if not os.path.exists(os.path.join(new_entry_path, WORKSPACE_FILE)):
+            self.discard(new_entry_path)
+            return False
+        with open(os.path.join(new_entry_path, NOTEBOOK_FILE), mode='wt') as file_handler:
+            nbformat.write(notebook, file_handler)
+        self.commit(key, new_entry_path)
+        return True
+
+
+def save_workspace_source(path):
+    """
+    Source of a cell pickling _pipeline_workspace to path. Workspaces that can't be pickled are skipped.
+    """
+    return "import os, pickle\n" + \
+        "try:\n" + \
+        "    with open(%r, 'wb') as _file:\n" % path + \
+        "        pickle.dump(_pipeline_workspace, _file, pickle.HIGHEST_PROTOCOL)\n" + \
+        "    del _file\n" + \
+        "except Exception as _error:\n" + \
+        "    if os.path.exists(%r):\n" % path + \
+        "        os.remove(%r)\n" % path + \
+        "    print('Workspace not checkpointed: ' + str(_error))"
+
+
+def load_workspace_source(path):
+    """
+    Source of a cell loading _pipeline_workspace from a pickle at path.
+    """
+    return "import pickle\n" + \
+        "with open(%r, 'rb') as _file:\n" % path + \
+        "    _pipeline_workspace = pickle.load(_file)\n" + \
+        "del _file"
@@ -25,13 +25,33 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """Configuration management for PPExtensions."""
 
+import copy
 import json
 import os
+import threading
 
 from ppextensions.pputils.utils import FileSystemReaderWriter
 from ppextensions.pputils.utils.constants import HOME_PATH, CONFIG_FILE
+from ppextensions.pputils.utils.exceptions import ConfigurationException
 
 PATH = os.path.join(HOME_PATH, CONFIG_FILE)
+# JSON object merged over the configuration file, e.g. '{"hive": {"cluster_name": {"port": 10001}}}'.
+OVERLAY_ENV = "PPMAGICS_CONF_OVERLAY"
+
+# Required and optional settings, and their types, of the clusters of each engine.
+CLUSTER_SCHEMAS = {
+    'hive': ({'host': str, 'port': int, 'auth': str},
+             {'resource_manager_url': str, 'name_node_url': str, 'name_node_opts': dict}),
+    'sts': ({'host': str, 'port': int, 'auth': str},
+            {'resource_manager_url': str, 'name_node_url': str, 'name_node_opts': dict}),
+    'presto': ({'host': str, 'port': int, 'auth': str}, {}),
+    'teradata': ({'host': str}, {}),
+}
+# Required and optional settings of engines configured without clusters.
+ENGINE_SCHEMAS = {
+    # Credentials missing from the configuration are prompted for.
+    'tableau': ({}, {'site_name': str, 'user_name': str, 'password': str}),
+}
 
 
 def load_conf(path, fsrw_class=None):
@@ -53,14 +73,184 @@ def load_conf(path, fsrw_class=None):
     return conf_details
 
 
+def validate_conf(engine, engine_details):
+    """
+    Checks the configuration of an engine against its schema. Numbers given as strings are converted.
+    :return: The validated configuration.
+    """
+    if not isinstance(engine_details, dict):
+        raise ConfigurationException("Configuration of %s must be an object." % engine)
+    if engine in ENGINE_SCHEMAS:
+        return _validate_settings_(engine, engine_details, *ENGINE_SCHEMAS[engine])
+    if engine in CLUSTER_SCHEMAS:
+        return dict((cluster, _validate_settings_("%s.%s" % (engine, cluster), details, *CLUSTER_SCHEMAS[engine]))
+                    for cluster, details in engine_details.items())
+    return engine_details
+
+
+def validate_cluster(engine, cluster, engine_details):
+    """
+    Checks the configuration of one cluster of an engine against its schema, the other clusters aren't checked.
+    :return: The validated configuration of the cluster, an empty dictionary if it is not configured.
+    """
+    if not isinstance(engine_details, dict):
+        raise ConfigurationException("Configuration of %s must be an object." % engine)
+    if cluster not in engine_details:
+        return {}
+    if engine not in CLUSTER_SCHEMAS:
+        return engine_details[cluster]
+    return _validate_settings_("%s.%s" % (engine, cluster), engine_details[cluster], *CLUSTER_SCHEMAS[engine])
+
+
+def _validate_settings_(name, settings, required, optional):
+    if not isinstance(settings, dict):
+        raise ConfigurationException("Configuration of %s must be an object." % name)
+    settings = dict(settings)
+    for key in required:
+        if key not in settings:
+            raise ConfigurationException("Configuration of %s is missing %s." % (name, key))
+    for key, value_type in list(required.items()) + list(optional.items()):
+        if key not in settings or isinstance(settings[key], value_type):
+            continue
+        try:
+            if value_type is dict:
+                raise ValueError()
+            settings[key] = value_type(settings[key])
+        except (TypeError, ValueError):
+            raise ConfigurationException("%s of %s must be of type %s, got %r." % (
+                key, name, value_type.__name__, settings[key]))
+    return settings
+
+
+def _merge_(base, overlay):
+    """
+    Copy of base with overlay merged in, nested objects are merged key by key.
+    """
+    merged = copy.deepcopy(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+class Configuration:
+    """
+    Process wide configuration. The file is read and parsed once and again only when its size or modification
+    time change, every other call costs a stat. Engines and clusters are validated when first used, a broken
+    cluster doesn't affect the other clusters of its engine. The overlay,
+    from the PPMAGICS_CONF_OVERLAY environment variable or set_overlay, is merged over the file.
+    Returned dictionaries are shared and must not be modified.
+    """
+
+    def __init__(self, path=PATH):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        # File stat, merged configuration and validated engines and clusters, replaced together on reload.
+        self._state = (None, None, {})
+        self._overlay = None
+
+    def get(self):
+        """
+        The whole configuration, with the overlay applied.
+        """
+        return self._load_()[1]
+
+    def engine(self, engine):
+        """
+        Validated configuration of engine, an empty dictionary if it is not configured.
+        """
+        _, conf_details, sections = self._load_()
+        if engine not in sections:
+            section = validate_conf(engine, conf_details[engine]) if engine in conf_details else {}
+            with self._lock:
+                sections.setdefault(engine, section)
+        return sections[engine]
+
+    def cluster(self, engine, cluster):
+        """
+        Validated configuration of a cluster of engine, an empty dictionary if it is not configured.
+        """
+        if not cluster:
+            return {}
+        _, conf_details, sections = self._load_()
+        key = (engine, cluster)
+        if key not in sections:
+            section = validate_cluster(engine, cluster, conf_details[engine]) if engine in conf_details else {}
+            with self._lock:
+                sections.setdefault(key, section)
+        return sections[key]
+
+    def set_overlay(self, overlay):
+        """
+        Replaces the overlay merged over the configuration file, the PPMAGICS_CONF_OVERLAY one included.
+        """
+        with self._lock:
+            self._overlay = overlay or {}
+            self._state = (None, None, {})
+
+    def _load_(self):
+        """
+        Current state, the file is read again if it changed since it was last read.
+        """
+        state = self._state
+        if state[1] is not None and self._file_stat_() == state[0]:
+            return state
+        with self._lock:
+            stat = self._file_stat_()
+            if self._state[1] is None or stat != self._state[0]:
+                conf_details = load_conf(self.path)
+                if not isinstance(conf_details, dict):
+                    raise ConfigurationException("Configuration in %s must be an object." % self.path)
+                if self._overlay is None:
+                    self._overlay = Configuration._env_overlay_()
+                if stat is None:
+                    # load_conf created the file.
+                    stat = self._file_stat_()
+                self._state = (stat, _merge_(conf_details, self._overlay), {})
+            return self._state
+
+    def _file_stat_(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _env_overlay_():
+        overlay = os.environ.get(OVERLAY_ENV, "").strip()
+        if not overlay:
+            return {}
+        try:
+            overlay = json.loads(overlay)
+        except ValueError as error:
+            raise ConfigurationException("%s is not valid JSON: %s" % (OVERLAY_ENV, error))
+        if not isinstance(overlay, dict):
+            raise ConfigurationException("%s must be a JSON object." % OVERLAY_ENV)
+        return overlay
+
+
+configuration = Configuration()
+
+
 def conf_info(engine):
     """
     Returns a dictionary of configuration by reading from the configuration file.
     """
-    conf_details = load_conf(PATH)
-    config_dict = {}
+    return configuration.engine(engine)
+
+
+def cluster_conf(engine, cluster):
+    """
+    Returns the configuration of a named cluster of engine, empty if the cluster is not configured.
+    """
+    return configuration.cluster(engine, cluster)
 
-    if engine in conf_details:
-        config_dict = conf_details[engine]
 
-    return config_dict
+def set_overlay(overlay):
+    """
+    Merges overlay, a dictionary in the format of the configuration file, over the configuration file.
+    """
+    configuration.set_overlay(overlay)
@@ -29,3 +29,4 @@ import os
 
 HOME_PATH = os.environ.get("PPMAGICS_CONF_DIR", "~/.ppextensions")
 CONFIG_FILE = os.environ.get("PPMAGICS_CONF_FILE", "config.json")
+CACHE_DIR = os.environ.get("PPMAGICS_CACHE_DIR", os.path.join(HOME_PATH, "cache"))
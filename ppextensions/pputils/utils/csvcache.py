@@ -0,0 +1,83 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""DataFrames parsed from CSV files, cached on local disk across sessions."""
+
+import os
+import pickle
+
+from .diskcache import DiskCache, content_hash
+
+DATA_FRAME_FILE = 'data_frame.pkl'
+
+
+def file_state(path):
+    """
+    Modification time in nanoseconds and size of a file, they change when the file is edited.
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CSVCache(DiskCache):
+    """
+    DataFrames loaded from CSV files, keyed on the path, modification time and size of the file and on how it was
+    read. Editing a file changes the key of its entries, the stale ones are evicted once they are least recently used.
+    """
+
+    def key(self, path, state, *read_options):
+        """
+        Cache key of a file in the given state, read with read_options.
+        """
+        return content_hash(os.path.abspath(path), list(state), list(read_options))
+
+    def load(self, key):
+        """
+        Cached DataFrame of key, None if there is no valid entry.
+        """
+        entry_path = self.get(key)
+        if entry_path is None:
+            return None
+        try:
+            with open(os.path.join(entry_path, DATA_FRAME_FILE), 'rb') as file_handler:
+                return pickle.load(file_handler)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Entries pickled by another pandas version may not load.
+            self.invalidate(key)
+            return None
+
+    def store(self, key, data_frame):
+        """
+        Caches a DataFrame.
+        """
+        new_entry_path = self.create()
+        try:
+            with open(os.path.join(new_entry_path, DATA_FRAME_FILE), 'wb') as file_handler:
+                pickle.dump(data_frame, file_handler, pickle.HIGHEST_PROTOCOL)
+        except (IOError, OSError, pickle.PicklingError):
+            self.discard(new_entry_path)
+            return False
+        self.commit(key, new_entry_path)
+        return True
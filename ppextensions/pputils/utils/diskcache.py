@@ -0,0 +1,195 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Size bounded, least recently used cache of entries on local disk."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+ENTRY_FILE = '.entry'
+
+
+def content_hash(*parts):
+    """
+    Hex sha256 digest of the given strings, bytes or JSON serializable values.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            if not isinstance(part, str):
+                part = json.dumps(part, sort_keys=True, default=str)
+            part = part.encode('utf-8')
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Hex sha256 digest of the content of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file_handler:
+        for chunk in iter(lambda: file_handler.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Cache of entries stored as directories under a cache directory, one per key.
+    Entries older than ttl seconds are treated as missing. Once the entries take more than max_bytes,
+    the least recently used ones are removed.
+    """
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def get(self, key):
+        """
+        Directory of the entry for key, None if there is no valid entry.
+        """
+        entry_path = os.path.join(self.directory, key)
+        entry_file = os.path.join(entry_path, ENTRY_FILE)
+        try:
+            with open(entry_file) as file_handler:
+                created = json.load(file_handler)['created']
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        if self.ttl and time.time() - created > self.ttl:
+            self.invalidate(key)
+            return None
+        # The entry file's mtime is the last access time used for eviction.
+        try:
+            os.utime(entry_file, None)
+        except OSError:
+            # Evicted by another process in the meantime.
+            return None
+        return entry_path
+
+    def create(self):
+        """
+        Creates an empty directory for a new entry, to be filled and passed to commit.
+        """
+        self._ensure_directory_()
+        return tempfile.mkdtemp(prefix='.new-', dir=self.directory)
+
+    def commit(self, key, new_entry_path):
+        """
+        Makes a directory returned by create the entry for key, replacing an existing entry.
+        """
+        with open(os.path.join(new_entry_path, ENTRY_FILE), 'w') as file_handler:
+            json.dump({'created': time.time()}, file_handler)
+        entry_path = os.path.join(self.directory, key)
+        self.invalidate(key)
+        try:
+            os.rename(new_entry_path, entry_path)
+        except OSError:
+            # Another process committed the same key in the meantime.
+            shutil.rmtree(new_entry_path, ignore_errors=True)
+        self.evict()
+        return entry_path
+
+    def discard(self, new_entry_path):
+        """
+        Removes a directory returned by create that won't be committed.
+        """
+        shutil.rmtree(new_entry_path, ignore_errors=True)
+
+    def invalidate(self, key=None):
+        """
+        Removes the entry for key, or every entry if key is None.
+        """
+        if key is None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        else:
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+    def invalidate_prefix(self, prefix):
+        """
+        Removes the entries whose key starts with prefix.
+        """
+        for key in self._keys_():
+            if key.startswith(prefix):
+                self.invalidate(key)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+        """
+        entries = []
+        total_bytes = 0
+        for key in self._keys_():
+            entry_path = os.path.join(self.directory, key)
+            try:
+                last_access = os.path.getmtime(os.path.join(entry_path, ENTRY_FILE))
+            except OSError:
+                continue
+            size = DiskCache._size_(entry_path)
+            entries.append((last_access, key, size))
+            total_bytes += size
+        for _, key, size in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self.invalidate(key)
+            total_bytes -= size
+
+    def _keys_(self):
+        """
+        Keys of committed entries.
+        """
+        try:
+            return [name for name in os.listdir(self.directory) if not name.startswith('.')]
+        except OSError:
+            return []
+
+    def _ensure_directory_(self):
+        """
+        Creates the cache directory.
+        """
+        try:
+            os.makedirs(self.directory)
+        except OSError:
+            if not os.path.isdir(self.directory):
+                raise
+
+    @staticmethod
+    def _size_(path):
+        """
+        Total size of the files under path.
+        """
+        size = 0
+        for root, _, file_names in os.walk(path):
+            for file_name in file_names:
+                try:
+                    size += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass
+        return size
@@ -86,6 +86,24 @@ class ResourceManagerException(Exception):
         Exception.__init__(self, message)
 
 
+class ConfigurationException(Exception):
+    """
+    Exception for invalid PPExtensions configuration.
+    """
+
+    def __init__(self, message):
+        Exception.__init__(self, message)
+
+
+class ConnectionPoolTimeout(Exception):
+    """
+    Exception raised when no pooled connection is released in time.
+    """
+
+    def __init__(self, message):
+        Exception.__init__(self, message)
+
+
 class DownloadException(Exception):
     """
     Exception to describe download errors.
@@ -98,18 +116,23 @@ class DownloadException(Exception):
 def wrap_exceptions(function_name):
     """
     A decorator that wraps the passed in function and logs
-    exceptions should one occur
+    exceptions should one occur. The log is created on the first
+    exception, so decorating starts no logging at import time.
     """
+    log = None
 
     @functools.wraps(function_name)
     def wrapper(*args, **kwargs):
+        nonlocal log
         try:
             return function_name(*args, **kwargs)
         except Exception as error_msg:
             # log the exception
-            log = Log(function_name.__name__, 'wrap_exception')
+            if log is None:
+                log = Log(function_name.__name__, 'wrap_exception')
             error_formatted_message = '{}: {}'.format(error_msg.__class__.__name__, error_msg)
-            log.exception(error_formatted_message)
+            log.exception(error_formatted_message, function=function_name.__name__,
+                          error=error_msg.__class__.__name__)
             get_ipython().write_err(error_formatted_message)
             raise error_msg
     return wrapper
@@ -0,0 +1,220 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Pool of started Jupyter kernels for notebook runs."""
+
+import atexit
+import threading
+import time
+
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+from jupyter_client.manager import start_new_kernel
+
+# Run when a kernel starts, records the process state restored before the kernel is reused.
+SNAPSHOT_CODE = """import os as _os, sys as _sys
+_sys._ppextensions_baseline_ = (_os.getcwd(), list(_sys.path), set(_sys.modules), dict(_os.environ))
+del _os, _sys"""
+# Restores the working directory, sys.path, os.environ and sys.modules of the snapshot, then clears the namespace.
+RESET_CODE = """def _ppextensions_restore_():
+    import os, sys
+    cwd, path, modules, environ = sys._ppextensions_baseline_
+    os.chdir(cwd)
+    sys.path[:] = path
+    for name in set(sys.modules) - modules:
+        del sys.modules[name]
+    os.environ.clear()
+    os.environ.update(environ)
+_ppextensions_restore_()
+get_ipython().run_line_magic('reset', '-f')
+__import__('gc').collect()"""
+
+
+class KernelPool:
+    """
+    Keeps started kernels per kernel name so that notebook runs skip kernel startup.
+    Kernels are reset when released, at most max_size idle kernels are kept per kernel name
+    and kernels idle for longer than idle_timeout seconds are shut down.
+
+    A reset restores the namespace, working directory, sys.path, os.environ and the set of imported
+    modules the kernel started with. Changes to modules imported at startup, open files and started
+    threads survive it, kernels that can't be reset, such as non IPython kernels, are shut down.
+    """
+
+    def __init__(self, max_size=4, idle_timeout=600, reset_timeout=30):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.reset_timeout = reset_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+        atexit.register(self.shutdown)
+
+    def acquire(self, kernel_name):
+        """
+        Returns a kernel manager and client for kernel_name. Idle kernels are reused, otherwise a new
+        kernel is started.
+        """
+        while True:
+            with self._lock:
+                idle_kernels = self._idle.get(kernel_name)
+                if not idle_kernels:
+                    break
+                kernel_manager, kernel_client, _ = idle_kernels.pop()
+            if kernel_manager.is_alive():
+                return kernel_manager, kernel_client
+            KernelPool._shutdown_kernel_(kernel_manager, kernel_client)
+        return self._start_(kernel_name)
+
+    def release(self, kernel_name, kernel_manager, kernel_client, discard=False):
+        """
+        Returns a kernel to the pool after resetting its namespace. Kernels that are discarded,
+        dead, fail to reset or don't fit in the pool are shut down.
+        """
+        if not discard and kernel_manager.is_alive() and self._reset_(kernel_client):
+            with self._lock:
+                idle_kernels = self._idle.setdefault(kernel_name, [])
+                if len(idle_kernels) < self.max_size:
+                    idle_kernels.append((kernel_manager, kernel_client, time.time()))
+                    self._start_sweeper_()
+                    return
+        KernelPool._shutdown_kernel_(kernel_manager, kernel_client)
+
+    def prestart(self, kernel_name, count=1):
+        """
+        Starts kernels in the background until count kernels of kernel_name are idle.
+        """
+        def start():
+            with self._lock:
+                missing = count - len(self._idle.get(kernel_name, []))
+            for _ in range(missing):
+                kernel_manager, kernel_client = self._start_(kernel_name)
+                self.release(kernel_name, kernel_manager, kernel_client)
+
+        thread = threading.Thread(target=start, name='kernel-pool-prestart')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def evict_idle(self):
+        """
+        Shuts down kernels that have been idle for longer than idle_timeout.
+        """
+        expired = []
+        now = time.time()
+        with self._lock:
+            for kernel_name, idle_kernels in self._idle.items():
+                keep = []
+                for kernel in idle_kernels:
+                    if now - kernel[2] > self.idle_timeout:
+                        expired.append(kernel)
+                    else:
+                        keep.append(kernel)
+                self._idle[kernel_name] = keep
+        for kernel_manager, kernel_client, _ in expired:
+            KernelPool._shutdown_kernel_(kernel_manager, kernel_client)
+
+    def shutdown(self):
+        """
+        Shuts down all idle kernels.
+        """
+        with self._lock:
+            idle_kernels = [kernel for kernels in self._idle.values() for kernel in kernels]
+            self._idle = {}
+        for kernel_manager, kernel_client, _ in idle_kernels:
+            KernelPool._shutdown_kernel_(kernel_manager, kernel_client)
+
+    def _start_sweeper_(self):
+        """
+        Starts the background thread evicting idle kernels. Called with the lock held.
+        """
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+
+        def sweep():
+            while True:
+                time.sleep(max(min(self.idle_timeout, 60), 1))
+                self.evict_idle()
+                with self._lock:
+                    if not any(self._idle.values()):
+                        self._sweeper = None
+                        return
+
+        self._sweeper = threading.Thread(target=sweep, name='kernel-pool-sweeper')
+        self._sweeper.daemon = True
+        self._sweeper.start()
+
+    def _start_(self, kernel_name):
+        """
+        Starts a kernel and records its state for resets.
+        """
+        kernel_manager, kernel_client = start_new_kernel(kernel_name=kernel_name)
+        # Kernels without a snapshot fail to reset and are shut down when released.
+        self._run_silently_(kernel_client, SNAPSHOT_CODE)
+        return kernel_manager, kernel_client
+
+    def _reset_(self, kernel_client):
+        """
+        Restores the state a kernel started with.
+        :return: True if the kernel was reset.
+        """
+        return self._run_silently_(kernel_client, RESET_CODE)
+
+    def _run_silently_(self, kernel_client, code):
+        """
+        Executes code on a kernel and drains its pending output messages.
+        :return: True if the code ran without error.
+        """
+        try:
+            msg_id = kernel_client.execute(code, silent=True, store_history=False)
+            deadline = time.time() + self.reset_timeout
+            reply = None
+            while reply is None:
+                msg = kernel_client.get_shell_msg(timeout=max(deadline - time.time(), 0))
+                if msg['parent_header'].get('msg_id') == msg_id:
+                    reply = msg
+        except Exception:
+            # Includes Empty, the kernel did not answer within reset_timeout.
+            return False
+        try:
+            while True:
+                kernel_client.get_iopub_msg(timeout=0)
+        except Empty:
+            pass
+        return reply['content']['status'] == 'ok'
+
+    @staticmethod
+    def _shutdown_kernel_(kernel_manager, kernel_client):
+        """
+        Stops the channels and shuts down the kernel, ignoring errors of already dead kernels.
+        """
+        try:
+            kernel_client.stop_channels()
+            kernel_manager.shutdown_kernel(now=True)
+        except Exception:
+            pass
@@ -0,0 +1,67 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Deferred imports of heavy dependencies."""
+
+import importlib
+import sys
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Module calling its module level __getattr__ for missing attributes, as Python 3.7 does for every module.
+    """
+
+    def __getattr__(self, name):
+        module_getattr = self.__dict__.get('__getattr__')
+        if module_getattr is None:
+            raise AttributeError("module %r has no attribute %r" % (self.__name__, name))
+        return module_getattr(name)
+
+
+def lazy_import(module_globals, attributes):
+    """
+    Makes attributes of a module import on first access (PEP 562), so that importing the module doesn't import
+    engine drivers and UI libraries that may never be used. Before Python 3.7 the module's class is replaced by one
+    implementing PEP 562.
+    :param module_globals: globals() of the module.
+    :param attributes: Module, absolute or relative to the module's package, of each attribute name.
+    """
+    package = module_globals['__package__']
+
+    def load(name):
+        value = getattr(importlib.import_module(attributes[name], package), name)
+        module_globals[name] = value
+        return value
+
+    def __getattr__(name):
+        if name in attributes:
+            return load(name)
+        raise AttributeError("module %r has no attribute %r" % (module_globals['__name__'], name))
+
+    module_globals['__getattr__'] = __getattr__
+    if sys.version_info < (3, 7):
+        sys.modules[module_globals['__name__']].__class__ = _LazyModule
@@ -25,67 +25,125 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """Enables Logging for PPExtensions."""
 
-import logging
+import atexit
 import getpass
+import logging
+import logging.handlers
 import os
+import queue
+import threading
 
 from pathlib import Path
 
+LOG_FILE = '{}/logs/ppextensions.log'.format(str(Path.home()))
+# Log files are rotated once they reach MAX_BYTES, BACKUP_COUNT rotated files are kept.
+MAX_BYTES = 10 << 20
+BACKUP_COUNT = 5
+FORMAT = '%(asctime)-4s %(levelname)-4s %(name)-4s {} pid=%(process)d thread=%(threadName)s %(message)s'.format(
+    getpass.getuser())
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records with the fields passed to Log appended as key=value pairs.
+    """
+
+    def formatMessage(self, record):
+        message = super(StructuredFormatter, self).formatMessage(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message = '%s %s' % (message, ' '.join('%s=%s' % (key, fields[key]) for key in sorted(fields)))
+        return message
+
+
+class LazyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that creates the log directory and opens the file on the first record.
+    """
+
+    def __init__(self, filename):
+        super(LazyRotatingFileHandler, self).__init__(filename, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT,
+                                                      delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super(LazyRotatingFileHandler, self)._open()
+
+
+def _queue_handler_(filename):
+    """
+    Handler queueing records for filename. A background thread per file writes them, so logging
+    never blocks on the file system. Queued records are written at exit.
+    """
+    with _handlers_lock:
+        if filename not in _handlers:
+            records = queue.Queue(-1)
+            # Records are formatted when queued, the thread only writes them.
+            handler = logging.handlers.QueueHandler(records)
+            handler.setFormatter(StructuredFormatter(FORMAT, datefmt='%m-%d %H:%M:%S'))
+            listener = logging.handlers.QueueListener(records, LazyRotatingFileHandler(filename))
+            listener.start()
+            atexit.register(listener.stop)
+            _handlers[filename] = handler
+        return _handlers[filename]
+
 
 class Log:
     """
     Custom Logging for PPExtensions.
+    Loggers are named ppextensions.<logger_name> and write to filename through a queue, constructing a Log
+    doesn't touch the file system.
     """
 
-    def __init__(self, logger_name, module='',
-                 filename='{}/logs/ppextensions.log'.format(str(Path.home())),
-                 level=logging.INFO):
+    def __init__(self, logger_name, module='', filename=LOG_FILE, level=logging.INFO):
         self.logger_name = logger_name
         self._module = module
-        if not os.path.isdir("{}/logs/".format(str(Path.home()))):
-            os.mkdir("{}/logs/".format(str(Path.home())))
-        logging.basicConfig(
-            filename=filename,
-            level=level,
-            format='%(asctime)-4s %(levelname)-4s %(name)-4s {} %(message)s'.format(getpass.getuser()),
-            datefmt='%m-%d %H:%M:%S'
-        )
+        self._filename = os.path.expanduser(filename)
+        self._level = level
         self._init_logger_()
 
     def _init_logger_(self):
         """
         Initialize logger.
         """
-        self.logger = logging.getLogger(self.logger_name)
+        self.logger = logging.getLogger('ppextensions.%s' % self.logger_name if self.logger_name else 'ppextensions')
+        self.logger.setLevel(self._level)
+        self.logger.propagate = False
+        handler = _queue_handler_(self._filename)
+        if handler not in self.logger.handlers:
+            self.logger.addHandler(handler)
 
-    def debug(self, message):
+    def debug(self, message, **fields):
         """
-        Logging debug messages.
+        Logging debug messages. fields are logged as key=value pairs.
         """
-        self.logger.debug(self._format_message_(message))
+        self.logger.debug(self._format_message_(message), extra={'fields': fields})
 
-    def error(self, message):
+    def error(self, message, **fields):
         """
         Logging error messages.
         """
-        self.logger.error(self._format_message_(message))
+        self.logger.error(self._format_message_(message), extra={'fields': fields})
 
-    def info(self, message):
+    def info(self, message, **fields):
         """
         Logging info.
         """
-        self.logger.info(self._format_message_(message))
+        self.logger.info(self._format_message_(message), extra={'fields': fields})
 
-    def exception(self, message):
+    def exception(self, message, **fields):
         """
         Logging exceptions.
         """
-        self.logger.exception(self._format_message_(message))
+        self.logger.exception(self._format_message_(message), extra={'fields': fields})
 
     def _format_message_(self, message):
         """
         Formatting log messages.
         """
-        if self._module is None or len(self._module) is 0:
+        if not self._module:
             return message
         return '{} {}'.format(self._module, message)
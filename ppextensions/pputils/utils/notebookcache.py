@@ -0,0 +1,97 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Cache of executed notebooks for run and run_pipeline."""
+
+import os
+import shutil
+
+import nbformat
+
+from .diskcache import DiskCache, content_hash, file_hash
+
+NOTEBOOK_FILE = 'notebook.ipynb'
+OUTPUTS_DIR = 'outputs'
+
+
+def has_errors(notebook):
+    """
+    True if a cell of an executed notebook has an error output, as left by runs that allow errors.
+    """
+    return any(output.get('output_type') == 'error'
+               for nb_cell in notebook.cells if nb_cell.cell_type == 'code'
+               for output in nb_cell.get('outputs', []))
+
+
+class NotebookCache(DiskCache):
+    """
+    Executed notebooks and their declared output files, keyed on the notebook source, the run
+    parameters, the content of the declared input files and the paths of the declared output files.
+    """
+
+    def key(self, notebook_filename, params, inputs=None, outputs=None):
+        """
+        Cache key of a notebook run.
+        """
+        with open(notebook_filename, 'rb') as file_handler:
+            notebook_source = file_handler.read()
+        # Inputs are identified by their content only, the same data under another path is a hit.
+        input_hashes = [file_hash(path) for path in inputs or []]
+        # Outputs are identified by their path, a run writing other files is a different run.
+        output_paths = [os.path.abspath(path) for path in outputs or []]
+        return content_hash(notebook_source, sorted((params or {}).items()), input_hashes, output_paths)
+
+    def load(self, key, notebook_save_filename=None, outputs=None):
+        """
+        Restores a cached run: writes the executed notebook to notebook_save_filename and the
+        declared outputs to their paths.
+        :return: True if the run was in the cache.
+        """
+        entry_path = self.get(key)
+        if entry_path is None:
+            return False
+        if notebook_save_filename:
+            shutil.copyfile(os.path.join(entry_path, NOTEBOOK_FILE), notebook_save_filename)
+        for idx, output in enumerate(outputs or []):
+            shutil.copyfile(os.path.join(entry_path, OUTPUTS_DIR, str(idx)), output)
+        return True
+
+    def store(self, key, notebook, outputs=None):
+        """
+        Caches an executed notebook and copies of its declared outputs.
+        :return: False if an output could not be copied, the run is then not cached.
+        """
+        new_entry_path = self.create()
+        try:
+            with open(os.path.join(new_entry_path, NOTEBOOK_FILE), mode='wt') as file_handler:
+                nbformat.write(notebook, file_handler)
+            os.mkdir(os.path.join(new_entry_path, OUTPUTS_DIR))
+            for idx, output in enumerate(outputs or []):
+                shutil.copyfile(output, os.path.join(new_entry_path, OUTPUTS_DIR, str(idx)))
+        except (IOError, OSError):
+            self.discard(new_entry_path)
+            return False
+        self.commit(key, new_entry_path)
+        return True
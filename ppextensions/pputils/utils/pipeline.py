@@ -0,0 +1,155 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Dependency aware scheduling of notebook pipelines."""
+
+import collections
+import concurrent.futures
+import os
+
+from ppextensions.pputils.utils.exceptions import InvalidParameterType
+from ppextensions.pputils.utils.utils import parse_run_str
+
+DEPENDENCY_SEPARATOR = '<-'
+
+
+class PipelineStage:
+    """
+    A notebook run in a pipeline and the names of the stages it depends on.
+    """
+
+    def __init__(self, name, notebook_filename, notebook_save_filename, params, dependencies):
+        self.name = name
+        self.notebook_filename = notebook_filename
+        self.notebook_save_filename = notebook_save_filename
+        self.params = params
+        self.dependencies = dependencies
+
+
+def is_dag(notebook_run_cmds):
+    """
+    True if any pipeline entry declares dependencies.
+    """
+    return any(DEPENDENCY_SEPARATOR in notebook_run_cmd for notebook_run_cmd in notebook_run_cmds)
+
+
+def stage_name(notebook_name):
+    """
+    Name a stage is referred to by: the notebook name with the .ipynb extension.
+    """
+    notebook_name = notebook_name.strip()
+    _, ext = os.path.splitext(notebook_name)
+    if ext == '':
+        notebook_name = notebook_name + '.ipynb'
+    return notebook_name
+
+
+def parse_pipeline(notebook_run_cmds):
+    """
+    Parses pipeline entries of the form `notebook[:save notebook] [params] [<- dependency, dependency]`.
+    A stage is named by its save notebook if given, otherwise by its notebook.
+    :return: OrderedDict of stage name to PipelineStage, in the order the stages were declared.
+    """
+    stages = collections.OrderedDict()
+    for notebook_run_cmd in notebook_run_cmds:
+        if not notebook_run_cmd:
+            continue
+        run_str, _, dependency_str = notebook_run_cmd.partition(DEPENDENCY_SEPARATOR)
+        notebook_filename, notebook_save_filename, params = parse_run_str(run_str.strip())
+        name = stage_name(notebook_save_filename or notebook_filename)
+        if name in stages:
+            raise InvalidParameterType("Stage %s is declared more than once. Use a save name to run a "
+                                       "notebook more than once in a pipeline." % name)
+        dependencies = [stage_name(dependency) for dependency in dependency_str.split(',') if dependency.strip()]
+        stages[name] = PipelineStage(name, notebook_filename, notebook_save_filename, params, dependencies)
+
+    for stage in stages.values():
+        for dependency in stage.dependencies:
+            if dependency not in stages:
+                raise InvalidParameterType("Stage %s depends on unknown stage %s." % (stage.name, dependency))
+    topological_order(stages)
+    return stages
+
+
+def topological_order(stages):
+    """
+    Stage names ordered so that every stage comes after its dependencies.
+    Raises InvalidParameterType if the dependencies contain a cycle.
+    """
+    order = []
+    state = {}
+
+    for name in stages:
+        if state.get(name) == 'done':
+            continue
+        state[name] = 'visiting'
+        stack = [(name, iter(stages[name].dependencies))]
+        while stack:
+            current, dependencies = stack[-1]
+            dependency = next(dependencies, None)
+            if dependency is None:
+                stack.pop()
+                state[current] = 'done'
+                order.append(current)
+            elif state.get(dependency) == 'visiting':
+                raise InvalidParameterType("Pipeline has a dependency cycle through %s." % dependency)
+            elif state.get(dependency) != 'done':
+                state[dependency] = 'visiting'
+                stack.append((dependency, iter(stages[dependency].dependencies)))
+    return order
+
+
+def run_pipeline_dag(stages, run_stage, max_workers):
+    """
+    Runs every stage once all of its dependencies completed, independent stages concurrently.
+    :param run_stage: Callable executing a PipelineStage.
+    :param max_workers: Maximum number of stages run at once.
+    Stops scheduling new stages on the first failure and raises it once running stages finished.
+    """
+    remaining = collections.OrderedDict((name, set(stage.dependencies)) for name, stage in stages.items())
+    completed = set()
+    running = {}
+    error = None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        while remaining or running:
+            if error is None:
+                for name in [name for name, dependencies in remaining.items() if dependencies <= completed]:
+                    del remaining[name]
+                    running[executor.submit(run_stage, stages[name])] = name
+            if not running:
+                break
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    completed.add(name)
+                except BaseException as exc:
+                    if error is None:
+                        error = exc
+    if error is not None:
+        raise error
+    return completed
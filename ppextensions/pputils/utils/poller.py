@@ -0,0 +1,134 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Polling of running queries with exponential backoff."""
+
+import collections
+import time
+
+# Seconds between the first polls, and the cap the interval grows to for long running queries.
+INITIAL_INTERVAL = 1.0
+MAX_INTERVAL = 10.0
+BACKOFF_FACTOR = 1.5
+
+
+class Backoff:
+    """
+    Intervals between polls, starting at initial and multiplied by factor after every poll up to maximum.
+    """
+
+    def __init__(self, initial=INITIAL_INTERVAL, maximum=MAX_INTERVAL, factor=BACKOFF_FACTOR):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.interval = initial
+
+    def next(self):
+        """
+        Interval before the next poll.
+        """
+        interval = self.interval
+        self.interval = min(self.interval * self.factor, self.maximum)
+        return interval
+
+    def reset(self):
+        self.interval = self.initial
+
+
+class Poller:
+    """
+    Polls a running query once per tick, sleeping with exponential backoff between ticks, and counts the
+    RPCs made for the query.
+    """
+
+    def __init__(self, backoff=None):
+        self.backoff = backoff if backoff is not None else Backoff()
+        self.rpcs = collections.Counter()
+        self.ticks = 0
+        self.started = time.time()
+
+    def call(self, rpc, function, *args, **kwargs):
+        """
+        Calls function, counted as an rpc call.
+        """
+        self.rpcs[rpc] += 1
+        return function(*args, **kwargs)
+
+    def wait(self, event=None):
+        """
+        Sleeps until the next tick, or until event is set.
+        """
+        self.ticks += 1
+        if event is not None:
+            event.wait(self.backoff.next())
+        else:
+            time.sleep(self.backoff.next())
+
+    def stats(self):
+        """
+        Number of RPCs per kind, their total, the number of ticks and the seconds spent polling.
+        """
+        stats = dict(self.rpcs)
+        stats['total'] = sum(self.rpcs.values())
+        stats['ticks'] = self.ticks
+        stats['seconds'] = round(time.time() - self.started, 1)
+        return stats
+
+    def summary(self):
+        stats = self.stats()
+        counts = ', '.join('%s: %d' % (rpc, count) for rpc, count in sorted(self.rpcs.items()))
+        return "%d RPCs in %d ticks over %ss (%s)" % (stats['total'], stats['ticks'], stats['seconds'], counts)
+
+
+class IncrementalLog:
+    """
+    Log of a query, accumulated from calls that return either the whole log or only the lines since the last
+    call. Only the new part is handed back, so logs are scanned once however long the query runs.
+    """
+
+    def __init__(self):
+        self.text = ''
+
+    def update(self, log):
+        """
+        Adds log and returns the part of it not seen before.
+        """
+        if not log:
+            return ''
+        if log.startswith(self.text):
+            new = log[len(self.text):]
+            self.text = log
+        else:
+            new = log if not self.text else '\n' + log
+            self.text += new
+        return new
+
+    @staticmethod
+    def last_line(new):
+        """
+        Last non empty line of new.
+        """
+        lines = [line for line in new.split('\n') if line.strip()]
+        return lines[-1] if lines else None
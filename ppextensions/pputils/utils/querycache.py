@@ -0,0 +1,140 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Cache of SQL query results."""
+
+import os
+import pickle
+import re
+
+import sqlparse
+
+from .diskcache import DiskCache, content_hash
+
+RESULT_FILE = 'result.pkl'
+WRITE_STATEMENT_TYPES = {'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'REPLACE', 'UPSERT', 'CREATE', 'CREATE OR REPLACE',
+                         'DROP', 'ALTER', 'TRUNCATE', 'RENAME', 'GRANT', 'REVOKE'}
+# Statements that change what later queries of the session return.
+SESSION_STATEMENT_PATTERN = re.compile(r'^(SET|RESET|USE|DATABASE)\b', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """
+    SQL without comments, with uppercase keywords and whitespace only where it separates words, so that
+    formatting changes don't change the cache key.
+    """
+    statements = []
+    for statement in sqlparse.parse(sql):
+        parts = []
+        for token in statement.flatten():
+            if token.is_whitespace or token.ttype in sqlparse.tokens.Comment:
+                continue
+            value = token.normalized if token.is_keyword else token.value
+            if parts and _is_word_char_(parts[-1][-1]) and _is_word_char_(value[0]):
+                parts.append(' ')
+            parts.append(value)
+        statement = ''.join(parts).rstrip(';')
+        if statement:
+            statements.append(statement)
+    return ';'.join(statements)
+
+
+def _is_word_char_(char):
+    return char.isalnum() or char in '_$@"\'`'
+
+
+def is_cacheable(sql):
+    """
+    True if sql ends with a SELECT and none of its statements writes data or changes the schema.
+    """
+    statements = [statement for statement in sqlparse.parse(sql) if statement.token_first(skip_cm=True)]
+    if not statements or statements[-1].get_type() != 'SELECT':
+        return False
+    return not any(statement.get_type() in WRITE_STATEMENT_TYPES for statement in statements)
+
+
+def session_statements(sql):
+    """
+    Statements of sql that change the session, such as USE and SET.
+    """
+    statements = (statement.strip().rstrip(';').strip() for statement in sqlparse.split(sql))
+    return [statement for statement in statements if SESSION_STATEMENT_PATTERN.match(statement)]
+
+
+class QueryCache(DiskCache):
+    """
+    Query results keyed on the normalized SQL, the identity of the connection and the row limit.
+    Columnar ResultSets are stored as their NumPy arrays, others as their rows, so that cached results have the
+    same values and types as the results of executing the query.
+    """
+
+    def key(self, sql, identity, limit, session=None):
+        """
+        Cache key of a query, executed after the session statements in session. Keys of the same query start
+        with its query_prefix.
+        """
+        return '%s-%s' % (self.query_prefix(sql), content_hash(identity, limit, list(session or [])))
+
+    def query_prefix(self, sql):
+        """
+        Prefix of the cache keys of a query on any connection, with any limit and session.
+        """
+        return content_hash(normalize_sql(sql))
+
+    def load(self, key, displaylimit=100):
+        """
+        Cached ResultSet of key, None if there is no valid entry.
+        """
+        entry_path = self.get(key)
+        if entry_path is None:
+            return None
+        try:
+            with open(os.path.join(entry_path, RESULT_FILE), 'rb') as file_handler:
+                result = pickle.load(file_handler)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            self.invalidate(key)
+            return None
+        from .resultset import ResultSet
+        if 'rows' in result:
+            return ResultSet(result['keys'], result['rows'], displaylimit)
+        return ResultSet.from_columns(result['keys'], result['columns'], result['length'], displaylimit)
+
+    def store(self, key, result_set):
+        """
+        Caches a ResultSet.
+        """
+        new_entry_path = self.create()
+        try:
+            with open(os.path.join(new_entry_path, RESULT_FILE), 'wb') as file_handler:
+                if result_set.columnar:
+                    result = {'keys': result_set.keys, 'columns': result_set.column_arrays(), 'length': len(result_set)}
+                else:
+                    result = {'keys': result_set.keys, 'rows': list(result_set.data)}
+                pickle.dump(result, file_handler, pickle.HIGHEST_PROTOCOL)
+        except (IOError, OSError, pickle.PicklingError):
+            self.discard(new_entry_path)
+            return False
+        self.commit(key, new_entry_path)
+        return True
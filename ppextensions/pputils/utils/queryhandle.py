@@ -0,0 +1,122 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Handles of SQL queries executed in the background."""
+
+import concurrent.futures
+
+MAX_BACKGROUND_QUERIES = 8
+
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_BACKGROUND_QUERIES)
+
+
+class QueryHandle:
+    """
+    Query executed in a background thread, returned by the SQL magics with --background.
+
+    The status bar is created when the query is submitted, so it is shown in the cell that submitted it, and is
+    updated from the background thread. Queries on the same connection run one after the other, queries on
+    different connections run concurrently.
+    """
+
+    def __init__(self, connection, execute, description='', on_done=None):
+        """
+        :param connection: Connection the query runs on.
+        :param execute: Callable taking the status bar and returning the results.
+        :param on_done: Optional callable invoked once the query completed, failed or was cancelled.
+        """
+        self.connection = connection
+        self.description = description
+        self.status_bar = connection.new_status_bar()
+        self.status_bar.info("Queued %s" % description)
+        self._cancelled = False
+        self._future = _executor.submit(self._run_, execute)
+        if on_done is not None:
+            self._future.add_done_callback(lambda _: on_done())
+
+    def _run_(self, execute):
+        try:
+            result = execute(self.status_bar)
+        except Exception as error:
+            if not self._cancelled:
+                self.status_bar.error("Execution failed: %s" % error)
+            raise
+        if isinstance(result, list):
+            message = "Execution completed, %d result sets." % len(result)
+        elif result is not None:
+            message = "Execution completed, %d results." % len(result)
+        else:
+            message = "Execution completed."
+        self.status_bar.update_status_success(message)
+        return result
+
+    def done(self):
+        """
+        True if the query completed, failed or was cancelled.
+        """
+        return self._future.done()
+
+    def running(self):
+        """
+        True if the query is executing.
+        """
+        return self._future.running()
+
+    def result(self, timeout=None):
+        """
+        Results of the query, waits for it to complete. Raises the error of a failed query.
+        """
+        return self._future.result(timeout)
+
+    def DataFrame(self, timeout=None):
+        """
+        Results of the query as a DataFrame, waits for it to complete.
+        """
+        return self.result(timeout).DataFrame()
+
+    def cancel(self):
+        """
+        Cancels the query.
+        :return: False if the query completed or can't be cancelled while running.
+        """
+        if self._future.cancel():
+            self.status_bar.error("Cancelled.")
+            return True
+        if self._future.running() and self.connection.cancel():
+            self._cancelled = True
+            self.status_bar.error("Cancelled.")
+            return True
+        return False
+
+    def __repr__(self):
+        if self._future.cancelled():
+            state = 'cancelled'
+        elif not self._future.done():
+            state = 'running' if self._future.running() else 'queued'
+        elif self._future.exception() is not None:
+            state = 'failed'
+        else:
+            state = 'done'
+        return '<QueryHandle %s: %s>' % (self.description, state)
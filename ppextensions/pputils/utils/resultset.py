@@ -30,28 +30,82 @@ import prettytable
 import re
 import six
 
+import numpy as np
+
 from sql.column_guesser import ColumnGuesserMixin
 from sql.run import CsvResultDescriptor, UnicodeWriter
 from functools import reduce
 
+_CELL_WITH_SPACES_PATTERN = re.compile(r'(<td>)( {2,})')
+# Types of values stored in typed column arrays.
+_NUMBER_TYPES = six.integer_types + (float, np.number, np.bool_)
+
 
 class ResultSet(list, ColumnGuesserMixin):
     """
     Results of SQL outputs.
 
+    With ``columnar=True`` rows are not kept as tuples. Each column is stored as a typed
+    NumPy array (object array for strings, integers with NULLs and values that can't be typed)
+    and rows are built on access.
+
+    The PrettyTable and its HTML are built on first render, results that are only turned
+    into DataFrames never pay for them.
+
     Credits: Thanks to 'Ipython-sql' for ResultSet.
     """
 
-    def __init__(self, columns, data, displaylimit=100):
+    def __init__(self, columns, data, displaylimit=100, columnar=False):
         self.keys = columns
         self.displaylimit = displaylimit
         self.field_names = unduplicate_field_names(self.keys)
-        self.pretty = prettytable.PrettyTable(self.field_names)
+        self._pretty = None
+        self._html = None
         self.style = prettytable.__dict__["DEFAULT"]
-        list.__init__(self, data)
-        self.data = data
-        for row in self[:self.displaylimit or None]:
-            self.pretty.add_row(row)
+        self.columnar = columnar
+        if columnar:
+            list.__init__(self)
+            self._length = len(data)
+            self._columns = to_columns(data, len(self.keys))
+            self._data = None
+        else:
+            list.__init__(self, data)
+            self._data = data
+
+    @property
+    def pretty(self):
+        """
+        PrettyTable of the first displaylimit rows. Built on first access.
+        """
+        if self._pretty is None:
+            self._pretty = prettytable.PrettyTable(self.field_names)
+            for row in self[:self.displaylimit or None]:
+                self._pretty.add_row(row)
+        return self._pretty
+
+    @pretty.setter
+    def pretty(self, value):
+        self._pretty = value
+        self._html = None
+
+    @property
+    def data(self):
+        """
+        Rows of the result set. Materialized on demand for columnar results.
+        """
+        if self._data is None:
+            self._data = list(self)
+        return self._data
+
+    def __len__(self):
+        if self.columnar:
+            return self._length
+        return list.__len__(self)
+
+    def __iter__(self):
+        if self.columnar:
+            return zip(*self._columns) if self._columns else iter([()] * self._length)
+        return list.__iter__(self)
 
     def __getitem__(self, key):
         """
@@ -59,6 +113,8 @@ class ResultSet(list, ColumnGuesserMixin):
         or by string (value of leftmost column)
         """
         try:
+            if self.columnar:
+                return self._get_columnar_item_(key)
             return list.__getitem__(self, key)
         except TypeError:
             result = [row for row in self if row[0] == key]
@@ -68,14 +124,48 @@ class ResultSet(list, ColumnGuesserMixin):
                 raise KeyError('%d results for "%s"' % (len(result), key))
             return result[0]
 
+    def _get_columnar_item_(self, key):
+        """
+        Builds rows from the column arrays for an integer or slice key.
+        """
+        if isinstance(key, slice):
+            return list(zip(*[column[key] for column in self._columns]))
+        if not isinstance(key, six.integer_types + (np.integer,)):
+            raise TypeError(key)
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError('ResultSet index out of range')
+        return tuple(column[key] for column in self._columns)
+
+    @classmethod
+    def from_columns(cls, columns, arrays, length, displaylimit=100):
+        """
+        Columnar result set of column arrays as returned by column_arrays.
+        """
+        result = cls(columns, [], displaylimit, columnar=True)
+        result._columns = list(arrays)
+        result._length = length
+        return result
+
+    def column_arrays(self):
+        """
+        Column-wise NumPy arrays of the result set.
+        """
+        if self.columnar:
+            return self._columns
+        return to_columns(self, len(self.keys))
+
     def _repr_html_(self):
-        _cell_with_spaces_pattern = re.compile(r'(<td>)( {2,})')
+        if self._html is not None:
+            return self._html
         if self.pretty:
             result = self.pretty.get_html_string()
-            result = _cell_with_spaces_pattern.sub(_nonbreaking_spaces, result)
+            result = _CELL_WITH_SPACES_PATTERN.sub(_nonbreaking_spaces, result)
             if self.displaylimit and len(self) > self.displaylimit:
                 result = '%s\n<span style="font-style:italic;text-align:center;">%d rows, truncated to displaylimit of %d</span>' % (
                     result, len(self), self.displaylimit)
+            self._html = result
             return result
         else:
             return None
@@ -85,12 +175,18 @@ class ResultSet(list, ColumnGuesserMixin):
 
     def dict(self):
         """Returns a dict built from the result set, with column names as keys"""
+        if self.columnar:
+            return dict(zip(self.keys, (tuple(column.tolist()) for column in self._columns)))
         return dict(zip(self.keys, zip(*self)))
 
     def DataFrame(self):
         """Returns a Pandas DataFrame instance built from the result set."""
         import pandas as pd
-        frame = pd.DataFrame(self.data, columns=(self and self.keys) or [])
+        if self.columnar:
+            frame = pd.DataFrame(dict(enumerate(self._columns)), copy=False)
+            frame.columns = list(self.keys)
+            return frame
+        frame = pd.DataFrame(self.data, columns=list(self.keys))
         return frame
 
     def pie(self, key_word_sep=" ", title=None, **kwargs):
@@ -168,7 +264,7 @@ class ResultSet(list, ColumnGuesserMixin):
     def csv(self, filename=None, **format_params):
         """Generate results in comma-separated form.  Write to ``filename`` if given.
            Any other parameters will be passed on to csv.writer."""
-        if not self.pretty:
+        if not self.field_names:
             return None  # no results
         if filename:
             encoding = format_params.get('encoding', 'utf-8')
@@ -199,6 +295,44 @@ def _nonbreaking_spaces(match_obj):
     return '%s%s' % (match_obj.group(1), spaces)
 
 
+def to_columns(rows, num_columns):
+    """
+    Converts DB-API rows to a list of column arrays. Columns of bools and numbers get a typed array, every other
+    column is kept as an object array.
+    """
+    columns = []
+    for idx in range(num_columns):
+        values = [row[idx] for row in rows]
+        columns.append(_to_column_(values))
+        del values
+    return columns
+
+
+def _to_column_(values):
+    """
+    Array of a column. NULLs in a column of floats become NaN, the same as pandas does. Integer columns with NULLs
+    stay objects, so that large ids keep their precision, and strings are never copied into fixed width arrays.
+    """
+    types = set(type(value) for value in values)
+    if types and all(issubclass(value_type, _NUMBER_TYPES) for value_type in types):
+        try:
+            column = np.asarray(values)
+        except (TypeError, ValueError, OverflowError):
+            column = None
+        if column is not None and column.ndim == 1 and column.dtype.kind in 'biuf':
+            return column
+    elif float in types and types <= {int, float, type(None)}:
+        return np.array(values, dtype=float)
+    column = np.empty(len(values), dtype=object)
+    try:
+        column[:] = values
+    except ValueError:
+        # Nested sequences can't be broadcast, assign them one by one.
+        for pos, value in enumerate(values):
+            column[pos] = value
+    return column
+
+
 def unduplicate_field_names(field_names):
     """Append a number to duplicate field names to make them unique. """
     res = []
@@ -0,0 +1,74 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Column type inference shared by Teradata inserts and Tableau extracts."""
+
+import collections
+from numbers import Number
+
+import pandas as pd
+
+SAMPLE_SIZE = 100
+
+
+def infer_column_type(column, sample_size=SAMPLE_SIZE):
+    """
+    Python type of the values of a DataFrame column, None if the column only holds nulls.
+    Typed columns are mapped from their dtype, object columns from a bounded sample of non-null values.
+    """
+    dtype = column.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return bool
+    if pd.api.types.is_integer_dtype(dtype):
+        return int
+    if pd.api.types.is_float_dtype(dtype):
+        return float
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return pd.Timestamp
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return pd.Timedelta
+
+    sample = column.iloc[:sample_size]
+    sample = sample[sample.notnull()]
+    if sample.empty:
+        # Leading nulls only, look for the first value further down.
+        not_null = column.notnull().values
+        if not not_null.any():
+            return None
+        sample = column.iloc[not_null.argmax():not_null.argmax() + 1]
+
+    value_types = set(type(value) for value in sample)
+    if len(value_types) == 1:
+        return value_types.pop()
+    if all(issubclass(value_type, Number) and value_type is not bool for value_type in value_types):
+        return float
+    return str
+
+
+def infer_schema(data_frame, sample_size=SAMPLE_SIZE):
+    """
+    Ordered mapping of column name to the python type of its values.
+    """
+    return collections.OrderedDict((col, infer_column_type(data_frame[col], sample_size)) for col in data_frame)
@@ -0,0 +1,254 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""DataFrames shared between kernels through memory-mapped files."""
+
+import errno
+import itertools
+import os
+import pickle
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .exceptions import InvalidParameterType
+
+SHARED_MEMORY_DIR = '/dev/shm'
+META_FILE = 'meta.pkl'
+REFS_DIR = '.refs'
+RELEASED_FILE = '.released'
+
+_NAME_PATTERN = re.compile(r'^[\w\-]+$')
+_ref_counter = itertools.count()
+
+
+class SharedWorkspace:
+    """
+    Publishes DataFrames once into shared memory (/dev/shm, a temporary directory where it is missing) so that
+    other kernels can attach to them without unpickling.
+
+    Every column NumPy can store natively is written to its own .npy file and read through a read-only
+    memory map on attach. pandas copies the columns into the frame's blocks while building it, so attaching
+    costs one copy of the frame but no parsing. Other columns and non-range indexes are pickled.
+
+    Kernels attaching to a frame hold a reference until they detach or exit. A frame that is unpublished while
+    referenced is removed with its last reference. The workspace that created the directory removes it on close.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            base_dir = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None
+            self.path = tempfile.mkdtemp(prefix='ppextensions-workspace-', dir=base_dir)
+            self.owner = True
+        else:
+            self.path = path
+            self.owner = False
+
+    @classmethod
+    def open(cls, path):
+        """
+        Workspace created by another kernel.
+        """
+        return cls(path)
+
+    def publish(self, name, frame):
+        """
+        Writes frame to the workspace under name, replacing a frame published before.
+        """
+        frame_path = self._frame_path_(name)
+        new_frame_path = tempfile.mkdtemp(prefix='.new-', dir=self.path)
+        meta = {'columns': list(frame.columns), 'arrays': {}, 'objects': {}, 'index': None}
+        for pos in range(frame.shape[1]):
+            column = frame.iloc[:, pos]
+            if isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufcmM':
+                file_name = '%d.npy' % pos
+                np.save(os.path.join(new_frame_path, file_name), column.values)
+                meta['arrays'][pos] = file_name
+            else:
+                meta['objects'][pos] = column.reset_index(drop=True)
+        if isinstance(frame.index, pd.RangeIndex):
+            meta['range_index'] = (frame.index.start, frame.index.stop, frame.index.step, frame.index.name)
+        else:
+            meta['index'] = frame.index
+        with open(os.path.join(new_frame_path, META_FILE), 'wb') as file_handler:
+            pickle.dump(meta, file_handler, pickle.HIGHEST_PROTOCOL)
+        # Kernels attached to the replaced frame keep their memory maps, the files go away when they unmap them.
+        shutil.rmtree(frame_path, ignore_errors=True)
+        os.rename(new_frame_path, frame_path)
+
+    def attach(self, name):
+        """
+        DataFrame published under name, read from its memory-mapped columns. Holds a reference until detach.
+        """
+        frame_path = self._frame_path_(name)
+        try:
+            with open(os.path.join(frame_path, META_FILE), 'rb') as file_handler:
+                meta = pickle.load(file_handler)
+        except (IOError, OSError):
+            raise KeyError(name)
+        if os.path.exists(os.path.join(frame_path, RELEASED_FILE)):
+            raise KeyError(name)
+        self._add_ref_(name)
+        columns = {}
+        for pos in range(len(meta['columns'])):
+            if pos in meta['arrays']:
+                columns[pos] = np.load(os.path.join(frame_path, meta['arrays'][pos]), mmap_mode='r')
+            else:
+                columns[pos] = meta['objects'][pos].values
+        if meta['index'] is None:
+            start, stop, step, index_name = meta['range_index']
+            index = pd.RangeIndex(start, stop, step, name=index_name)
+        else:
+            index = meta['index']
+        frame = pd.DataFrame(columns, copy=False)
+        frame.index = index
+        frame.columns = meta['columns']
+        return frame
+
+    def detach(self, name):
+        """
+        Drops a reference this kernel holds on name. Memory maps stay valid until the frame is garbage collected.
+        """
+        refs_path = self._refs_path_(name)
+        prefix = '%d-' % os.getpid()
+        for ref in self._refs_(name):
+            if ref.startswith(prefix):
+                os.remove(os.path.join(refs_path, ref))
+                break
+        if os.path.exists(os.path.join(self._frame_path_(name), RELEASED_FILE)) and not self.refcount(name):
+            self._remove_(name)
+
+    def unpublish(self, name):
+        """
+        Removes name from the workspace, once no kernel references it.
+        """
+        if self.refcount(name):
+            open(os.path.join(self._frame_path_(name), RELEASED_FILE), 'w').close()
+        else:
+            self._remove_(name)
+
+    def refcount(self, name):
+        """
+        Number of references held on name by running processes.
+        """
+        return sum(1 for ref in self._refs_(name) if _is_running_(int(ref.split('-')[0])))
+
+    def names(self):
+        """
+        Names of published frames.
+        """
+        try:
+            return sorted(name for name in os.listdir(self.path) if not name.startswith('.') and
+                          not os.path.exists(os.path.join(self.path, name, RELEASED_FILE)))
+        except OSError:
+            return []
+
+    def close(self):
+        """
+        Removes the workspace if this kernel created it.
+        """
+        if self.owner:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def _add_ref_(self, name):
+        refs_path = self._refs_path_(name)
+        try:
+            os.makedirs(refs_path)
+        except OSError:
+            if not os.path.isdir(refs_path):
+                raise
+        ref = '%d-%d' % (os.getpid(), next(_ref_counter))
+        open(os.path.join(refs_path, ref), 'w').close()
+
+    def _refs_(self, name):
+        try:
+            return os.listdir(self._refs_path_(name))
+        except OSError:
+            return []
+
+    def _remove_(self, name):
+        shutil.rmtree(self._frame_path_(name), ignore_errors=True)
+        shutil.rmtree(self._refs_path_(name), ignore_errors=True)
+
+    def _frame_path_(self, name):
+        if not _NAME_PATTERN.match(name):
+            raise InvalidParameterType("Shared frame names can only contain letters, digits, '_' and '-'.")
+        return os.path.join(self.path, name)
+
+    def _refs_path_(self, name):
+        return os.path.join(self.path, REFS_DIR, name)
+
+
+def _is_running_(pid):
+    """
+    True if a process with pid exists.
+    """
+    try:
+        os.kill(pid, 0)
+    except OSError as error:
+        return error.errno == errno.EPERM
+    return True
+
+
+class SharedFrame:
+    """
+    Reference to a frame published in a SharedWorkspace, pickled in place of the frame.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+
+def share_frames(workspace, frames, prefix):
+    """
+    Publishes the DataFrames of a list as prefix-<position>.
+    :return: The list with the DataFrames replaced by SharedFrame references.
+    """
+    shared = []
+    for pos, frame in enumerate(frames):
+        if isinstance(frame, pd.DataFrame):
+            name = '%s-%d' % (prefix, pos)
+            workspace.publish(name, frame)
+            frame = SharedFrame(name)
+        shared.append(frame)
+    return shared
+
+
+def attach_frames(workspace, frames):
+    """
+    Attaches to the frames referenced by SharedFrame items of a list.
+    """
+    return [workspace.attach(frame.name) if isinstance(frame, SharedFrame) else frame for frame in frames]
+
+
+def open_workspace_source(path):
+    """
+    Source of a cell opening the workspace at path as _shared_workspace.
+    """
+    return "from ppextensions.pputils.utils.sharedworkspace import SharedWorkspace, attach_frames, share_frames\n" + \
+        "_shared_workspace = SharedWorkspace.open(%r)" % path
@@ -48,7 +48,9 @@ except ImportError:
 
 from ppextensions.pputils.utils.configuration import conf_info
 from ppextensions.pputils.widgets.messages import UserMessages
+from ppextensions.pputils.widgets.widgets import StatusBar
 from .resultset import ResultSet
+from .schema import infer_schema
 
 
 def tableau_extract(resultset, data_file):
@@ -60,8 +62,6 @@ def tableau_extract(resultset, data_file):
         df_name = resultset.DataFrame()
     else:
         df_name = resultset
-    data_type = []
-    fieldnames = []
     data_type_map = {int: Type.INTEGER,
                      str: Type.UNICODE_STRING,
                      bool: Type.BOOLEAN,
@@ -73,13 +73,10 @@ def tableau_extract(resultset, data_file):
                      datetime.date: Type.DATE,
                      datetime.time: Type.DURATION,
                      datetime.datetime: Type.DATETIME,
-                     pd._libs.tslib.Timestamp: Type.DATETIME
+                     pd.Timestamp: Type.DATETIME
                      }
 
-    for col in df_name:
-        fieldnames.append(col)
-        data_type.append(df_name[col].apply(type).iat[0])
-    data_dict = dict(zip(fieldnames, data_type))
+    data_dict = infer_schema(df_name)
 
     for col_name in data_dict:
         if data_dict[col_name] in data_type_map:
@@ -97,39 +94,33 @@ def tableau_extract(resultset, data_file):
         table_definition.addColumn(col_name, data_dict[col_name])
     new_table = new_extract.addTable('Extract', table_definition)
     new_row = Row(table_definition)
-    tde_types = {'INTEGER': 7, 'DOUBLE': 10, 'BOOLEAN': 11, 'DATE': 12,
-                 'DATETIME': 13, 'DURATION': 14,
-                 'CHAR_STRING': 15, 'UNICODE_STRING': 16}
-    for i in range(0, len(df_name)):
-        for col in range(0, table_definition.getColumnCount()):
-            col_name = table_definition.getColumnName(col)
+    total_rows = len(df_name)
+    status_bar = StatusBar()
+    status_bar.update_description('Extract:')
+    status_bar.update_max(max(total_rows, 1))
+    update_every = max(total_rows // 100, 1)
+
+    # Pull every column out once and pick its setter once, rows are then filled from plain lists.
+    columns = []
+    for col in range(0, table_definition.getColumnCount()):
+        col_name = table_definition.getColumnName(col)
+        column = df_name[col_name]
+        columns.append((col, _column_setter_(data_dict[col_name]), column.tolist(), column.isnull().values.tolist()))
+
+    for i in range(0, total_rows):
+        for col, setter, values, nulls in columns:
+            if nulls[i]:
+                new_row.setNull(col)
+                continue
             try:
-                if data_dict[col_name] == tde_types['INTEGER']:
-                    new_row.setInteger(col, int(df_name[col_name][i]))
-                elif data_dict[col_name] == tde_types['DOUBLE']:
-                    new_row.setDouble(col, float(df_name[col_name][i]))
-                elif data_dict[col_name] == tde_types['BOOLEAN']:
-                    new_row.setBoolean(col, bool(df_name[col_name][i]))
-                elif data_dict[col_name] == tde_types['DATE']:
-                    data = df_name[col_name][i]
-                    new_row.setDate(col, data.year, data.month, data.day)
-                elif data_dict[col_name] == tde_types['DATETIME']:
-                    data = df_name[col_name][i]
-                    new_row.setDateTime(col, data.year, data.month, data.day,
-                                        data.hour, data.minute, data.second, 0)
-                elif data_dict[col_name] == tde_types['DURATION']:
-                    data = df_name[col_name][i]
-                    new_row.setDuration(col, data.hour, data.minute, data.second, 0)
-                elif data_dict[col_name] == tde_types['CHAR_STRING']:
-                    new_row.setCharString(col, str(df_name[col_name][i]))
-                elif data_dict[col_name] == tde_types['UNICODE_STRING']:
-                    new_row.setString(col, str(df_name[col_name][i]))
-                else:
-                    print('Error')
-                    new_row.setNull(col)
+                setter(new_row, col, values[i])
             except TypeError:
                 new_row.setNull(col)
         new_table.insert(new_row)
+        if i % update_every == 0:
+            status_bar.update_status(i)
+            status_bar.update_info_message("%d/%d rows extracted" % (i, total_rows))
+    status_bar.update_status_success("%d rows extracted" % total_rows)
 
     new_extract.close()
     ExtractAPI.cleanup()
@@ -137,6 +128,30 @@ def tableau_extract(resultset, data_file):
         os.remove(file_name)
 
 
+def _column_setter_(data_type):
+    """
+    Row setter for a Tableau column type.
+    """
+    if data_type == Type.INTEGER:
+        return lambda row, col, data: row.setInteger(col, int(data))
+    elif data_type == Type.DOUBLE:
+        return lambda row, col, data: row.setDouble(col, float(data))
+    elif data_type == Type.BOOLEAN:
+        return lambda row, col, data: row.setBoolean(col, bool(data))
+    elif data_type == Type.DATE:
+        return lambda row, col, data: row.setDate(col, data.year, data.month, data.day)
+    elif data_type == Type.DATETIME:
+        return lambda row, col, data: row.setDateTime(col, data.year, data.month, data.day,
+                                                      data.hour, data.minute, data.second, 0)
+    elif data_type == Type.DURATION:
+        return lambda row, col, data: row.setDuration(col, data.hour, data.minute, data.second, 0)
+    elif data_type == Type.CHAR_STRING:
+        return lambda row, col, data: row.setCharString(col, str(data))
+    elif data_type == Type.UNICODE_STRING:
+        return lambda row, col, data: row.setString(col, str(data))
+    return lambda row, col, data: row.setNull(col)
+
+
 def publish(data, data_file=None, project_name=None):
     """
     Publish to Tableau.
@@ -167,14 +182,9 @@ def publish(data, data_file=None, project_name=None):
         else:
             tableau_extract(data, data_file)
 
-        if tableau_details:
-            site_name = tableau_details['site_name']
-            username = tableau_details['user_name']
-            password = tableau_details['password']
-        else:
-            site_name = input("Enter the site name to publish ")
-            username = input("Enter tableau user name ")
-            password = getpass.getpass("Please enter your password ")
+        site_name = tableau_details.get('site_name') or input("Enter the site name to publish ")
+        username = tableau_details.get('user_name') or input("Enter tableau user name ")
+        password = tableau_details.get('password') or getpass.getpass("Please enter your password ")
 
         data_file_name = str(data_file).rsplit('.tde', 1)[0]
 
@@ -28,12 +28,49 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import ast
 import datetime
 import getpass
+import json
 import os
 import re
-import pandas as pd
 import astor
 
-from autovizwidget.widget.utils import display_dataframe
+
+def available_memory_mb():
+    """
+        Memory available for new processes in MB, None if it can't be determined.
+    """
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for meminfo_line in meminfo:
+                if meminfo_line.startswith('MemAvailable:'):
+                    return int(meminfo_line.split()[1]) // 1024
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+def is_python_notebook(notebook_filename):
+    """
+        True if the kernel of the notebook runs Python.
+    """
+    with open(notebook_filename) as file_handler:
+        metadata = json.load(file_handler).get('metadata', {})
+    kernelspec = metadata.get('kernelspec', {})
+    language = kernelspec.get('language') or metadata.get('language_info', {}).get('name')
+    if language:
+        return language.lower() == 'python'
+    return kernelspec.get('name', '').startswith('python')
+
+
+def max_parallel_kernels(kernel_memory_mb):
+    """
+        Number of kernels that can run at once: one per core, bounded by the memory headroom
+        for kernels using kernel_memory_mb each.
+    """
+    workers = os.cpu_count() or 1
+    memory_mb = available_memory_mb()
+    if memory_mb is not None and kernel_memory_mb > 0:
+        workers = min(workers, memory_mb // kernel_memory_mb)
+    return max(workers, 1)
 
 
 def renew_kerberos_ticket(principal, keytab):
@@ -103,6 +140,16 @@ def parse_run_str(run_str):
     return notebook_filename, notebook_save_filename, params
 
 
+def split_paths(paths):
+    """
+        Splits a comma separated list of file paths from a magic argument.
+        :return list of paths, empty if paths is None.
+    """
+    if not paths:
+        return []
+    return [path.strip() for path in paths.split(',') if path.strip()]
+
+
 def substitute_params(param_cell_src, params):
     """
         Updates parameters of parameterized notebooks. Supports run and run pipeline magics.
@@ -164,6 +211,7 @@ def csv_to_df(user_ns, args):
         :return DataFrame
     """
     if args.get("csv"):
+        import pandas as pd
         csv_args = args.get("csv")
         df_name = pd.read_csv(csv_args, index_col=0)
     if args.get("dataframe"):
@@ -190,6 +238,7 @@ def register_autoviz_code(result):
     """
         Enables AutoViz.
     """
+    from autovizwidget.widget.utils import display_dataframe
     ip = get_ipython()
     ip.display_formatter.ipython_display_formatter.for_type_by_name(
         'pandas.core.frame', 'DataFrame', display_dataframe)
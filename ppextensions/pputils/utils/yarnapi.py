@@ -25,7 +25,12 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """Manging Queuing system for Spark Thrift Server."""
 
+import getpass
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
 try:
     from urllib import urlencode
 except ImportError:
@@ -33,28 +38,91 @@ except ImportError:
 
 from ppextensions.pputils.utils.exceptions import ResourceManagerException
 
+# Seconds to wait for a connection and for a response.
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+# Seconds cluster metrics and the listing of running applications are reused for.
+METRICS_TTL = 30
+APPS_TTL = 2
+# Number of cached responses above which expired ones are dropped.
+MAX_CACHED = 100
+ACTIVE_STATES = 'NEW,NEW_SAVING,SUBMITTED,ACCEPTED,RUNNING'
+
 
 class ResourceManager:
     """
     Manging Queuing system for Spark Thrift Server.
+
+    Requests go through one keep-alive session per instance. Use ResourceManager.shared(url) to share the
+    session and the cached responses between all the connections of a kernel.
     """
 
-    def __init__(self, url):
-        self._url = url
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, url, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, metrics_ttl=METRICS_TTL,
+                 apps_ttl=APPS_TTL, user=None, pool_size=10):
+        """
+        :param user: User whose running applications are listed by application, defaults to the current user.
+        """
+        self._url = url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.metrics_ttl = metrics_ttl
+        self.apps_ttl = apps_ttl
+        self.user = user or getpass.getuser()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._cache = {}
+        # Applications of other users, e.g. queries run as the hive user, are never in the listing.
+        self._other_users_apps = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, url):
+        """
+        ResourceManager for url shared by every caller in the process.
+        """
+        with cls._instances_lock:
+            if url not in cls._instances:
+                cls._instances[url] = cls(url)
+            return cls._instances[url]
 
     def _request_(self, api_path, ignore_errors, **query_args):
-        """Base request handler for all HTTP requests"""
+        """Base request handler for all HTTP requests. Returns None on errors if ignore_errors is set."""
         params = urlencode(query_args)
-        if params:
-            response = requests.get(url=self._url + api_path, params=params, allow_redirects=True)
-        else:
-            response = requests.get(url=self._url + api_path, allow_redirects=True)
-
+        try:
+            response = self.session.get(url=self._url + api_path, params=params or None, allow_redirects=True,
+                                        timeout=self.timeout)
+        except requests.RequestException as error:
+            if ignore_errors:
+                return None
+            raise ResourceManagerException(str(error))
         if response.ok:
-            response_json = response.json()
-        elif not ignore_errors:
+            return response.json()
+        if not ignore_errors:
             raise ResourceManagerException(response.text)
-        return response_json
+        return None
+
+    def _cached_(self, key, ttl, fetch):
+        """
+        Response cached under key, fetched again once older than ttl seconds. Failed requests aren't cached.
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and time.time() - cached[0] < ttl:
+                return cached[1]
+        response = fetch()
+        if response is not None:
+            with self._lock:
+                now = time.time()
+                if len(self._cache) > MAX_CACHED:
+                    ttl = max(self.metrics_ttl, self.apps_ttl)
+                    self._cache = dict((cached_key, cached) for cached_key, cached in self._cache.items()
+                                       if now - cached[0] < ttl)
+                self._cache[key] = (now, response)
+        return response
 
     def cluster_application(self, application_id, ignore_errors=False):
         """
@@ -66,13 +134,49 @@ class ResourceManager:
         path = '/ws/v1/cluster/apps/{appid}'.format(appid=application_id)
         return self._request_(path, ignore_errors)
 
+    def cluster_applications(self, ignore_errors=False, **query_args):
+        """
+        Lists applications in one request, filtered by query_args (states, user, queue, applicationTypes...).
+        :return: Applications by application id.
+        """
+        return ResourceManager._apps_by_id_(self._request_('/ws/v1/cluster/apps', ignore_errors, **query_args))
+
+    def running_application(self, application_id, ignore_errors=False):
+        """
+        Status of an application, as cluster_application returns it. The running applications of the user are
+        listed in one request at most every apps_ttl seconds and shared by all the queries polling this
+        Resource Manager. Applications missing from the listing, e.g. completed ones or ones submitted by another
+        user, are fetched on their own, also at most every apps_ttl seconds. Applications of other users are
+        fetched on their own from then on.
+        """
+        if application_id not in self._other_users_apps:
+            apps = ResourceManager._apps_by_id_(self._cached_('apps', self.apps_ttl, lambda: self._request_(
+                '/ws/v1/cluster/apps', True, states=ACTIVE_STATES, user=self.user)))
+            if application_id in apps:
+                return {'app': apps[application_id]}
+        app_info = self._cached_(('app', application_id), self.apps_ttl,
+                                 lambda: self.cluster_application(application_id, ignore_errors))
+        user = ((app_info or {}).get('app') or {}).get('user')
+        if user is not None and user != self.user:
+            with self._lock:
+                self._other_users_apps.add(application_id)
+        return app_info
+
     def cluster_metrics(self, ignore_errors=False):
         """
         The cluster metrics resource provides some overall metrics about the
         cluster. More detailed metrics should be retrieved from the jmx
-        interface.
+        interface. Cached for metrics_ttl seconds.
         :param ignore_errors: Set to True will ignore the errors
         :returns: API response object with JSON data
         """
         path = '/ws/v1/cluster/metrics'
-        return self._request_(path, ignore_errors)
+        return self._cached_('metrics', self.metrics_ttl, lambda: self._request_(path, ignore_errors))
+
+    def close(self):
+        self.session.close()
+
+    @staticmethod
+    def _apps_by_id_(response):
+        apps = ((response or {}).get('apps') or {}).get('app') or []
+        return dict((app['id'], app) for app in apps)
@@ -0,0 +1,181 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""QGrid widgets, kept apart so that qgrid is only imported when a grid is rendered."""
+
+import numpy as np
+import qgrid
+
+from ipywidgets import widgets
+
+GRID_OPTIONS = {
+    'fullWidthRows': True,
+    'syncColumnCellResize': True,
+    'forceFitColumns': False,
+    'defaultColumnWidth': 150,
+    'rowHeight': 35,
+    'enableColumnReorder': True,
+    'enableTextSelectionOnCells': True,
+    'editable': True,
+    'autoEdit': False,
+    'explicitInitialization': True,
+    'maxVisibleRows': 10,
+    'minVisibleRows': 0,
+    'maxVisibleColumns': 10,
+    'minVisibleColumns': 0,
+    'sortable': True,
+    'filterable': True,
+    'highlightSelectedCell': True,
+    'highlightSelectedRow': True
+}
+
+
+class QGridCustomWidget(qgrid.QGridWidget):
+    """
+        Widget to render as QGrid.
+    """
+
+    def __init__(self, dataframe, display_limit=1000, grid_options=None):
+        self.full_df = dataframe
+
+        if grid_options is None:
+            grid_options = dict(GRID_OPTIONS)
+
+        super().__init__(df=self.full_df[:display_limit], grid_options=grid_options)
+
+    def DataFrame(self):
+        """
+            Return widget data as DataFrame.
+        """
+        return self.full_df
+
+    def csv(self, filename=None):
+        """
+            Return widget data as CSV.
+        """
+        if filename is not None:
+            self.full_df.to_csv(filename)
+
+
+class PagedQGridWidget(widgets.VBox):
+    """
+        Grid of a large DataFrame that stays in the kernel, the browser only receives the page shown.
+        Paging, sorting and filtering controls are widgets, their changes reach the kernel as widget
+        messages and are computed there: sort orders are computed once per column as arrays of row
+        positions, filters are DataFrame.eval expressions selecting positions.
+    """
+
+    def __init__(self, dataframe, page_size=1000, grid_options=None):
+        self.full_df = dataframe
+        self.page_size = max(page_size, 1)
+        self._orders = {}
+        self._positions = np.arange(len(dataframe))
+        grid_options = dict(grid_options or GRID_OPTIONS, sortable=False, filterable=False)
+        self.grid = QGridCustomWidget(dataframe.iloc[:self.page_size], self.page_size, grid_options)
+        self.page = widgets.BoundedIntText(value=1, min=1, max=self._pages_(), description='Page',
+                                           layout=widgets.Layout(width='160px'))
+        self.sort_column = widgets.Dropdown(options=[('', -1)] + [(str(column), position) for position, column
+                                                                  in enumerate(dataframe.columns)],
+                                            value=-1, description='Sort by')
+        self.ascending = widgets.Checkbox(value=True, description='Ascending', indent=False)
+        self.filter = widgets.Text(placeholder='Filter, e.g. amount > 100 and country == "US"',
+                                   continuous_update=False, layout=widgets.Layout(width='360px'))
+        self.status = widgets.Label()
+        self.page.observe(self._show_page_, names='value')
+        for control in (self.sort_column, self.ascending, self.filter):
+            control.observe(self._refresh_, names='value')
+        super().__init__([widgets.HBox([self.page, self.sort_column, self.ascending, self.filter]),
+                          self.grid, self.status])
+        self._show_page_()
+
+    def DataFrame(self):
+        """
+            Return widget data as DataFrame.
+        """
+        return self.full_df
+
+    def csv(self, filename=None):
+        """
+            Return widget data as CSV.
+        """
+        if filename is not None:
+            self.full_df.to_csv(filename)
+
+    def _refresh_(self, _=None):
+        """
+            Recomputes the rows shown after a sort or filter change and shows the first page.
+        """
+        try:
+            mask = self._filter_mask_(self.filter.value)
+        except Exception as error:
+            self.status.value = "Invalid filter: %s" % error
+            return
+        positions = np.arange(len(self.full_df))
+        if self.sort_column.value >= 0:
+            try:
+                positions = self._order_(self.sort_column.value, self.ascending.value)
+            except TypeError as error:
+                self.status.value = "Can't sort by %s: %s" % (self.sort_column.label, error)
+                return
+        self._positions = positions if mask is None else positions[mask[positions]]
+        self.page.max = self._pages_()
+        if self.page.value != 1:
+            # Shows the page through _show_page_.
+            self.page.value = 1
+        else:
+            self._show_page_()
+
+    def _show_page_(self, _=None):
+        start = (self.page.value - 1) * self.page_size
+        page_positions = self._positions[start:start + self.page_size]
+        self.grid.df = self.full_df.iloc[page_positions]
+        self.status.value = "Rows %d-%d of %d" % (min(start + 1, len(self._positions)),
+                                                  start + len(page_positions), len(self._positions))
+        if len(self._positions) != len(self.full_df):
+            self.status.value += " (filtered from %d)" % len(self.full_df)
+
+    def _filter_mask_(self, expression):
+        """
+            Boolean array of the rows matching expression, None without filter.
+        """
+        if not expression.strip():
+            return None
+        mask = np.asarray(self.full_df.eval(expression), dtype=bool)
+        if mask.shape != (len(self.full_df),):
+            raise ValueError("the filter must be a condition on the rows")
+        return mask
+
+    def _order_(self, position, ascending):
+        """
+            Row positions sorted by the column at position, missing values last. Cached per column and direction.
+        """
+        key = (position, ascending)
+        if key not in self._orders:
+            ranks = self.full_df.iloc[:, position].rank(method='first', ascending=ascending, na_option='bottom')
+            self._orders[key] = np.argsort(ranks.values, kind='mergesort')
+        return self._orders[key]
+
+    def _pages_(self):
+        return max((len(self._positions) + self.page_size - 1) // self.page_size, 1)
@@ -25,15 +25,16 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """IPyWidgets for PPExtensions."""
 
-import qgrid
-
-from time import sleep
-
 from ipywidgets import Box
 from ipywidgets import widgets
-from pyhive.exc import DatabaseError
 from IPython.display import display
 
+from ppextensions.pputils.utils.lazy import lazy_import
+from ppextensions.pputils.utils.poller import Poller
+
+# qgrid is imported when the first grid is rendered.
+lazy_import(globals(), {'QGridCustomWidget': '.qgridwidget', 'PagedQGridWidget': '.qgridwidget'})
+
 
 class MenuWidgets(Box):
     """
@@ -101,6 +102,21 @@ class StatusBar(MenuWidgets):
         """
         self.children[1].value = '<font color="blue">%s</front>' % str(status)
 
+    def update_progress(self, value=None, message=None, maximum=None):
+        """
+            Update the bar and info message of a poll at once, only the values that changed are sent to the
+            frontend.
+        """
+        progress = self.children[0]
+        if maximum is not None and progress.max != maximum:
+            progress.max = maximum
+        if value is not None and progress.value != value:
+            progress.value = value
+        if message is not None:
+            html = '<font color="blue">%s</front>' % str(message)
+            if self.children[1].value != html:
+                self.children[1].value = html
+
     def update_status_error(self, message):
         """
             Update Status.
@@ -116,6 +132,24 @@ class StatusBar(MenuWidgets):
         self.children[0].bar_style = 'success'
         self.children[1].value = '<font color="green">%s</front>' % str(message)
 
+    def info(self, message, new_line=False):
+        """
+            Show an INFO message, as UserMessages does.
+        """
+        self.update_info_message(message)
+
+    def warning(self, message, new_line=False):
+        """
+            Show a WARNING message, as UserMessages does.
+        """
+        self.children[1].value = '<font color="orange">%s</front>' % str(message)
+
+    def error(self, message, new_line=False):
+        """
+            Show an ERROR message, as UserMessages does.
+        """
+        self.update_status_error(message)
+
 
 class ParameterBox(MenuWidgets):
     """
@@ -143,34 +177,35 @@ class PrestoStatusBar(StatusBar):
         Progress Bar for Presto.
     """
 
-    def __init__(self, cursor):
+    def __init__(self, cursor, run=True):
         super(PrestoStatusBar, self).__init__()
-        self.run(cursor)
+        self.total_tasks = 100
+        self.completed_tasks = 0
+        self.poll_stats = None
+        if run:
+            self.run(cursor)
 
     def run(self, cursor):
         """
-            Update Status bar.
+            Update Status bar until the query completes. Polls with exponential backoff, the number of polls is
+            kept in poll_stats. Polls also fetch result pages, the backoff restarts whenever a poll returns rows so
+            that results aren't fetched at the slowest interval.
         """
 
+        from pyhive.exc import DatabaseError
+
         # Don't use recursion here. The query might run for hours and tail-rec optimization is not supported in Python.
         if cursor:
+            poller = Poller()
             status = 'RUNNING'
-            total_tasks = 100
-            completed_tasks = 0
             try:
-                while status.upper() == 'RUNNING':
-                    sleep(1)
-                    data = cursor.poll()
-                    if data and 'stats' in data and 'state' in data['stats']:
-                        status = data['stats']['state']
-                        if 'completedSplits' in data['stats'] and completed_tasks != data['stats']['completedSplits']:
-                            completed_tasks = data['stats']['completedSplits']
-                            self.update_status(completed_tasks)
-                        if 'totalSplits' in data['stats'] and total_tasks != data['stats']['totalSplits']:
-                            total_tasks = data['stats']['totalSplits']
-                            self.update_max(total_tasks)
-                        self.update_info_message("%s - %d/%d tasks completed" % (status, completed_tasks, total_tasks))
-                    else:
+                while status.upper() in ('QUEUED', 'PLANNING', 'STARTING', 'RUNNING', 'FINISHING'):
+                    poller.wait()
+                    data = poller.call('poll', cursor.poll)
+                    if data and data.get('data'):
+                        poller.backoff.reset()
+                    status = self.update_stats(data)
+                    if status is None:
                         # TODO:  Need to handle better way.
                         return
                 if status.upper() == 'FINISHED':
@@ -178,6 +213,22 @@ class PrestoStatusBar(StatusBar):
             except DatabaseError as error:
                 self.update_status_error("Unable to execute query. Please check logs below.")
                 raise error
+            finally:
+                self.poll_stats = poller.stats()
+
+    def update_stats(self, data):
+        """
+            Update Status bar from a Presto poll response.
+            :return: Query state or None if the response has no stats.
+        """
+        if data and 'stats' in data and 'state' in data['stats']:
+            status = data['stats']['state']
+            self.completed_tasks = data['stats'].get('completedSplits', self.completed_tasks)
+            self.total_tasks = data['stats'].get('totalSplits', self.total_tasks)
+            self.update_progress(self.completed_tasks, "%s - %d/%d tasks completed" % (
+                status, self.completed_tasks, self.total_tasks), self.total_tasks)
+            return status
+        return None
 
 
 class HorizontalBox(widgets.HBox):
@@ -246,49 +297,3 @@ class TabView(widgets.Tab):
         """
         if filename is not None:
             self.data[idx].to_csv(filename)
-
-
-class QGridCustomWidget(qgrid.QGridWidget):
-    """
-        Widget to render as QGrid.
-    """
-
-    def __init__(self, dataframe, display_limit=1000, grid_options=None):
-        self.full_df = dataframe
-
-        if grid_options is None:
-            grid_options = {
-                'fullWidthRows': True,
-                'syncColumnCellResize': True,
-                'forceFitColumns': False,
-                'defaultColumnWidth': 150,
-                'rowHeight': 35,
-                'enableColumnReorder': True,
-                'enableTextSelectionOnCells': True,
-                'editable': True,
-                'autoEdit': False,
-                'explicitInitialization': True,
-                'maxVisibleRows': 10,
-                'minVisibleRows': 0,
-                'maxVisibleColumns': 10,
-                'minVisibleColumns': 0,
-                'sortable': True,
-                'filterable': True,
-                'highlightSelectedCell': True,
-                'highlightSelectedRow': True
-            }
-
-        super().__init__(df=self.full_df[:display_limit], grid_options=grid_options)
-
-    def DataFrame(self):
-        """
-            Return widget data as DataFrame.
-        """
-        return self.full_df
-
-    def csv(self, filename=None):
-        """
-            Return widget data as CSV.
-        """
-        if filename is not None:
-            self.full_df.to_csv(filename)
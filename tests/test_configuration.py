@@ -0,0 +1,175 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Tests of the configuration validation, overlay and reloading."""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ppextensions.pputils.utils.configuration import Configuration, OVERLAY_ENV, _merge_, validate_cluster, \
+    validate_conf
+from ppextensions.pputils.utils.exceptions import ConfigurationException
+
+HIVE = {'host': 'hive.example.com', 'port': 10000, 'auth': 'gssapi'}
+
+
+class ValidationTest(unittest.TestCase):
+
+    def test_valid_clusters(self):
+        self.assertEqual(validate_conf('hive', {'cluster_01': HIVE}), {'cluster_01': HIVE})
+        self.assertEqual(validate_conf('teradata', {'td': {'host': 'td.example.com'}}),
+                         {'td': {'host': 'td.example.com'}})
+
+    def test_numbers_given_as_strings_are_converted(self):
+        validated = validate_conf('hive', {'cluster_01': dict(HIVE, port='10001')})
+        self.assertEqual(validated['cluster_01']['port'], 10001)
+
+    def test_invalid_type(self):
+        with self.assertRaisesRegex(ConfigurationException, 'port of hive.cluster_01 must be of type int'):
+            validate_conf('hive', {'cluster_01': dict(HIVE, port='tenthousand')})
+        with self.assertRaisesRegex(ConfigurationException, 'name_node_opts'):
+            validate_conf('hive', {'cluster_01': dict(HIVE, name_node_opts='kerberos')})
+
+    def test_missing_setting(self):
+        settings = dict(HIVE)
+        del settings['auth']
+        with self.assertRaisesRegex(ConfigurationException, 'hive.cluster_01 is missing auth'):
+            validate_conf('hive', {'cluster_01': settings})
+
+    def test_not_an_object(self):
+        with self.assertRaises(ConfigurationException):
+            validate_conf('hive', ['cluster_01'])
+        with self.assertRaises(ConfigurationException):
+            validate_conf('hive', {'cluster_01': 'hive.example.com'})
+
+    def test_input_is_not_modified(self):
+        settings = dict(HIVE, port='10001')
+        validate_conf('hive', {'cluster_01': settings})
+        self.assertEqual(settings['port'], '10001')
+
+    def test_unknown_engines_are_not_checked(self):
+        self.assertEqual(validate_conf('other', {'anything': 1}), {'anything': 1})
+
+    def test_tableau_credentials_are_optional(self):
+        self.assertEqual(validate_conf('tableau', {'site_name': 'site', 'user_name': 'user'}),
+                         {'site_name': 'site', 'user_name': 'user'})
+        self.assertEqual(validate_conf('tableau', {}), {})
+
+    def test_validate_cluster_checks_only_its_cluster(self):
+        engine_details = {'cluster_01': HIVE, 'broken': {'host': 'hive.example.com'}}
+        self.assertEqual(validate_cluster('hive', 'cluster_01', engine_details), HIVE)
+        self.assertEqual(validate_cluster('hive', 'cluster_02', engine_details), {})
+        with self.assertRaisesRegex(ConfigurationException, 'hive.broken'):
+            validate_cluster('hive', 'broken', engine_details)
+
+
+class MergeTest(unittest.TestCase):
+
+    def test_nested_objects_are_merged(self):
+        base = {'hive': {'cluster_01': dict(HIVE)}, 'tableau': {'site_name': 'site'}}
+        merged = _merge_(base, {'hive': {'cluster_01': {'port': 10001}, 'cluster_02': HIVE}})
+        self.assertEqual(merged['hive']['cluster_01'], dict(HIVE, port=10001))
+        self.assertEqual(merged['hive']['cluster_02'], HIVE)
+        self.assertEqual(merged['tableau'], {'site_name': 'site'})
+        self.assertEqual(base['hive']['cluster_01']['port'], 10000)
+
+    def test_values_replace_objects(self):
+        self.assertEqual(_merge_({'hive': {'cluster_01': HIVE}}, {'hive': None}), {'hive': None})
+
+
+class ConfigurationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'config.json')
+        self.environ = os.environ.pop(OVERLAY_ENV, None)
+        self.write({'hive': {'cluster_01': HIVE, 'broken': {'host': 'hive.example.com'}}})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        os.environ.pop(OVERLAY_ENV, None)
+        if self.environ is not None:
+            os.environ[OVERLAY_ENV] = self.environ
+
+    def write(self, conf_details):
+        with open(self.path, 'w') as config_file:
+            json.dump(conf_details, config_file)
+
+    def test_broken_cluster_doesnt_affect_the_others(self):
+        configuration = Configuration(self.path)
+        self.assertEqual(configuration.cluster('hive', 'cluster_01'), HIVE)
+        self.assertEqual(configuration.cluster('hive', 'cluster_02'), {})
+        self.assertEqual(configuration.cluster('presto', 'cluster_01'), {})
+        with self.assertRaises(ConfigurationException):
+            configuration.cluster('hive', 'broken')
+        with self.assertRaises(ConfigurationException):
+            configuration.engine('hive')
+
+    def test_missing_engine(self):
+        self.assertEqual(Configuration(self.path).engine('tableau'), {})
+
+    def test_set_overlay(self):
+        configuration = Configuration(self.path)
+        self.assertEqual(configuration.cluster('hive', 'cluster_01')['port'], 10000)
+        configuration.set_overlay({'hive': {'cluster_01': {'port': '10001'}}})
+        self.assertEqual(configuration.cluster('hive', 'cluster_01'), dict(HIVE, port=10001))
+        configuration.set_overlay(None)
+        self.assertEqual(configuration.cluster('hive', 'cluster_01')['port'], 10000)
+
+    def test_environment_overlay(self):
+        os.environ[OVERLAY_ENV] = json.dumps({'hive': {'broken': {'port': 10000, 'auth': 'plain'}}})
+        configuration = Configuration(self.path)
+        self.assertEqual(configuration.cluster('hive', 'broken'),
+                         {'host': 'hive.example.com', 'port': 10000, 'auth': 'plain'})
+
+    def test_invalid_environment_overlay(self):
+        os.environ[OVERLAY_ENV] = '{"hive":'
+        with self.assertRaisesRegex(ConfigurationException, OVERLAY_ENV):
+            Configuration(self.path).get()
+        os.environ[OVERLAY_ENV] = '[]'
+        with self.assertRaisesRegex(ConfigurationException, OVERLAY_ENV):
+            Configuration(self.path).get()
+
+    def test_changed_file_is_read_again(self):
+        configuration = Configuration(self.path)
+        self.assertEqual(configuration.cluster('hive', 'cluster_01')['port'], 10000)
+        self.write({'hive': {'cluster_01': dict(HIVE, port=10002)}})
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        self.assertEqual(configuration.cluster('hive', 'cluster_01')['port'], 10002)
+
+    def test_unchanged_file_is_not_read_again(self):
+        configuration = Configuration(self.path)
+        first = configuration.get()
+        time.sleep(0.01)
+        self.assertIs(configuration.get(), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
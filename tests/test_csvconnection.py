@@ -0,0 +1,132 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Tests of the tables CSVConnection keeps per file."""
+
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ppextensions.ppsql.connection import csvconnection
+from ppextensions.ppsql.connection.csvconnection import CSVConnection, MAX_TABLES_PER_FILE
+
+
+class FakeIPython:
+    """
+    Records the %sql magics run and the tables they persist.
+    """
+
+    def __init__(self):
+        self.user_ns = {}
+        self.tables = set()
+        self.magics = []
+
+    def magic(self, line):
+        self.magics.append(line)
+        if line.startswith('sql persist '):
+            self.tables.add(line.split()[-1])
+        elif line.startswith('sql DROP TABLE IF EXISTS '):
+            self.tables.discard(line.split()[-1])
+        return line
+
+
+class CSVConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'sales.csv')
+        self.write('id,amount\n1,10\n2,20\n3,30\n')
+        self.ipython = FakeIPython()
+        patcher = mock.patch.object(csvconnection, 'get_ipython', return_value=self.ipython)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connection = CSVConnection()
+        self.connection.dflist = collections.OrderedDict()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text, mtime_offset=0):
+        with open(self.filename, 'w') as csv_file:
+            csv_file.write(text)
+        stat = os.stat(self.filename)
+        os.utime(self.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+    def execute(self, where):
+        return self.connection.execute('select id from %s where %s' % (self.filename, where))
+
+    def test_tables_are_reused(self):
+        self.execute('id > 1')
+        persisted = len([line for line in self.ipython.magics if line.startswith('sql persist')])
+        result = self.execute('id > 1')
+        self.assertEqual(len([line for line in self.ipython.magics if line.startswith('sql persist')]), persisted)
+        self.assertEqual(len(self.connection.dflist), 1)
+        name = list(self.connection.dflist)[0]
+        self.assertEqual(result, 'sql select id from %s where id > 1' % name)
+        self.assertEqual(sorted(self.ipython.user_ns[name]['id']), [2, 3])
+
+    def test_least_recently_used_tables_are_evicted(self):
+        names = []
+        for limit in range(MAX_TABLES_PER_FILE + 1):
+            self.execute('id > %d' % limit)
+            names.append(list(self.connection.dflist)[-1])
+            if limit == 1:
+                # Using the first table again makes the second one the least recently used.
+                self.execute('id > 0')
+        self.assertEqual(len(set(names)), MAX_TABLES_PER_FILE + 1)
+        self.assertEqual(list(self.connection.dflist), [names[0]] + names[2:])
+        self.assertEqual(self.ipython.tables, set(self.connection.dflist))
+        self.assertNotIn(names[1], self.ipython.user_ns)
+        self.assertIn('sql DROP TABLE IF EXISTS %s' % names[1], self.ipython.magics)
+
+    def test_tables_of_other_files_are_kept(self):
+        other = os.path.join(self.directory, 'other.csv')
+        with open(other, 'w') as csv_file:
+            csv_file.write('id\n1\n')
+        self.connection.execute('select id from %s where id > 0' % other)
+        for limit in range(MAX_TABLES_PER_FILE + 2):
+            self.execute('id > %d' % limit)
+        self.assertEqual(len(self.connection.dflist), MAX_TABLES_PER_FILE + 1)
+        self.assertEqual(sum(1 for table, _ in self.connection.dflist.values() if 'other' in table), 1)
+
+    def test_tables_of_changed_files_are_dropped(self):
+        self.execute('id > 1')
+        self.execute('id > 2')
+        old_names = list(self.connection.dflist)
+        self.write('id,amount\n1,10\n2,20\n3,30\n4,40\n', mtime_offset=1000000000)
+        self.execute('id > 1')
+        name = list(self.connection.dflist)[-1]
+        self.assertEqual(list(self.connection.dflist), [name])
+        self.assertEqual(name, old_names[0])
+        self.assertEqual(sorted(self.ipython.user_ns[name]['id']), [2, 3, 4])
+        self.assertNotIn(old_names[1], self.ipython.user_ns)
+        self.assertEqual(self.ipython.tables, {name})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Tests of the column and row pushdown of queries on CSV files."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pandas as pd
+
+from ppextensions.ppsql.connection import csvquery
+from ppextensions.ppsql.connection.csvquery import CSVQuery
+
+CSV = '''id,amount,country,first name
+1,10.5,US,Ann
+2,20.0,FR,Bob
+3,,US,
+4,40.0,,Dan
+5,50.0,DE,Eve
+6,60.0,US,Fay
+'''
+
+
+class CSVQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'sales.csv')
+        with open(self.filename, 'w') as csv_file:
+            csv_file.write(CSV)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def query(self, sql):
+        return CSVQuery(sql.format(file=self.filename))
+
+    def loaded_ids(self, sql):
+        csv_query = self.query(sql)
+        data_frame = csv_query.load(chunk_size=2)
+        return sorted(data_frame['id']) if 'id' in data_frame else None
+
+    def assert_same_results(self, sql):
+        """
+        The query returns the same rows from the loaded table as from the whole file.
+        """
+        csv_query = self.query(sql)
+        database = sqlite3.connect(':memory:')
+        try:
+            pd.read_csv(self.filename).to_sql(csv_query.table, database, index=False)
+            csv_query.load(chunk_size=2).to_sql(csv_query.name(), database, index=False)
+            expected = database.execute(csv_query.query.replace(self.filename, csv_query.table)).fetchall()
+            self.assertEqual(sorted(database.execute(csv_query.sql()).fetchall(), key=repr),
+                             sorted(expected, key=repr))
+        finally:
+            database.close()
+
+    def test_comparisons(self):
+        self.assertEqual(self.loaded_ids('select id from {file} where amount > 20'), [4, 5, 6])
+        self.assertEqual(self.loaded_ids('select id from {file} where 20 < amount'), [4, 5, 6])
+        self.assertEqual(self.loaded_ids("select id from {file} where country = 'US'"), [1, 3, 6])
+        self.assertEqual(self.loaded_ids("select id from {file} where country <> 'US'"), [2, 5])
+
+    def test_and_or_not(self):
+        self.assertEqual(self.loaded_ids("select id from {file} where country = 'US' and amount < 50"), [1])
+        self.assertEqual(self.loaded_ids("select id from {file} where country = 'FR' or amount >= 50"), [2, 5, 6])
+        self.assertEqual(self.loaded_ids(
+            "select id from {file} where (country = 'FR' or country = 'DE') and not id = 5"), [2])
+        # NOT keeps the rows where the condition is null, SQLite drops them.
+        self.assertEqual(self.loaded_ids("select id from {file} where not amount > 20"), [1, 2, 3])
+        for where in ("country = 'US' and amount < 50", "country = 'FR' or amount >= 50",
+                      "not amount > 20", "not (country = 'US' or amount is null)"):
+            self.assert_same_results('select id from {file} where ' + where)
+
+    def test_null_comparisons(self):
+        self.assertEqual(self.loaded_ids('select id from {file} where amount is null'), [3])
+        self.assertEqual(self.loaded_ids('select id from {file} where country is not null'), [1, 2, 3, 5, 6])
+        # Comparisons with null are never true.
+        self.assertEqual(self.loaded_ids("select id from {file} where country != 'US'"), [2, 5])
+        self.assertEqual(self.loaded_ids("select id from {file} where country not in ('US')"), [2, 5])
+        self.assertEqual(self.loaded_ids('select id from {file} where amount not between 20 and 50'), [1, 6])
+        for where in ('amount is null', "country not in ('US')", 'amount not between 20 and 50',
+                      "country != 'US' or amount is null"):
+            self.assert_same_results('select id from {file} where ' + where)
+
+    def test_in_and_between(self):
+        self.assertEqual(self.loaded_ids("select id from {file} where country in ('FR', 'DE')"), [2, 5])
+        self.assertEqual(self.loaded_ids('select id from {file} where id between 2 and 4'), [2, 3, 4])
+        self.assertEqual(self.loaded_ids('select id from {file} where id between 2 and 4 and amount > 20'), [4])
+        self.assertEqual(self.loaded_ids('select id from {file} where amount between -1 and 10.5'), [1])
+
+    def test_quoted_identifiers(self):
+        for quoted in ('"first name"', '`first name`', '[first name]', '"FIRST NAME"'):
+            csv_query = self.query("select id from {file} where %s = 'Bob'" % quoted)
+            self.assertEqual(csv_query.columns, ['id', 'first name'])
+            self.assertEqual(sorted(csv_query.load()['id']), [2])
+        self.assert_same_results('select id, "first name" from {file} where "first name" is null')
+
+    def test_unsupported_predicates_keep_all_rows(self):
+        for where in ("lower(country) = 'us'", 'amount + 1 > 20', 'amount > id', "country like 'U%'",
+                      "case when id > 1 then 1 else 0 end = 1", "id in (select 1)",
+                      "country = 1"):
+            self.assertEqual(self.loaded_ids('select id from {file} where ' + where), [1, 2, 3, 4, 5, 6], where)
+
+    def test_unsupported_predicates_are_left_out(self):
+        # The supported condition still filters, the unsupported one keeps all rows.
+        self.assertEqual(self.loaded_ids("select id from {file} where lower(country) = 'us' and id > 4"), [5, 6])
+        self.assertEqual(self.loaded_ids(
+            "select id from {file} where amount + 1 between 20 and 50 and id > 4"), [5, 6])
+        # Any unsupported alternative keeps all rows.
+        self.assertEqual(self.loaded_ids("select id from {file} where lower(country) = 'us' or id > 4"),
+                         [1, 2, 3, 4, 5, 6])
+        for where in ("lower(country) = 'us' and id > 4", "amount + 1 between 20 and 50 and id > 4",
+                      "lower(country) = 'us' or id > 4"):
+            self.assert_same_results('select id from {file} where ' + where)
+
+    def test_projection(self):
+        self.assertEqual(self.query('select country, count(*) from {file} group by country').columns, ['country'])
+        self.assertEqual(self.query('select count(*) from {file}').columns, ['id'])
+        self.assertIsNone(self.query('select * from {file} where id > 1').columns)
+        self.assertEqual(list(self.query('select * from {file} where id > 4').load().columns),
+                         ['id', 'amount', 'country', 'first name'])
+
+    def test_no_pushdown_for_several_tables(self):
+        csv_query = self.query('select a.id from {file} a join {file} b on a.id = b.id where a.id > 4')
+        self.assertIsNone(csv_query.columns)
+        self.assertIsNone(csv_query.predicate)
+        self.assertEqual(csv_query.name(), csv_query.table)
+        self.assertEqual(len(csv_query.load()), 6)
+
+    def test_name_and_sql(self):
+        first = self.query('select id from {file} where id > 4')
+        second = self.query('select id from {file}  where id > 4')
+        other = self.query('select id from {file} where id > 5')
+        self.assertTrue(first.name().startswith(first.table + '_'))
+        self.assertEqual(first.name(), second.name())
+        self.assertNotEqual(first.name(), other.name())
+        self.assertEqual(first.sql(), 'select id from %s where id > 4' % first.name())
+        self.assertEqual(self.query('select * from {file}').name(), first.table)
+
+    def test_where_ends_at_clause_keywords(self):
+        csv_query = self.query('select id from {file} where id > 4 order by id limit 1')
+        self.assertEqual(csv_query.where, 'id > 4')
+        self.assertEqual(sorted(csv_query.load()['id']), [5, 6])
+
+    def test_no_matching_rows(self):
+        data_frame = self.query('select id from {file} where id > 10').load(chunk_size=2)
+        self.assertEqual(len(data_frame), 0)
+        self.assertEqual(list(data_frame.columns), ['id'])
+
+    def test_header_is_read_once_per_state(self):
+        key = (os.path.abspath(self.filename), ',')
+        state, header = csvquery.read_header(self.filename, ',')
+        self.assertEqual(header, ['id', 'amount', 'country', 'first name'])
+        self.assertIs(csvquery._headers[key][1], header)
+        self.assertIs(csvquery.read_header(self.filename, ',')[1], header)
+        with open(self.filename, 'w') as csv_file:
+            csv_file.write('id,total\n1,2\n')
+        os.utime(self.filename, ns=(state[0], state[0] + 1000000000))
+        self.assertEqual(csvquery.read_header(self.filename, ',')[1], ['id', 'total'])
+
+    def test_missing_file(self):
+        with self.assertRaises(IOError):
+            CSVQuery('select * from %s' % os.path.join(self.directory, 'missing.csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
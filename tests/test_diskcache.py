@@ -0,0 +1,113 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Tests of the size bounded, least recently used disk cache."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ppextensions.pputils.utils.diskcache import ENTRY_FILE, DiskCache, content_hash
+
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DiskCache(os.path.join(self.directory, 'cache'), 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def store(self, key, size, accessed=None):
+        entry_path = self.cache.create()
+        with open(os.path.join(entry_path, 'data'), 'wb') as file_handler:
+            file_handler.write(b'x' * size)
+        entry_path = self.cache.commit(key, entry_path)
+        if accessed is not None:
+            os.utime(os.path.join(entry_path, ENTRY_FILE), (accessed, accessed))
+        return entry_path
+
+    def test_commit_and_get(self):
+        self.assertIsNone(self.cache.get('a'))
+        entry_path = self.store('a', 10)
+        self.assertEqual(self.cache.get('a'), entry_path)
+        self.assertEqual(self.cache._keys_(), ['a'])
+
+    def test_commit_replaces_entry(self):
+        self.store('a', 10)
+        entry_path = self.store('a', 20)
+        with open(os.path.join(entry_path, 'data'), 'rb') as file_handler:
+            self.assertEqual(len(file_handler.read()), 20)
+
+    def test_discarded_entries_are_not_committed(self):
+        self.cache.discard(self.cache.create())
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        now = time.time()
+        self.store('old', 400, now - 30)
+        self.store('used', 400, now - 20)
+        # Reading an entry makes it the most recently used.
+        self.cache.get('old')
+        self.store('new', 400)
+        self.assertIsNone(self.cache.get('used'))
+        self.assertIsNotNone(self.cache.get('old'))
+        self.assertIsNotNone(self.cache.get('new'))
+
+    def test_entries_larger_than_the_cache_are_evicted(self):
+        self.store('big', 2000)
+        self.assertIsNone(self.cache.get('big'))
+
+    def test_expired_entries_are_removed(self):
+        self.cache.ttl = 60
+        entry_path = self.store('a', 10)
+        self.assertIsNotNone(self.cache.get('a'))
+        with open(os.path.join(entry_path, ENTRY_FILE), 'w') as file_handler:
+            file_handler.write('{"created": %f}' % (time.time() - 120))
+        self.assertIsNone(self.cache.get('a'))
+        self.assertFalse(os.path.exists(entry_path))
+
+    def test_invalidate(self):
+        for key in ('a-1', 'a-2', 'b-1'):
+            self.store(key, 10)
+        self.cache.invalidate_prefix('a-')
+        self.assertEqual(self.cache._keys_(), ['b-1'])
+        self.cache.invalidate('b-1')
+        self.assertEqual(self.cache._keys_(), [])
+        self.store('c', 10)
+        self.cache.invalidate()
+        self.assertFalse(os.path.exists(self.cache.directory))
+
+    def test_content_hash(self):
+        self.assertEqual(content_hash('a', {'x': 1, 'y': 2}), content_hash('a', {'y': 2, 'x': 1}))
+        self.assertNotEqual(content_hash('ab', 'c'), content_hash('a', 'bc'))
+        self.assertEqual(content_hash(b'a'), content_hash('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
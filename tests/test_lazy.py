@@ -0,0 +1,75 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Tests of deferred imports."""
+
+import sys
+import types
+import unittest
+
+from ppextensions.pputils.utils import lazy
+from ppextensions.pputils.utils.lazy import lazy_import
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.module = types.ModuleType('lazy_test_module')
+        self.module.__package__ = ''
+        sys.modules[self.module.__name__] = self.module
+
+    def tearDown(self):
+        del sys.modules[self.module.__name__]
+
+    def test_attributes_are_imported_on_access(self):
+        lazy_import(vars(self.module), {'OrderedDict': 'collections', 'dedent': 'textwrap'})
+        self.assertNotIn('OrderedDict', vars(self.module))
+        from collections import OrderedDict
+        self.assertIs(self.module.OrderedDict, OrderedDict)
+        self.assertIs(vars(self.module)['OrderedDict'], OrderedDict)
+        self.assertNotIn('dedent', vars(self.module))
+
+    def test_unknown_attribute(self):
+        lazy_import(vars(self.module), {'OrderedDict': 'collections'})
+        with self.assertRaises(AttributeError):
+            self.module.missing
+
+    def test_module_class_before_python_3_7(self):
+        version_info = sys.version_info
+        sys.version_info = (3, 5, 0)
+        try:
+            lazy_import(vars(self.module), {'OrderedDict': 'collections'})
+        finally:
+            sys.version_info = version_info
+        self.assertIsInstance(self.module, lazy._LazyModule)
+        self.assertNotIn('OrderedDict', vars(self.module))
+        from collections import OrderedDict
+        self.assertIs(lazy._LazyModule.__getattr__(self.module, 'OrderedDict'), OrderedDict)
+        with self.assertRaises(AttributeError):
+            lazy._LazyModule.__getattr__(self.module, 'missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Tests of pipeline parsing and dependency scheduling."""
+
+import threading
+import time
+import unittest
+
+from ppextensions.pputils.utils import pipeline
+from ppextensions.pputils.utils.exceptions import InvalidParameterType
+
+
+class ParsePipelineTest(unittest.TestCase):
+
+    def test_stages_and_dependencies(self):
+        stages = pipeline.parse_pipeline(['extract', 'clean:clean_out <- extract', '',
+                                          'report.ipynb <- clean_out, extract'])
+        self.assertEqual(list(stages), ['extract.ipynb', 'clean_out.ipynb', 'report.ipynb'])
+        self.assertEqual(stages['extract.ipynb'].dependencies, [])
+        self.assertEqual(stages['clean_out.ipynb'].notebook_filename, 'clean.ipynb')
+        self.assertEqual(stages['clean_out.ipynb'].dependencies, ['extract.ipynb'])
+        self.assertEqual(stages['report.ipynb'].dependencies, ['clean_out.ipynb', 'extract.ipynb'])
+
+    def test_is_dag(self):
+        self.assertTrue(pipeline.is_dag(['a', 'b <- a']))
+        self.assertFalse(pipeline.is_dag(['a', 'b']))
+
+    def test_duplicate_stage(self):
+        with self.assertRaises(InvalidParameterType):
+            pipeline.parse_pipeline(['a', 'a <- b', 'b'])
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(InvalidParameterType):
+            pipeline.parse_pipeline(['a', 'b <- c'])
+
+    def test_cycles(self):
+        for notebook_run_cmds in (['a <- a'], ['a <- b', 'b <- a'], ['x', 'a <- c', 'b <- a', 'c <- b, x']):
+            with self.assertRaises(InvalidParameterType):
+                pipeline.parse_pipeline(notebook_run_cmds)
+
+    def test_topological_order(self):
+        stages = pipeline.parse_pipeline(['d <- b, c', 'b <- a', 'c <- a', 'a'])
+        order = pipeline.topological_order(stages)
+        self.assertEqual(sorted(order), sorted(stages))
+        for name, stage in stages.items():
+            for dependency in stage.dependencies:
+                self.assertLess(order.index(dependency), order.index(name))
+
+
+class RunPipelineDagTest(unittest.TestCase):
+
+    def test_stages_run_after_their_dependencies(self):
+        stages = pipeline.parse_pipeline(['a', 'b <- a', 'c <- a', 'd <- b, c'])
+        finished = []
+        lock = threading.Lock()
+
+        def run_stage(stage):
+            with lock:
+                for dependency in stage.dependencies:
+                    self.assertIn(dependency, finished)
+            time.sleep(0.01)
+            with lock:
+                finished.append(stage.name)
+
+        completed = pipeline.run_pipeline_dag(stages, run_stage, 2)
+        self.assertEqual(completed, set(stages))
+        self.assertEqual(finished[0], 'a.ipynb')
+        self.assertEqual(finished[-1], 'd.ipynb')
+
+    def test_independent_stages_run_concurrently(self):
+        stages = pipeline.parse_pipeline(['a', 'b', 'c <- a, b'])
+        barrier = threading.Barrier(2, timeout=5)
+        pipeline.run_pipeline_dag(stages, lambda stage: stage.dependencies or barrier.wait(), 2)
+
+    def test_failure_stops_dependent_stages(self):
+        stages = pipeline.parse_pipeline(['a', 'b <- a', 'c'])
+        started = []
+
+        def run_stage(stage):
+            started.append(stage.name)
+            if stage.name == 'a.ipynb':
+                raise ValueError('a failed')
+
+        with self.assertRaises(ValueError):
+            pipeline.run_pipeline_dag(stages, run_stage, 1)
+        self.assertNotIn('b.ipynb', started)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Tests of the query result cache."""
+
+import shutil
+import tempfile
+import unittest
+
+from ppextensions.pputils.utils.querycache import QueryCache, is_cacheable, normalize_sql, session_statements
+from ppextensions.pputils.utils.resultset import ResultSet
+
+KEYS = ['id', 'name', 'amount', 'flag']
+ROWS = [(2 ** 60 + 1, 'a', 1.5, True), (None, None, None, False), (3, 'ccc', 2.0, True)]
+
+
+class QueryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = QueryCache(self.directory, 1 << 20)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def assert_same_results(self, cached, executed):
+        self.assertEqual(cached.keys, executed.keys)
+        self.assertEqual(cached.columnar, executed.columnar)
+        # repr, as NaN isn't equal to itself.
+        self.assertEqual([repr(tuple(row)) for row in cached], [repr(tuple(row)) for row in executed])
+        self.assertEqual([[type(value) for value in row] for row in cached],
+                         [[type(value) for value in row] for row in executed])
+        cached_frame, executed_frame = cached.DataFrame(), executed.DataFrame()
+        self.assertEqual(list(cached_frame.dtypes), list(executed_frame.dtypes))
+        self.assertTrue(cached_frame.equals(executed_frame))
+
+    def test_hit_returns_the_rows_of_a_miss(self):
+        executed = ResultSet(KEYS, list(ROWS))
+        key = self.cache.key('select * from t', 'hive://user@host', 100)
+        self.assertIsNone(self.cache.load(key))
+        self.assertTrue(self.cache.store(key, executed))
+        cached = self.cache.load(key)
+        self.assert_same_results(cached, executed)
+        self.assertIsNone(cached[1][0])
+        self.assertEqual(cached[0][0], 2 ** 60 + 1)
+
+    def test_hit_returns_the_columns_of_a_columnar_miss(self):
+        executed = ResultSet(KEYS, list(ROWS), columnar=True)
+        key = self.cache.key('select * from t', 'hive://user@host', 100)
+        self.assertTrue(self.cache.store(key, executed))
+        cached = self.cache.load(key)
+        self.assert_same_results(cached, executed)
+        self.assertIsNone(cached[1][0])
+        self.assertEqual(cached[0][0], 2 ** 60 + 1)
+
+    def test_keys(self):
+        key = self.cache.key('select a from t', 'hive://user@host', 100)
+        self.assertEqual(key, self.cache.key('SELECT  a\nFROM t -- comment', 'hive://user@host', 100))
+        self.assertNotEqual(key, self.cache.key('select a from t', 'hive://other@host', 100))
+        self.assertNotEqual(key, self.cache.key('select a from t', 'hive://user@host', 10))
+        self.assertNotEqual(key, self.cache.key('select a from t', 'hive://user@host', 100, ['use db']))
+        self.assertTrue(key.startswith(self.cache.query_prefix('select a from t')))
+
+    def test_invalidate_prefix(self):
+        keys = [self.cache.key('select a from t', 'hive://user@host', limit) for limit in (10, 100)]
+        other = self.cache.key('select b from t', 'hive://user@host', 10)
+        for key in keys + [other]:
+            self.cache.store(key, ResultSet(KEYS, list(ROWS)))
+        self.cache.invalidate_prefix(self.cache.query_prefix('select a from t'))
+        self.assertEqual([self.cache.load(key) for key in keys], [None, None])
+        self.assertIsNotNone(self.cache.load(other))
+
+    def test_normalize_sql(self):
+        self.assertEqual(normalize_sql("select  a ,b\nfrom t -- comment\n;"), 'SELECT a,b FROM t')
+        self.assertEqual(normalize_sql("select 'A  b' from t"), "SELECT 'A  b' FROM t")
+
+    def test_is_cacheable(self):
+        self.assertTrue(is_cacheable('select * from t'))
+        self.assertTrue(is_cacheable('set x=1; select * from t'))
+        self.assertFalse(is_cacheable('insert into t select * from s'))
+        self.assertFalse(is_cacheable('create table t as select 1; select * from t'))
+        self.assertFalse(is_cacheable('show tables'))
+
+    def test_session_statements(self):
+        self.assertEqual(session_statements('use db; set a=1;\nselect * from t'), ['use db', 'set a=1'])
+        self.assertEqual(session_statements('select * from users'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
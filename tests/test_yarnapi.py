@@ -0,0 +1,164 @@
+"""Copyright (c) 2018, PayPal Inc.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""Tests of the ResourceManager client against a stub Resource Manager."""
+
+import json
+import threading
+import time
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+from ppextensions.pputils.utils.exceptions import ResourceManagerException
+from ppextensions.pputils.utils.yarnapi import ResourceManager
+
+USER = 'analyst'
+APPS = {
+    'application_1_0001': {'id': 'application_1_0001', 'user': USER, 'state': 'RUNNING', 'progress': 10.0},
+    'application_1_0002': {'id': 'application_1_0002', 'user': USER, 'state': 'RUNNING', 'progress': 20.0},
+    'application_1_0003': {'id': 'application_1_0003', 'user': 'hive', 'state': 'RUNNING', 'progress': 30.0},
+}
+
+
+class StubResourceManager(BaseHTTPRequestHandler):
+    """
+    Answers the Resource Manager REST API from APPS and records the requests made and the client ports used.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+        self.server.requests.append((url.path, query))
+        self.server.ports.add(self.client_address[1])
+        time.sleep(self.server.delay)
+        if url.path == '/ws/v1/cluster/metrics':
+            self._reply_(200, {'clusterMetrics': {'appsRunning': len(APPS)}})
+        elif url.path == '/ws/v1/cluster/apps':
+            apps = [app for app in APPS.values()
+                    if app['user'] == query.get('user', app['user'])
+                    and app['state'] in query.get('states', app['state']).split(',')]
+            self._reply_(200, {'apps': {'app': apps}})
+        elif url.path.startswith('/ws/v1/cluster/apps/') and url.path.rsplit('/', 1)[1] in APPS:
+            self._reply_(200, {'app': APPS[url.path.rsplit('/', 1)[1]]})
+        else:
+            self._reply_(404, {'RemoteException': {'message': 'not found'}})
+
+    def _reply_(self, code, body):
+        body = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(HTTPServer):
+
+    def handle_error(self, request, client_address):
+        # Clients that timed out close the connection before the reply is written.
+        pass
+
+
+class ResourceManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(('127.0.0.1', 0), StubResourceManager)
+        self.server.requests = []
+        self.server.ports = set()
+        self.server.delay = 0
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.resource_manager = ResourceManager(self.url, user=USER)
+
+    def tearDown(self):
+        self.resource_manager.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def paths(self):
+        return [path for path, _ in self.server.requests]
+
+    def test_cluster_metrics_are_cached(self):
+        for _ in range(3):
+            metrics = self.resource_manager.cluster_metrics()
+        self.assertEqual(metrics['clusterMetrics']['appsRunning'], 3)
+        self.assertEqual(self.paths(), ['/ws/v1/cluster/metrics'])
+
+    def test_cluster_metrics_expire(self):
+        self.resource_manager.metrics_ttl = 0
+        self.resource_manager.cluster_metrics()
+        self.resource_manager.cluster_metrics()
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_requests_share_one_connection(self):
+        self.resource_manager.cluster_applications()
+        self.resource_manager.cluster_application('application_1_0001')
+        self.resource_manager.cluster_metrics()
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.ports), 1)
+
+    def test_running_applications_share_one_listing(self):
+        for _ in range(3):
+            first = self.resource_manager.running_application('application_1_0001')
+            second = self.resource_manager.running_application('application_1_0002')
+        self.assertEqual(first['app']['progress'], 10.0)
+        self.assertEqual(second['app']['progress'], 20.0)
+        self.assertEqual(self.server.requests, [
+            ('/ws/v1/cluster/apps', {'states': 'NEW,NEW_SAVING,SUBMITTED,ACCEPTED,RUNNING', 'user': USER})])
+
+    def test_applications_of_other_users_are_fetched_directly(self):
+        self.resource_manager.apps_ttl = 0
+        for _ in range(3):
+            app_info = self.resource_manager.running_application('application_1_0003')
+        self.assertEqual(app_info['app']['progress'], 30.0)
+        self.assertEqual(self.paths(), ['/ws/v1/cluster/apps'] + ['/ws/v1/cluster/apps/application_1_0003'] * 3)
+
+    def test_missing_application(self):
+        self.assertIsNone(self.resource_manager.running_application('application_1_0009', ignore_errors=True))
+        with self.assertRaises(ResourceManagerException):
+            self.resource_manager.cluster_application('application_1_0009')
+
+    def test_read_timeout(self):
+        self.resource_manager.timeout = (1, 0.1)
+        self.server.delay = 0.3
+        self.assertIsNone(self.resource_manager.cluster_metrics(ignore_errors=True))
+        with self.assertRaises(ResourceManagerException):
+            self.resource_manager.cluster_applications()
+
+
+if __name__ == '__main__':
+    unittest.main()